@@ -2,18 +2,34 @@ import os
 import smtplib
 import time
 import tempfile
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
 from pydantic import BaseModel, Field
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langgraph.graph import StateGraph, END, START
-from langgraph.types import interrupt, Command
-from langgraph.checkpoint.memory import InMemorySaver
-from typing import Literal, Dict, Any, List
-from langchain_community.document_loaders import PyPDFLoader
-from typing import TypedDict
+from typing import Literal, Dict, Any, List, Optional
+from typing import Annotated, TypedDict, TYPE_CHECKING
+import re
 import json
+from scheduler import get_scheduler
+from metrics import registry, instrument, record_cache, record_tokens
+from ledger import estimate_cost, record as ledger_record, timed as ledger_timed
+from scoring import score_draft, skill_overlap, skill_similarity
+from skills import extract_skills, merge_skills
+from cv_sections import CONFIDENCE_THRESHOLD, CV_FIELDS, parse_sections, section_text
+from speculative import content_hash
+from edits import apply_edits, is_approval
+from routing import get_router
+from context_cache import get_context_cache
+from cassette import chat_model_from_env
+from deadline import Deadline, DeadlineExceeded, OPTIONAL_STAGE_FACTOR, from_config, with_deadline
+from transports import get_transport
+from workers import get_pool
+
+if TYPE_CHECKING:
+    from langchain_core.runnables import RunnableConfig
 
 # ----------------- SCHEMA -----------------
 class EmailSchema(BaseModel):
@@ -32,89 +48,389 @@ class DataExtractSchema(BaseModel):
     location: str = Field(description="Primary location", default="")
     projects: List[str] = Field(description="Significant projects", default=[])
 
+class ParseAndDraftSchema(BaseModel):
+    profile: DataExtractSchema = Field(description="Information extracted from the CV")
+    email: EmailSchema = Field(description="Application email draft")
+
+class JobAnalysisSchema(BaseModel):
+    title: str = Field(description="Title of the advertised position", default="")
+    company: str = Field(description="Hiring company", default="")
+    requirements: List[str] = Field(description="Key requirements and qualifications", default=[])
+    contact_email: str = Field(description="Email address applications should be sent to", default="")
+    deadline: str = Field(description="Application deadline, if mentioned", default="")
+    summary: str = Field(description="One or two sentences about the role and the team", default="")
+
 class UserFeedbackSchema(BaseModel):
     suggestion: str = Field(description="User feedback")
     llm_decision: Literal["approved", "needs_improvement"] = Field(description="Decision")
 
+# ----------------- MODEL CALLS -----------------
+# langchain_google_genai, langgraph and the PDF loader take seconds to import,
+# so they are imported on first use (see warmup.py) instead of at module load.
+ChatGoogleGenerativeAI = None
+_chat_models: Dict[tuple, Any] = {}
+_chat_models_lock = threading.Lock()
+
+def get_chat_model(api_key: str, temperature: float, model: str = "gemini-1.5-flash",
+                   cached_content: Optional[str] = None):
+    """Return a cached Gemini client for this key/model/temperature (and provider context cache)"""
+    global ChatGoogleGenerativeAI
+    if ChatGoogleGenerativeAI is None:
+        # LLM_CASSETTE records every call to a cassette or replays them (cassette.py)
+        ChatGoogleGenerativeAI = chat_model_from_env()
+    if ChatGoogleGenerativeAI is None:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+    key = (ChatGoogleGenerativeAI, model, temperature, api_key, cached_content)
+    with _chat_models_lock:
+        if key not in _chat_models:
+            extra = {"cached_content": cached_content} if cached_content else {}
+            _chat_models[key] = ChatGoogleGenerativeAI(
+                model=model,
+                temperature=temperature,
+                google_api_key=api_key,
+                **extra
+            )
+        return _chat_models[key]
+
+class RoutedModel:
+    """Structured-output model whose Gemini model is chosen per call by the router (routing.py)"""
+
+    def __init__(self, api_key: str, node: str, schema, temperature: float):
+        self.api_key = api_key
+        self.node = node
+        self.schema = schema
+        self.temperature = temperature
+        self._runnables: Dict[tuple, Any] = {}
+        # Build the configured model now so a bad key or model fails at graph creation
+        self._runnable(get_router().route(node)[0])
+
+    def _runnable(self, model: str, cached_content: Optional[str] = None):
+        key = (model, cached_content)
+        if key not in self._runnables:
+            chat_model = get_chat_model(self.api_key, self.temperature, model, cached_content)
+            self._runnables[key] = chat_model.with_structured_output(self.schema, include_raw=True)
+        return self._runnables[key]
+
+    def invoke(self, prompt, prefix: str = "", budget: Optional[float] = None):
+        """Call the routed model; a `prefix` the prompt starts with may come from the context cache.
+
+        `budget` (seconds left for the application) tightens the route's latency budget.
+        """
+        router = get_router()
+        model, _ = router.choose(self.node, budget)
+        runnable = self._runnable(model)
+        cache = get_context_cache()
+        if prefix and cache and prompt.startswith(prefix):
+            cached_content = cache.handle(self.api_key, model, prefix)
+            if cached_content:
+                runnable = self._runnable(model, cached_content)
+                prompt = prompt[len(prefix):]
+        started = time.perf_counter()
+        try:
+            return runnable.invoke(prompt)
+        finally:
+            router.observe(self.node, model, time.perf_counter() - started)
+
+def _invoke_model(runnable, prompt: str, session_id: str, node: str, prefix: str = "",
+                  deadline: Optional[Deadline] = None):
+    """Run a model call through the shared process-wide scheduler.
+
+    Models are built with include_raw=True so token usage can be recorded;
+    the parsed structured output is returned. `prefix` marks the stable start
+    of the prompt that a provider context cache may hold. With a `deadline`
+    the queue wait and the call itself end with DeadlineExceeded when it expires.
+    """
+    scheduler = get_scheduler()
+
+    def call():
+        kwargs: Dict[str, Any] = {'prefix': prefix} if prefix else {}
+        with registry.timer("llm_call_seconds", node=node):
+            if deadline is None:
+                return get_pool("io").run(node, runnable.invoke, prompt, **kwargs)
+            kwargs['budget'] = deadline.remaining()
+            return deadline.run(node, lambda: runnable.invoke(prompt, **kwargs))
+
+    started = time.perf_counter()
+    try:
+        result = scheduler.run(session_id, call, scheduler.request_tokens(prompt), deadline)
+    except Exception as e:
+        ledger_record("llm", node, time.perf_counter() - started, detail=get_router().route(node)[0],
+                      status="timeout" if isinstance(e, DeadlineExceeded) else "error")
+        raise
+    if not (isinstance(result, dict) and 'parsed' in result):
+        return result
+
+    raw = result.get('raw')
+    usage = getattr(raw, 'usage_metadata', None)
+    record_tokens(node, usage)
+    _record_call(node, raw, usage or {}, time.perf_counter() - started)
+    if result.get('parsing_error'):
+        raise result['parsing_error']
+    if result.get('parsed') is None:
+        raise ValueError("Model returned no structured output")
+    return result['parsed']
+
+def _record_call(node: str, raw, usage: Dict[str, Any], seconds: float):
+    """Add a finished call (queue wait included) with its tokens and estimated cost to the session ledger"""
+    model = (getattr(raw, 'response_metadata', None) or {}).get('model_name') or get_router().route(node)[0]
+    input_tokens, output_tokens = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    cached_tokens = (usage.get("input_token_details") or {}).get("cache_read", 0)
+    ledger_record("llm", node, seconds, detail=model, input_tokens=input_tokens, output_tokens=output_tokens,
+                  cached_tokens=cached_tokens, cost_usd=estimate_cost(model, input_tokens, output_tokens, cached_tokens))
+
+def optional_stage(deadline: Optional[Deadline], node: str) -> Optional[Deadline]:
+    """Deadline for a stage whose result is optional: capped relative to its route budget"""
+    if deadline is None:
+        return None
+    return deadline.child(get_router().route(node)[1] * OPTIONAL_STAGE_FACTOR)
+
+def record_fallback(stage: str) -> List[str]:
+    """Count a stage that returned a partial result at the deadline; the value for `fallbacks`"""
+    registry.inc("deadline_fallbacks", stage=stage)
+    return [stage]
+
 # ----------------- CV Processing -----------------
+# What the model is asked for each DataExtractSchema field
+CV_FIELD_PROMPTS = {
+    "name": "Full name of the candidate",
+    "skills": "All technical and soft skills mentioned",
+    "experience": "Work experience descriptions",
+    "relevant_job_titles": "Relevant job titles held",
+    "certificates": "Certifications or qualifications",
+    "location": "Location/address information",
+    "projects": "Notable projects or achievements",
+}
+
+def load_cv_text(filepath: str) -> str:
+    """Text of all pages of a CV PDF"""
+    from langchain_community.document_loaders import PyPDFLoader
+    
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"CV file not found: {filepath}")
+    
+    # pypdf is CPU-bound; the shared CPU pool caps how many CVs are extracted at once
+    docs = get_pool("cpu").run("pdf_extract", lambda: PyPDFLoader(filepath).load())
+    if not docs:
+        raise ValueError("No content found in PDF")
+    
+    all_text = "\n".join([doc.page_content for doc in docs])
+    if not all_text.strip():
+        raise ValueError("PDF appears to be empty or contains only images")
+    return all_text
+
 class CvStateGraph(TypedDict):
     filepath: str
     text: str 
     parsed_data: Dict[str, Any]
+    fallbacks: List[str]
 
-def create_cv_subgraph(api_key: str):
+def create_cv_subgraph(api_key: str, session_id: str = "default"):
     """Create CV processing subgraph"""
+    from langgraph.graph import StateGraph, END, START
+    from pydantic import create_model
+    
     try:
-        model = ChatGoogleGenerativeAI(
-            model="gemini-1.5-flash", 
-            temperature=0, 
-            google_api_key=api_key
-        )
-        structured_model = model.with_structured_output(DataExtractSchema)
+        structured_model = RoutedModel(api_key, 'parse_data', DataExtractSchema, temperature=0)
     except Exception as e:
         raise Exception(f"Failed to initialize Google AI model: {str(e)}")
+    
+    partial_models: Dict[tuple, Any] = {}
+    
+    def partial_model(fields: tuple):
+        """Structured model for a subset of DataExtractSchema (fewer output tokens)"""
+        if len(fields) == len(CV_FIELDS):
+            return structured_model
+        if fields not in partial_models:
+            schema = create_model(
+                "DataExtractFields",
+                **{field: (DataExtractSchema.model_fields[field].annotation, DataExtractSchema.model_fields[field])
+                   for field in fields}
+            )
+            partial_models[fields] = RoutedModel(api_key, 'parse_data', schema, temperature=0)
+        return partial_models[fields]
 
-    def load_data(state: CvStateGraph) -> Dict[str, Any]:
+    def load_data(state: CvStateGraph, config: "RunnableConfig") -> Dict[str, Any]:
         """Load PDF content"""
+        deadline = from_config(config)
         try:
-            if not os.path.exists(state['filepath']):
-                raise FileNotFoundError(f"CV file not found: {state['filepath']}")
-            
-            loader = PyPDFLoader(state['filepath'])
-            docs = loader.load()
-            
-            if not docs:
-                raise ValueError("No content found in PDF")
-            
-            all_text = "\n".join([doc.page_content for doc in docs])
-            
-            if not all_text.strip():
-                raise ValueError("PDF appears to be empty or contains only images")
-            
-            return {'text': all_text}
+            if deadline is not None:
+                deadline.check('load_data')
+            return {'text': load_cv_text(state['filepath'])}
         except Exception as e:
             raise Exception(f"Error loading PDF: {str(e)}")
 
-    def parse_data(state: CvStateGraph) -> Dict[str, Any]:
-        """Parse CV data using AI"""
+    def parse_data(state: CvStateGraph, config: "RunnableConfig") -> Dict[str, Any]:
+        """Parse CV data, locally where the headings allow it and with AI for the rest"""
+        fallbacks: List[str] = []
         try:
             if not state.get('text'):
                 raise ValueError("No text content to parse")
             
-            prompt = f"""
+            # Fast path: well-structured CVs are parsed from their headings without the model
+            fields, confidence = parse_sections(state['text'])
+            uncertain = tuple(field for field in CV_FIELDS if confidence[field] < CONFIDENCE_THRESHOLD)
+            registry.inc("cv_fields", len(CV_FIELDS) - len(uncertain), source="local")
+            
+            if uncertain:
+                registry.inc("cv_fields", len(uncertain), source="llm")
+                wanted = "\n".join(f"            - {CV_FIELD_PROMPTS[field]}" for field in uncertain)
+                prompt = f"""
             Extract the following information from this CV/Resume text:
             
-            {state['text']}
+            {section_text(state['text'], list(uncertain))}
             
             Please extract:
-            - Full name of the candidate
-            - All technical and soft skills mentioned
-            - Work experience descriptions
-            - Relevant job titles held
-            - Certifications or qualifications
-            - Location/address information
-            - Notable projects or achievements
+{wanted}
             
             If any information is not found, leave those fields empty.
             """
+                
+                try:
+                    response = _invoke_model(partial_model(uncertain), prompt, session_id, 'parse_data',
+                                             deadline=optional_stage(from_config(config), 'parse_data'))
+                    fields.update({field: getattr(response, field) for field in uncertain})
+                except DeadlineExceeded:
+                    # Out of time: keep the locally parsed fields, however uncertain
+                    fallbacks = record_fallback('parse_data')
             
-            response = structured_model.invoke(prompt)
-            return {'parsed_data': response}
+            response = DataExtractSchema(**fields)
+            # Normalize the skill list and add taxonomy skills the model missed in the CV text
+            response.skills = merge_skills(response.skills, extract_skills(state['text']))
+            return {'parsed_data': response, 'fallbacks': fallbacks}
             
         except Exception as e:
             raise Exception(f"Error parsing CV data: {str(e)}")
 
     # Build the graph
     graph = StateGraph(CvStateGraph)
-    graph.add_node('load_data', load_data)
-    graph.add_node('parse_data', parse_data)
+    graph.add_node('load_data', instrument('load_data')(load_data))
+    graph.add_node('parse_data', instrument('parse_data')(parse_data))
     graph.add_edge(START, "load_data")
     graph.add_edge('load_data', 'parse_data')
     graph.add_edge('parse_data', END)
     
     return graph.compile()
 
+# ----------------- JOB ANALYSIS -----------------
+JOB_ANALYSIS_CACHE_SIZE = int(os.environ.get("JOB_ANALYSIS_CACHE_SIZE", 256))
+_job_analyses: Dict[str, Dict[str, Any]] = {}
+_job_analyses_lock = threading.Lock()
+
+def analyze_job(analysis_model, job_text: str, session_id: str = "default",
+                deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+    """Structured summary of a job posting, cached by job-text hash"""
+    key = content_hash(job_text.strip())
+    with _job_analyses_lock:
+        cached = _job_analyses.get(key)
+    record_cache("job_analysis", cached is not None)
+    if cached is not None:
+        return cached
+    
+    prompt = f"""
+    Analyze this job posting:
+
+    {job_text}
+
+    Extract the job title, the hiring company, the key requirements and qualifications
+    (short phrases), the email address applications should be sent to, the application
+    deadline and a one or two sentence summary of the role.
+    If any information is not found, leave those fields empty.
+    """
+    analysis = _invoke_model(analysis_model, prompt, session_id, 'analyze_job', deadline=deadline).model_dump()
+    if not analysis['contact_email']:
+        emails = re.findall(r"[\w.+-]+@[\w-]+\.[\w.-]+", job_text)
+        analysis['contact_email'] = emails[0] if emails else ""
+    
+    with _job_analyses_lock:
+        if len(_job_analyses) >= JOB_ANALYSIS_CACHE_SIZE:
+            # Dicts keep insertion order: drop the oldest analysis
+            _job_analyses.pop(next(iter(_job_analyses)))
+        _job_analyses[key] = analysis
+    return analysis
+
+def format_job_analysis(analysis: Dict[str, Any], job_text: str) -> str:
+    """Compact job description for prompts; the full posting when there is no analysis"""
+    if not analysis or not (analysis.get('title') or analysis.get('requirements')):
+        return job_text
+    lines = [
+        f"Position: {analysis.get('title') or 'Not specified'}",
+        f"Company: {analysis.get('company') or 'Not specified'}",
+        f"Requirements: {'; '.join(analysis.get('requirements') or []) or 'Not specified'}",
+        f"Application email: {analysis.get('contact_email') or 'Not specified'}",
+    ]
+    if analysis.get('deadline'):
+        lines.append(f"Deadline: {analysis['deadline']}")
+    if analysis.get('summary'):
+        lines.append(f"About the role: {analysis['summary']}")
+    return "\n".join(lines)
+
+# ----------------- PROMPT PREFIX -----------------
+# Shared, byte-identical start of every draft and edit prompt for one CV;
+# everything that changes between calls goes after it
+PROMPT_GUIDELINES = """You write and revise job application emails for the candidate below.
+
+Guidelines for every email:
+- Address the hiring manager professionally and mention the specific position
+- Highlight the 2-3 most relevant skills/experiences for the job (prefer the required skills the candidate has)
+- Show enthusiasm for the role and company
+- Mention that the resume is attached and end with a professional closing
+- Keep it concise but compelling, around 150-200 words
+- Leave the sender empty unless the CV shows an email address; it is filled in automatically
+"""
+
+def prompt_prefix(cv_data: Dict[str, Any]) -> str:
+    """System guidelines plus the candidate section, identical for every call with this CV"""
+    def items(field: str, limit: int) -> str:
+        values = [str(value) for value in (cv_data.get(field) or [])[:limit]]
+        return "; ".join(values) if values else "Not specified"
+    return "\n".join([
+        PROMPT_GUIDELINES,
+        "CANDIDATE INFORMATION:",
+        f"Name: {cv_data.get('name') or 'Candidate'}",
+        f"Location: {cv_data.get('location') or 'Not specified'}",
+        f"Skills: {', '.join((cv_data.get('skills') or [])[:15]) or 'Various skills'}",
+        f"Experience: {items('experience', 3)}",
+        f"Relevant job titles: {items('relevant_job_titles', 3)}",
+        f"Certificates: {items('certificates', 3)}",
+        f"Projects: {items('projects', 3)}",
+        "",
+        "",
+    ])
+
+# ----------------- FALLBACK DRAFT -----------------
+def template_email(cv_data: Dict[str, Any], job_analysis: Dict[str, Any], job_text: str,
+                   sender: str = "") -> EmailSchema:
+    """Plain application email assembled locally, for when the model cannot answer in time"""
+    title = job_analysis.get('title') or "the advertised position"
+    company = f" at {job_analysis['company']}" if job_analysis.get('company') else ""
+    matching_skills, _ = skill_overlap(cv_data.get('skills', []), job_text)
+    skills = (matching_skills or cv_data.get('skills') or [])[:3]
+    titles = cv_data.get('relevant_job_titles') or []
+    
+    background = f"my background in {', '.join(skills)}" if skills else "my background"
+    if titles:
+        background += f" and my experience as a {titles[0]}"
+    emails = re.findall(r"[\w.+-]+@[\w-]+\.[\w.-]+", job_text)
+    body = "\n\n".join([
+        "Dear Hiring Manager,",
+        f"I am writing to apply for the {title} position{company}. "
+        f"I believe {background} would make me a strong addition to your team.",
+        "Please find my resume attached. I would welcome the opportunity to discuss my application with you.",
+        f"Best regards,\n{cv_data.get('name') or ''}".strip(),
+    ])
+    return EmailSchema(
+        from_sender=sender,
+        to=job_analysis.get('contact_email') or (emails[0] if emails else "hr@company.com"),
+        subject=f"Application for {title}",
+        body=body,
+        similarity=skill_similarity(cv_data.get('skills', []), job_text),
+    )
+
 # ----------------- Main Agent -----------------
+def _merge_fallbacks(current: Optional[List[str]], update: Optional[List[str]]) -> List[str]:
+    """Stages that fell back during the current run; None (set by each new run) clears the list"""
+    return [] if update is None else (current or []) + update
+
 class AgentState(TypedDict):
     filepath: str
     parsed_data: Dict[str, Any]
@@ -124,81 +440,260 @@ class AgentState(TypedDict):
     llm_decision: str
     suggestions: str
     user_input: str
+    alternates: List[Dict[str, Any]]
+    job_analysis: Dict[str, Any]
+    predrafted: bool
+    fallbacks: Annotated[List[str], _merge_fallbacks]
 
-def create_workflow(api_key: str, gmail_email: str, gmail_password: str):
-    """Create main workflow for email generation"""
+# (temperature, tone) of each candidate in best-of-N drafting; the first is the default draft
+DRAFT_VARIANTS = [
+    (0.3, "professional"),
+    (0.7, "enthusiastic"),
+    (0.5, "concise and direct"),
+    (0.9, "confident"),
+    (0.4, "warm and personable"),
+]
+
+def create_workflow(api_key: str, gmail_email: str, gmail_password: str, session_id: str = "default",
+                    variants: int = 1, fused: bool = False):
+    """Create main workflow for email generation.
+
+    The job posting is analyzed in a branch parallel to CV parsing (skipped when
+    parsed_data is passed in); later prompts use the compact analysis instead of
+    the full posting. With variants > 1 the draft node generates that many candidates concurrently
+    (varied temperature and tone) and keeps the best one by local scoring.
+
+    With fused=True (single variant only) a CV that cannot be parsed locally is
+    parsed and drafted in the CV branch: one model round trip, alongside the job
+    analysis, returns both the profile and the draft.
+    """
+    from langgraph.graph import StateGraph, END, START
+    from langgraph.checkpoint.memory import InMemorySaver
+    
     try:
-        model = ChatGoogleGenerativeAI(
-            model="gemini-1.5-flash", 
-            temperature=0.3, 
-            google_api_key=api_key
-        )
-        structured_model = model.with_structured_output(EmailSchema)
-        feedback_model = model.with_structured_output(UserFeedbackSchema)
+        # Each node's Gemini model comes from its route (routing.py)
+        structured_model = RoutedModel(api_key, 'draft_email', EmailSchema, temperature=0.3)
+        edit_model = RoutedModel(api_key, 'edit_message_node', EmailSchema, temperature=0.3)
+        feedback_model = RoutedModel(api_key, 'human_in_loop', UserFeedbackSchema, temperature=0.3)
+        analysis_model = RoutedModel(api_key, 'analyze_job', JobAnalysisSchema, temperature=0)
+        fused_model = RoutedModel(api_key, 'draft_email', ParseAndDraftSchema, temperature=0.3)
+        variant_models = [
+            (tone, RoutedModel(api_key, 'draft_email', EmailSchema, temperature=temperature))
+            for temperature, tone in DRAFT_VARIANTS[:max(1, variants)]
+        ]
     except Exception as e:
         raise Exception(f"Failed to initialize Google AI model: {str(e)}")
     
-    def draft_email_node(state: AgentState) -> Dict[str, Any]:
-        """Generate email draft"""
-        try:
-            # Get parsed CV data
-            cv_data = state.get('parsed_data', {})
-            job_text = state.get('text', '')
-            
-            if not job_text:
-                raise ValueError("No job description provided")
-            
-            # Extract candidate info
-            candidate_name = cv_data.get('name', 'Candidate')
-            candidate_skills = cv_data.get('skills', [])
-            candidate_experience = cv_data.get('experience', [])
-            
-            # Create comprehensive prompt
-            prompt = f"""
-            Create a professional job application email based on the following information:
+    def parse_and_draft(state: AgentState, cv_text: str, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """Extract the CV profile and draft the email in one model call"""
+        job_text = state.get('text', '')
+        if not job_text:
+            raise ValueError("No job description provided")
+        matching_skills, missing_skills = skill_overlap(extract_skills(cv_text), job_text)
+        
+        prompt = f"""
+            Extract the candidate's profile from this CV/Resume and write their job application email.
 
-            CANDIDATE INFORMATION:
-            Name: {candidate_name}
-            Skills: {', '.join(candidate_skills[:10]) if candidate_skills else 'Various skills'}
-            Experience: {'. '.join(candidate_experience[:3]) if candidate_experience else 'Professional experience available'}
+            CV/RESUME:
+            {cv_text}
 
             JOB DESCRIPTION:
             {job_text}
 
-            Instructions:
+            Required skills the candidate has: {', '.join(matching_skills) if matching_skills else 'None identified'}
+            Required skills the candidate lacks: {', '.join(missing_skills) if missing_skills else 'None identified'}
+
+            Profile: extract the full name, all technical and soft skills, work experience descriptions,
+            relevant job titles held, certifications, location and notable projects.
+            If any information is not found, leave those fields empty.
+
+            Email:
             1. Extract recipient email from job posting (look for contact email, HR email, or application email)
             2. Create a compelling subject line that mentions the position
             3. Write a professional email body that:
                - Addresses the hiring manager professionally
                - Mentions the specific position being applied for
-               - Highlights 2-3 most relevant skills/experiences that match the job
+               - Highlights 2-3 most relevant skills/experiences that match the job (prefer the required skills the candidate has)
                - Shows enthusiasm for the role and company
                - Mentions that the resume is attached
                - Includes a professional closing
-            4. Calculate similarity score between candidate profile and job requirements (0.0 to 1.0)
-            5. Use the sender email from CV if available, otherwise use the provided Gmail address
+            4. Use the sender email from the CV if available
 
             Keep the email concise but compelling, around 150-200 words.
             """
+        
+        response = _invoke_model(fused_model, prompt, session_id, 'draft_email', deadline=deadline)
+        registry.inc("cv_fields", len(CV_FIELDS), source="fused")
+        parsed = response.profile
+        parsed.skills = merge_skills(parsed.skills, extract_skills(cv_text))
+        email_schema = response.email
+        if not email_schema.from_sender or email_schema.from_sender.strip() == "":
+            email_schema.from_sender = gmail_email
+        email_schema.similarity = skill_similarity(parsed.skills, job_text)
+        return {"parsed_data": parsed.model_dump(), "email_schema": email_schema, "alternates": [], "predrafted": True}
+    
+    cv_graphs: List[Any] = []
+    
+    def parse_cv_node(state: AgentState, config: "RunnableConfig") -> Dict[str, Any]:
+        """Parse the CV unless the caller already did"""
+        if state.get('parsed_data'):
+            return {}
+        deadline = from_config(config)
+        try:
+            if fused and len(variant_models) == 1:
+                # Only the text is loaded here; the draft call extracts the profile too
+                cv_text = load_cv_text(state.get('filepath', ''))
+                fields, confidence = parse_sections(cv_text)
+                fallbacks: List[str] = []
+                if any(confidence[field] < CONFIDENCE_THRESHOLD for field in CV_FIELDS):
+                    try:
+                        return parse_and_draft(state, cv_text, deadline)
+                    except DeadlineExceeded:
+                        # Out of time: the local fields are the profile, drafting falls back too
+                        fallbacks = record_fallback('parse_cv')
+                registry.inc("cv_fields", len(CV_FIELDS), source="local")
+                parsed = DataExtractSchema(**fields)
+                parsed.skills = merge_skills(parsed.skills, extract_skills(cv_text))
+                return {'parsed_data': parsed.model_dump(), 'fallbacks': fallbacks}
+            if not cv_graphs:
+                cv_graphs.append(create_cv_subgraph(api_key, session_id))
+            result = cv_graphs[0].invoke({"filepath": state.get('filepath', '')}, with_deadline({}, deadline))
+            return {'parsed_data': result['parsed_data'].model_dump(), 'fallbacks': result.get('fallbacks') or []}
+        except Exception as e:
+            raise Exception(f"Error parsing CV: {str(e)}")
+    
+    def analyze_job_node(state: AgentState, config: "RunnableConfig") -> Dict[str, Any]:
+        """Extract title, company, requirements, contact and deadline from the job posting"""
+        job_text = state.get('text', '')
+        if not job_text:
+            return {'job_analysis': {}}
+        try:
+            # Optional: it must not use up the time the draft needs
+            deadline = optional_stage(from_config(config), 'analyze_job')
+            return {'job_analysis': analyze_job(analysis_model, job_text, session_id, deadline)}
+        except DeadlineExceeded:
+            return {'job_analysis': {}, 'fallbacks': record_fallback('analyze_job')}
+        except Exception:
+            # Later prompts fall back to the full posting
+            return {'job_analysis': {}}
+    
+    def draft_best_of_n(prompt: str, prefix: str, cv_data: Dict[str, Any], job_text: str, contact_email: str = "",
+                        deadline: Optional[Deadline] = None):
+        """Draft all variants concurrently; return (winner, scored alternates).
+
+        Variants still running at the deadline are dropped; the best finished one wins.
+        """
+        def draft_variant(tone: str, variant_model):
+            return _invoke_model(variant_model, f"{prompt}\nWrite the email in a {tone} tone.", session_id,
+                                 'draft_email', prefix, deadline)
+        
+        with ThreadPoolExecutor(max_workers=len(variant_models)) as executor:
+            # Each variant thread records into the caller's session ledger
+            futures = [(tone, executor.submit(contextvars.copy_context().run, draft_variant, tone, variant_model))
+                       for tone, variant_model in variant_models]
+        
+        candidates = []
+        errors = []
+        for tone, future in futures:
+            try:
+                candidate = future.result()
+            except Exception as e:
+                errors.append(str(e))
+                continue
+            if not candidate.from_sender or candidate.from_sender.strip() == "":
+                candidate.from_sender = gmail_email
+            if contact_email and candidate.to in ("", "hr@company.com"):
+                candidate.to = contact_email
+            candidate.similarity = skill_similarity(cv_data.get('skills', []), job_text)
+            candidates.append((score_draft(candidate.model_dump(), cv_data, job_text), tone, candidate))
+        
+        if not candidates:
+            if deadline is not None:
+                deadline.check('draft_email')
+            raise ValueError(f"All {len(variant_models)} draft variants failed: {errors[0]}")
+        
+        candidates.sort(key=lambda item: item[0], reverse=True)
+        alternates = [dict(candidate.model_dump(), score=score, tone=tone) for score, tone, candidate in candidates]
+        return candidates[0][2], alternates
+    
+    def draft_email_node(state: AgentState, config: "RunnableConfig") -> Dict[str, Any]:
+        """Generate email draft"""
+        deadline = from_config(config)
+        try:
+            # Get parsed CV data
+            cv_data = state.get('parsed_data', {})
+            job_text = state.get('text', '')
+            
+            if not job_text:
+                raise ValueError("No job description provided")
             
-            email_schema = structured_model.invoke(prompt)
+            # The CV branch already drafted in the same call that parsed the CV
+            if state.get('predrafted'):
+                return {"predrafted": False}
+            
+            candidate_skills = cv_data.get('skills', [])
+            matching_skills, missing_skills = skill_overlap(candidate_skills, job_text)
+            job_analysis = state.get('job_analysis') or {}
+            
+            # Stable CV prefix first, the job-specific part last
+            prefix = prompt_prefix(cv_data)
+            prompt = prefix + f"""TASK: Draft the application email for this job.
+
+JOB DESCRIPTION:
+{format_job_analysis(job_analysis, job_text)}
+
+Required skills the candidate has: {', '.join(matching_skills) if matching_skills else 'None identified'}
+Required skills the candidate lacks: {', '.join(missing_skills) if missing_skills else 'None identified'}
+
+Instructions:
+1. Extract recipient email from the job description (contact email, HR email, or application email)
+2. Create a compelling subject line that mentions the position
+3. Write the email body following the guidelines above
+"""
+            
+            if len(variant_models) > 1:
+                email_schema, alternates = draft_best_of_n(prompt, prefix, cv_data, job_text,
+                                                           job_analysis.get('contact_email', ''), deadline)
+                return {"email_schema": email_schema, "alternates": alternates}
+            
+            email_schema = _invoke_model(structured_model, prompt, session_id, 'draft_email', prefix, deadline)
             
             # Ensure we have a sender email
             if not email_schema.from_sender or email_schema.from_sender.strip() == "":
                 email_schema.from_sender = gmail_email
-                
-            return {"email_schema": email_schema}
             
+            if job_analysis.get('contact_email') and email_schema.to in ("", "hr@company.com"):
+                email_schema.to = job_analysis['contact_email']
+            
+            # Computed locally from the skills taxonomy instead of asking the model
+            email_schema.similarity = skill_similarity(candidate_skills, job_text)
+                
+            return {"email_schema": email_schema, "alternates": []}
+        
+        except DeadlineExceeded:
+            # A plain local draft the user can still review and edit beats no draft
+            email_schema = template_email(state.get('parsed_data', {}), state.get('job_analysis') or {},
+                                          state.get('text', ''), gmail_email)
+            return {"email_schema": email_schema, "alternates": [], "fallbacks": record_fallback('draft_email')}
         except Exception as e:
             raise Exception(f"Error generating email draft: {str(e)}")
 
-    def human_in_loop(state: AgentState) -> Dict[str, Any]:
+    def human_in_loop(state: AgentState, config: "RunnableConfig") -> Dict[str, Any]:
         """Handle human feedback"""
         user_input = state.get("user_input", "")
         if not user_input:
             # This would be handled by the UI
             return {"user_input": "", "llm_decision": "approved"}
         
+        # Approvals and mechanical edits ("change subject to X") need no model call
+        if is_approval(user_input):
+            return {"llm_decision": "approved", "suggestions": "", "user_input": ""}
+        current_email = state.get("email_schema", {})
+        if hasattr(current_email, 'model_dump'):
+            current_email = current_email.model_dump()
+        if apply_edits(current_email, user_input) is not None:
+            return {"llm_decision": "needs_improvement", "suggestions": user_input, "user_input": ""}
+        
         try:
             feedback_prompt = f"""
             Analyze this user input about an email draft: "{user_input}"
@@ -210,40 +705,55 @@ def create_workflow(api_key: str, gmail_email: str, gmail_password: str):
             and extract their specific suggestions.
             """
             
-            feedback_analysis = feedback_model.invoke(feedback_prompt)
+            feedback_analysis = _invoke_model(feedback_model, feedback_prompt, session_id, 'human_in_loop',
+                                              deadline=from_config(config))
             return {
                 "llm_decision": feedback_analysis.llm_decision, 
                 "suggestions": feedback_analysis.suggestion, 
                 "user_input": ""
             }
+        except DeadlineExceeded:
+            # Never treat unread feedback as an approval; the edit step keeps the draft as it is
+            return {"llm_decision": "needs_improvement", "suggestions": user_input, "user_input": ""}
         except Exception as e:
             return {"llm_decision": "approved", "suggestions": "", "user_input": ""}
 
-    def edit_message_node(state: AgentState) -> Dict[str, Any]:
+    def edit_message_node(state: AgentState, config: "RunnableConfig") -> Dict[str, Any]:
         """Edit email based on feedback"""
         try:
             current_email = state.get("email_schema", {})
+            if hasattr(current_email, 'model_dump'):
+                current_email = current_email.model_dump()
             suggestions = state.get('suggestions', '')
             cv_data = state.get('parsed_data', {})
             job_text = state.get('text', '')
             
-            edit_prompt = f"""
-            Revise this email based on the user feedback:
+            # Mechanical edits are applied to the fields directly
+            edited = apply_edits(current_email, suggestions)
+            if edited is not None:
+                registry.inc("draft_edits", source="local")
+                return {"email_schema": EmailSchema(**edited), "user_input": ""}
+            registry.inc("draft_edits", source="llm")
+            
+            # Same stable CV prefix as the draft prompt, the changing parts last
+            prefix = prompt_prefix(cv_data)
+            edit_prompt = prefix + f"""TASK: Revise this email based on the user feedback.
 
-            CURRENT EMAIL:
-            Subject: {current_email.get('subject', '')}
-            Body: {current_email.get('body', '')}
+JOB DESCRIPTION:
+{format_job_analysis(state.get('job_analysis') or {}, job_text)}
 
-            USER FEEDBACK: {suggestions}
+CURRENT EMAIL:
+Subject: {current_email.get('subject', '')}
+Body: {current_email.get('body', '')}
 
-            CANDIDATE INFO: {cv_data}
-            JOB DESCRIPTION: {job_text}
+USER FEEDBACK: {suggestions}
 
-            Please revise the email to address the feedback while maintaining professionalism.
-            Keep all other fields (to, from_sender, similarity) the same unless specifically requested to change.
-            """
+Please revise the email to address the feedback while maintaining professionalism.
+Keep all other fields (to, from_sender, similarity) the same unless specifically requested to change.
+"""
             
-            updated_email = structured_model.invoke(edit_prompt)
+            updated_email = _invoke_model(edit_model, edit_prompt, session_id, 'edit_message_node', prefix,
+                                          from_config(config))
             
             # Preserve original fields if not changed
             if not updated_email.from_sender:
@@ -252,7 +762,10 @@ def create_workflow(api_key: str, gmail_email: str, gmail_password: str):
                 updated_email.to = current_email.get('to', 'hr@company.com')
                 
             return {"email_schema": updated_email, "user_input": ""}
-            
+        
+        except DeadlineExceeded:
+            return {"email_schema": state.get("email_schema", {}), "user_input": "",
+                    "fallbacks": record_fallback('edit_message_node')}
         except Exception as e:
             # Return original email if editing fails
             return {"email_schema": state.get("email_schema", {}), "user_input": ""}
@@ -262,7 +775,7 @@ def create_workflow(api_key: str, gmail_email: str, gmail_password: str):
         decision = state.get('llm_decision', 'approved')
         return 'send_email' if decision == 'approved' else 'edit_message_node'
 
-    def send_email_node(state: AgentState) -> Dict[str, Any]:
+    def send_email_node(state: AgentState, config: "RunnableConfig") -> Dict[str, Any]:
         """Send the email"""
         try:
             email_schema = state.get("email_schema", {})
@@ -280,7 +793,8 @@ def create_workflow(api_key: str, gmail_email: str, gmail_password: str):
                 email_obj, 
                 gmail_email, 
                 gmail_password, 
-                state.get('filepath', '')
+                state.get('filepath', ''),
+                from_config(config)
             )
             
             return {"status": result}
@@ -292,13 +806,18 @@ def create_workflow(api_key: str, gmail_email: str, gmail_password: str):
     graph = StateGraph(AgentState)
     
     # Add nodes
-    graph.add_node("draft_email", draft_email_node)
-    graph.add_node("human_in_loop", human_in_loop)
-    graph.add_node("edit_message_node", edit_message_node)
-    graph.add_node("send_email", send_email_node)
+    graph.add_node("parse_cv", instrument("parse_cv")(parse_cv_node))
+    graph.add_node("analyze_job", instrument("analyze_job")(analyze_job_node))
+    graph.add_node("draft_email", instrument("draft_email")(draft_email_node))
+    graph.add_node("human_in_loop", instrument("human_in_loop")(human_in_loop))
+    graph.add_node("edit_message_node", instrument("edit_message_node")(edit_message_node))
+    graph.add_node("send_email", instrument("send_email")(send_email_node))
 
     # Add edges
-    graph.add_edge(START, "draft_email")
+    # CV parsing and job analysis run concurrently; drafting waits for both
+    graph.add_edge(START, "parse_cv")
+    graph.add_edge(START, "analyze_job")
+    graph.add_edge(["parse_cv", "analyze_job"], "draft_email")
     graph.add_edge("draft_email", "human_in_loop")
     graph.add_conditional_edges(
         "human_in_loop", 
@@ -314,54 +833,58 @@ def create_workflow(api_key: str, gmail_email: str, gmail_password: str):
     return graph.compile(checkpointer=InMemorySaver())
 
 # ----------------- EMAIL UTILITIES -----------------
-def send_email_directly(email_draft, gmail_email: str, gmail_password: str, cv_path: str = "") -> str:
-    """Send email with current draft"""
+def build_email(email_draft, sender: str, cv_path: str = "") -> MIMEMultipart:
+    """MIME message for a draft (EmailSchema, dict or similar object) with the CV attached"""
+    # Handle both EmailSchema objects and dictionaries
+    if hasattr(email_draft, 'model_dump'):
+        email_data = email_draft.model_dump()
+    elif isinstance(email_draft, dict):
+        email_data = email_draft
+    else:
+        email_data = {
+            'to': getattr(email_draft, 'to', 'hr@company.com'),
+            'subject': getattr(email_draft, 'subject', 'Job Application'),
+            'body': getattr(email_draft, 'body', 'Please find my application attached.'),
+            'from_sender': getattr(email_draft, 'from_sender', sender)
+        }
+    
+    # Create email message
+    build_started = time.perf_counter()
+    msg = MIMEMultipart()
+    msg["From"] = sender
+    msg["To"] = email_data.get('to', 'hr@company.com')
+    msg["Subject"] = email_data.get('subject', 'Job Application')
+    
+    # Add email body
+    body = email_data.get('body', 'Please find my application attached.')
+    msg.attach(MIMEText(body, "plain"))
+    
+    # Attach CV if path exists and file is valid
+    if cv_path and os.path.exists(cv_path):
+        try:
+            with open(cv_path, "rb") as f:
+                pdf_data = f.read()
+            cv_attachment = MIMEApplication(pdf_data, _subtype="pdf")
+            cv_attachment.add_header("Content-Disposition", "attachment", filename="Resume.pdf")
+            msg.attach(cv_attachment)
+        except Exception as attach_error:
+            print(f"Warning: Could not attach CV: {attach_error}")
+    registry.observe("smtp_phase_seconds", time.perf_counter() - build_started, phase="build")
+    ledger_record("smtp", "build", time.perf_counter() - build_started, detail=msg["To"])
+    return msg
+
+@instrument("send_email_directly")
+def send_email_directly(email_draft, gmail_email: str, gmail_password: str, cv_path: str = "",
+                        deadline: Optional[Deadline] = None) -> str:
+    """Send email with current draft through the mail transport (transports.py), bounded by `deadline`"""
     try:
-        # Handle both EmailSchema objects and dictionaries
-        if hasattr(email_draft, 'model_dump'):
-            email_data = email_draft.model_dump()
-        elif isinstance(email_draft, dict):
-            email_data = email_draft
-        else:
-            email_data = {
-                'to': getattr(email_draft, 'to', 'hr@company.com'),
-                'subject': getattr(email_draft, 'subject', 'Job Application'),
-                'body': getattr(email_draft, 'body', 'Please find my application attached.'),
-                'from_sender': getattr(email_draft, 'from_sender', gmail_email)
-            }
-        
-        # Create email message
-        msg = MIMEMultipart()
-        msg["From"] = gmail_email
-        msg["To"] = email_data.get('to', 'hr@company.com')
-        msg["Subject"] = email_data.get('subject', 'Job Application')
-        
-        # Add email body
-        body = email_data.get('body', 'Please find my application attached.')
-        msg.attach(MIMEText(body, "plain"))
-        
-        # Attach CV if path exists and file is valid
-        if cv_path and os.path.exists(cv_path):
-            try:
-                with open(cv_path, "rb") as f:
-                    pdf_data = f.read()
-                cv_attachment = MIMEApplication(pdf_data, _subtype="pdf")
-                cv_attachment.add_header("Content-Disposition", "attachment", filename="Resume.pdf")
-                msg.attach(cv_attachment)
-            except Exception as attach_error:
-                print(f"Warning: Could not attach CV: {attach_error}")
-        
-        # Send email
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
-            server.starttls()
-            server.login(gmail_email, gmail_password)
-            server.send_message(msg)
-        
-        return f"Email sent successfully to {email_data.get('to', 'recipient')}"
+        msg = build_email(email_draft, gmail_email, cv_path)
+        get_transport().send([msg], gmail_email, gmail_password, deadline)
+        return f"Email sent successfully to {msg['To'] or 'recipient'}"
         
     except smtplib.SMTPAuthenticationError:
         raise Exception("Gmail authentication failed. Please check your email and app password.")
     except smtplib.SMTPException as e:
         raise Exception(f"SMTP error occurred: {str(e)}")
     except Exception as e:
-        raise Exception(f"Failed to send email: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Failed to send email: {str(e)}")
@@ -1,5 +1,6 @@
 import streamlit as st
-from ui import initialize_session_state, show_progress, step_1_configuration, step_2_upload_cv, step_3_job_input, step_4_review_and_send
+import metrics
+from ui import initialize_session_state, session_ledger, show_progress, step_1_configuration, step_2_upload_cv, step_3_job_input, step_4_review_and_send
 
 # Page configuration
 st.set_page_config(
@@ -396,6 +397,9 @@ def main():
         # Initialize session state
         initialize_session_state()
         
+        # Expose /metrics when METRICS_PORT is set (started once per process)
+        metrics.serve()
+        
         # Additional CSS for enhanced styling
         st.markdown("""
         <style>
@@ -496,7 +500,7 @@ def main():
                     if st.button("🏠 Go to Start", type="secondary"):
                         # Reset to beginning
                         for key in list(st.session_state.keys()):
-                            if key not in ['api_key', 'gmail_email', 'gmail_password']:
+                            if key not in ['api_key', 'gmail_email', 'gmail_password', 'ledger']:
                                 del st.session_state[key]
                         initialize_session_state()
                         st.rerun()
@@ -539,4 +543,6 @@ def main():
             st.rerun()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Full script runs are timed (and recorded in the session ledger) here; fragment-only reruns by ui.timed_fragment
+    with metrics.registry.timer("ui_run_seconds", scope="app"), session_ledger():
+        main()
\ No newline at end of file
@@ -0,0 +1,613 @@
+"""Offline benchmark suite.
+
+Runs the CV subgraph and the email workflow against a deterministic fake
+LLM and a local SMTP sink, so no API key or network is needed.
+
+    python benchmark.py nodes --cv-pages 1 5 20 --concurrency 1 4 16 --output bench.json
+    python benchmark.py nodes --compare bench.json      # fail on regressions
+    python benchmark.py nodes --cassette calls.jsonl    # replay recorded Gemini calls instead
+    python benchmark.py startup                         # cold start / import time
+    python benchmark.py ranking --postings 10000        # local job feed ranking
+    python benchmark.py skills --megabytes 1 8          # Aho-Corasick skill extraction
+    python benchmark.py deadline --stall-every 5        # tail latency with stalled model calls
+    python benchmark.py load --sessions 1 8 32          # concurrent Streamlit sessions (loadtest.py)
+    python benchmark.py mail --batch-sizes 1 10 50      # MIME construction vs each mail transport
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import threading
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from agents import build_email, create_cv_subgraph, create_workflow
+from cassette import replay
+from deadline import Deadline, with_deadline
+from fakes import FakeChatModel, PROSE_CV_LINES, SMTPSink, make_cv_pdf, patch_llm, patch_smtp
+from loadtest import add_arguments as add_load_arguments, bench_load
+from pipeline import draft_application, get_fallbacks
+from ranking import match_matrix, rank_jobs
+from routing import DEFAULT_ROUTES, Router, set_router
+from skills import TAXONOMY, SkillExtractor
+from scheduler import LLMScheduler, set_scheduler
+from transports import MailboxTransport, MemoryTransport, SMTPTransport, Transport
+
+NODES = ["load_data", "parse_data", "parse_cv", "analyze_job", "draft_email", "human_in_loop", "edit_message_node", "send_email"]
+
+# ----------------- HELPERS -----------------
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """count / mean / p50 / p95 / max of a list of seconds"""
+    if not samples:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": percentile(0.50),
+        "p95": percentile(0.95),
+        "max": ordered[-1],
+    }
+
+
+def timed_stream(graph, graph_input, config=None) -> List[tuple]:
+    """Run a graph and return (node, seconds) for every node update in order"""
+    timings = []
+    last = time.perf_counter()
+    for update in graph.stream(graph_input, config, stream_mode="updates"):
+        now = time.perf_counter()
+        for node in update:
+            timings.append((node, now - last))
+        last = now
+    return timings
+
+# ----------------- NODE BENCHMARK -----------------
+def run_application(cv_path: str, run_id: int) -> List[tuple]:
+    """One full application: parse the CV, draft, one revision round, send"""
+    session_id = f"bench-{run_id}"
+    timings = timed_stream(create_cv_subgraph("fake-key", session_id), {"filepath": cv_path})
+
+    wf = create_workflow("fake-key", "bench@example.com", "app-password", session_id)
+    config = {"configurable": {"thread_id": f"bench-{run_id}"}}
+    graph_input = {
+        "filepath": cv_path,
+        "text": "Backend Engineer at Example GmbH. Python, SQL, Docker. Apply to jobs@example.com",
+        "parsed_data": {"name": "Jane Doe", "skills": ["Python", "SQL"], "experience": []},
+        # A revision request makes the graph visit edit_message_node once
+        "user_input": "Please make it shorter and mention Docker",
+    }
+    timings += timed_stream(wf, graph_input, config)
+    return timings
+
+
+def bench_nodes(args) -> Dict[str, Any]:
+    set_scheduler(LLMScheduler(requests_per_minute=1e9, tokens_per_minute=1e12))
+    results = []
+    # Recorded responses and latencies when a cassette is given, the deterministic fake otherwise
+    llm_patch = replay(args.cassette, args.time_scale) if args.cassette else \
+        patch_llm(latency=args.latency, latency_per_1k_tokens=args.latency_per_1k_tokens, output_tokens=args.output_tokens)
+    with tempfile.TemporaryDirectory() as tmp, SMTPSink() as sink, patch_smtp(sink), llm_patch as llm:
+        for pages in args.cv_pages:
+            cv_path = make_cv_pdf(os.path.join(tmp, f"cv_{pages}.pdf"), pages=pages)
+            for concurrency in args.concurrency:
+                runs = max(args.runs, concurrency)
+                llm.reset()
+                delivered_before = len(sink.messages)
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                    all_timings = list(executor.map(lambda i: run_application(cv_path, i), range(runs)))
+                wall = time.perf_counter() - started
+
+                per_node: Dict[str, List[float]] = {node: [] for node in NODES}
+                for timings in all_timings:
+                    for node, seconds in timings:
+                        per_node.setdefault(node, []).append(seconds)
+
+                result = {
+                    "cv_pages": pages,
+                    "cv_bytes": os.path.getsize(cv_path),
+                    "concurrency": concurrency,
+                    "runs": runs,
+                    "wall_seconds": wall,
+                    "throughput_per_second": runs / wall if wall else 0.0,
+                    "llm_calls": len(llm.calls),
+                    "input_tokens": sum(call["input_tokens"] for call in llm.calls),
+                    "output_tokens": sum(call["output_tokens"] for call in llm.calls),
+                    "emails_delivered": len(sink.messages) - delivered_before,
+                    "nodes": {node: summarize(samples) for node, samples in per_node.items()},
+                }
+                results.append(result)
+                print(f"pages={pages:<3} concurrency={concurrency:<3} runs={runs:<4} "
+                      f"wall={wall:.3f}s throughput={result['throughput_per_second']:.2f}/s", file=sys.stderr)
+    return {"benchmark": "nodes", "results": results}
+
+# ----------------- STARTUP BENCHMARK -----------------
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+FIRST_PAINT_SCRIPT = """
+import json, logging, time
+started = time.perf_counter()
+logging.disable(logging.WARNING)
+from streamlit.testing.v1 import AppTest
+framework = time.perf_counter()
+at = AppTest.from_file({app!r}, default_timeout=60).run()
+done = time.perf_counter()
+print(json.dumps({{"framework_seconds": framework - started, "first_paint_seconds": done - framework,
+                  "errors": [str(e.value) for e in at.exception]}}))
+"""
+
+WARMUP_SCRIPT = """
+import json, warmup
+warmup.start()
+warmup.wait()
+print(json.dumps(warmup.import_times()))
+"""
+
+
+def _python(code: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True)
+
+
+def import_profile(module: str, top: int) -> Dict[str, Any]:
+    """Parse `python -X importtime` output for `module`"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=HERE, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    total = next((cumulative for name, _, cumulative in rows if name.strip() == module), 0)
+    # Direct imports of `module` (one indentation level in importtime's tree)
+    packages = sorted((row for row in rows if row[0].startswith("   ") and not row[0].startswith("     ")),
+                      key=lambda row: -row[2])
+    return {
+        "module": module,
+        "total_seconds": total / 1e6,
+        "slowest": [{"module": name.strip(), "cumulative_seconds": cumulative / 1e6}
+                    for name, _, cumulative in packages[:top]],
+    }
+
+
+def bench_startup(args) -> Dict[str, Any]:
+    first_paint = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        child = json.loads(_python(FIRST_PAINT_SCRIPT.format(app=os.path.join(HERE, "app.py"))).stdout)
+        child["process_seconds"] = time.perf_counter() - started
+        first_paint.append(child)
+        print(f"first paint {child['first_paint_seconds']:.3f}s (process {child['process_seconds']:.3f}s)",
+              file=sys.stderr)
+
+    return {
+        "benchmark": "startup",
+        "first_paint_seconds": summarize([run["first_paint_seconds"] for run in first_paint]),
+        "process_seconds": summarize([run["process_seconds"] for run in first_paint]),
+        "errors": sorted({error for run in first_paint for error in run["errors"]}),
+        "imports": [import_profile(module, args.top) for module in ("ui", "agents")],
+        "deferred_import_seconds": json.loads(_python(WARMUP_SCRIPT).stdout),
+    }
+
+# ----------------- RANKING BENCHMARK -----------------
+RANKING_CV = {
+    "skills": ["Python", "SQL", "Docker", "Kubernetes", "AWS", "React", "Machine Learning", "CI/CD"],
+    "relevant_job_titles": ["Backend Engineer", "Data Engineer"],
+    "certificates": ["AWS Certified Developer"],
+}
+
+
+def synthetic_feed(count: int, words: int, seed: int = 7):
+    """Deterministic stream of (job_id, job_text) postings mentioning a few random skills"""
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(20000)]
+    skills = [skill.lower() for skill in RANKING_CV["skills"]] + ["java", "go", "rust", "excel"]
+    for index in range(count):
+        tokens = rng.choices(vocabulary, k=words) + rng.sample(skills, k=rng.randint(0, 6))
+        rng.shuffle(tokens)
+        yield f"job-{index}", " ".join(tokens)
+
+
+def bench_ranking(args) -> Dict[str, Any]:
+    # Generating the synthetic feed is not part of ranking; measure it once and subtract it
+    started = time.perf_counter()
+    for _ in synthetic_feed(args.postings, args.words):
+        pass
+    feed_seconds = time.perf_counter() - started
+
+    samples = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        top = rank_jobs(synthetic_feed(args.postings, args.words), RANKING_CV, args.top_k, args.chunk_size)
+        samples.append(max(0.0, time.perf_counter() - started - feed_seconds))
+        print(f"ranked {args.postings} postings in {samples[-1]:.3f}s", file=sys.stderr)
+
+    # Multi-CV batch: every CV against every job in one matrix
+    skills = RANKING_CV["skills"]
+    cvs = [dict(RANKING_CV, skills=skills[i % len(skills):]) for i in range(args.cvs)]
+    jobs = [text for _, text in synthetic_feed(args.matrix_jobs, args.words, seed=11)]
+    matrix_samples = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        match_matrix(jobs, cvs)
+        matrix_samples.append(time.perf_counter() - started)
+    print(f"scored {args.cvs} CVs x {args.matrix_jobs} jobs in {min(matrix_samples):.3f}s", file=sys.stderr)
+
+    # Separate pass: tracemalloc slows allocation-heavy code down
+    tracemalloc.start()
+    rank_jobs(synthetic_feed(args.postings, args.words), RANKING_CV, args.top_k, args.chunk_size)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "benchmark": "ranking",
+        "postings": args.postings,
+        "seconds": summarize(samples),
+        "feed_generation_seconds": feed_seconds,
+        "postings_per_second": args.postings / max(summarize(samples)["p50"], 1e-9),
+        "peak_memory_mb": peak / 1e6,
+        "cv_matrix": {"cvs": args.cvs, "jobs": args.matrix_jobs, "seconds": summarize(matrix_samples)},
+        "top": [{"id": job["id"], "score": job["score"]} for job in top],
+    }
+
+# ----------------- SKILLS BENCHMARK -----------------
+def synthetic_text(megabytes: float, seed: int = 3) -> str:
+    """Prose-like text of roughly `megabytes` MB with taxonomy phrases sprinkled in"""
+    rng = random.Random(seed)
+    vocabulary = [f"word{i}" for i in range(5000)]
+    phrases = [phrase for canonical, synonyms in TAXONOMY.items() for phrase in [canonical, *synonyms]]
+    parts, size = [], 0
+    while size < megabytes * 1_000_000:
+        sentence = " ".join(rng.choices(vocabulary, k=12) + [rng.choice(phrases)]) + ". "
+        parts.append(sentence)
+        size += len(sentence)
+    return "".join(parts)
+
+
+def naive_counts(patterns: List[tuple], text: str) -> Dict[str, int]:
+    """Reference: one full regex scan of the text per synonym"""
+    lowered = text.lower()
+    counts: Dict[str, int] = {}
+    for canonical, pattern in patterns:
+        found = len(pattern.findall(lowered))
+        if found:
+            counts[canonical] = counts.get(canonical, 0) + found
+    return counts
+
+
+def bench_skills(args) -> Dict[str, Any]:
+    started = time.perf_counter()
+    extractor = SkillExtractor()
+    build_seconds = time.perf_counter() - started
+    patterns = [(canonical, re.compile(r"(?<![\w+#])" + re.escape(phrase.lower()) + r"(?![\w+#])"))
+                for canonical, synonyms in TAXONOMY.items() for phrase in [canonical, *synonyms]]
+
+    results = []
+    for megabytes in args.megabytes:
+        text = synthetic_text(megabytes)
+        samples = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            found = extractor.counts(text)
+            samples.append(time.perf_counter() - started)
+        stats = summarize(samples)
+        result = {
+            "megabytes": len(text) / 1e6,
+            "seconds": stats,
+            "megabytes_per_second": len(text) / 1e6 / stats["p50"] if stats["p50"] else 0.0,
+            "skills_found": len(found),
+            "mentions_found": sum(found.values()),
+        }
+        # The per-synonym reference takes seconds per MB, so only small inputs get it
+        if megabytes <= args.reference_megabytes:
+            started = time.perf_counter()
+            naive = naive_counts(patterns, text)
+            result["naive_regex_seconds"] = time.perf_counter() - started
+            result["naive_mentions_found"] = sum(naive.values())
+        results.append(result)
+        print(f"{len(text) / 1e6:.1f} MB: automaton {stats['p50']:.3f}s"
+              + (f", regex per synonym {result['naive_regex_seconds']:.3f}s" if "naive_regex_seconds" in result else ""),
+              file=sys.stderr)
+    return {"benchmark": "skills", "build_seconds": build_seconds, "results": results}
+
+# ----------------- DEADLINE BENCHMARK -----------------
+DEADLINE_JOB = "Backend Engineer at Example GmbH. Python, SQL, Docker. Apply to jobs@example.com"
+
+
+def run_bounded(cv_path: str, run_id: str, seconds: Optional[float],
+                deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+    """Parse the CV and draft in one workflow run; returns seconds and the stages that fell back"""
+    deadline = deadline or (Deadline(seconds) if seconds else None)
+    wf = create_workflow("fake-key", "bench@example.com", "app-password", f"bench-{run_id}")
+    config = {"configurable": {"thread_id": f"bench-{run_id}"}}
+    started = time.perf_counter()
+    draft = draft_application(wf, DEADLINE_JOB, {}, cv_path, with_deadline(config, deadline))
+    return {"seconds": time.perf_counter() - started, "drafted": bool(draft), "fallbacks": get_fallbacks(wf, config)}
+
+
+def bench_deadline(args) -> Dict[str, Any]:
+    set_scheduler(LLMScheduler(requests_per_minute=1e9, tokens_per_minute=1e12))
+    # Route budgets scaled down with the deadline, so optional stages get their share of it
+    set_router(Router({node: (model, budget * args.route_budget_scale) for node, (model, budget) in DEFAULT_ROUTES.items()}))
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp, \
+            patch_llm(latency=args.latency, stall_every=args.stall_every, stall_seconds=args.stall_seconds):
+        # A CV without headings, so parsing needs the model too
+        cv_path = make_cv_pdf(os.path.join(tmp, "cv.pdf"), lines_per_page=len(PROSE_CV_LINES), cv_lines=PROSE_CV_LINES)
+        for mode, seconds in (("unbounded", None), ("deadline", args.deadline)):
+            FakeChatModel.reset()
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+                runs = list(executor.map(lambda i: run_bounded(cv_path, f"{mode}-{i}", seconds), range(args.runs)))
+            wall = time.perf_counter() - started
+            fallbacks: Dict[str, int] = {}
+            for run in runs:
+                for stage in run["fallbacks"]:
+                    fallbacks[stage] = fallbacks.get(stage, 0) + 1
+            results[mode] = {
+                "wall_seconds": wall,
+                "seconds": summarize([run["seconds"] for run in runs]),
+                "p99": sorted(run["seconds"] for run in runs)[min(len(runs) - 1, int(0.99 * len(runs)))],
+                "drafted": sum(run["drafted"] for run in runs),
+                "fallbacks": fallbacks,
+            }
+            stats = results[mode]["seconds"]
+            print(f"{mode:<9} p50={stats['p50']:.3f}s p95={stats['p95']:.3f}s max={stats['max']:.3f}s "
+                  f"drafted={results[mode]['drafted']}/{args.runs} fallbacks={fallbacks}", file=sys.stderr)
+
+        # Cancelling mid-call: every model call stalls, the run must return promptly after cancel()
+        FakeChatModel.configure(stall_every=1)
+        cancel_samples = []
+        for index in range(args.cancel_runs):
+            deadline = Deadline(args.stall_seconds * 10)
+            threading.Timer(args.cancel_after, deadline.cancel).start()
+            run = run_bounded(cv_path, f"cancel-{index}", None, deadline)
+            cancel_samples.append(max(0.0, run["seconds"] - args.cancel_after))
+        print(f"cancel    returned {summarize(cancel_samples)['max']:.3f}s after cancel() at most", file=sys.stderr)
+
+    overruns = [max(0.0, results["deadline"]["seconds"]["max"] - args.deadline)]
+    violations = [f"a run took {overruns[0]:.3f}s longer than its {args.deadline}s deadline"] \
+        if overruns[0] > args.max_overrun else []
+    violations += [f"a cancelled run took {late:.3f}s to return" for late in cancel_samples if late > args.max_overrun][:1]
+    for message in violations:
+        print(f"VIOLATION {message}", file=sys.stderr)
+    return {
+        "benchmark": "deadline",
+        "deadline_seconds": args.deadline,
+        "results": results,
+        "cancel_seconds": summarize(cancel_samples),
+        "violations": violations,
+    }
+
+# ----------------- MAIL BENCHMARK -----------------
+MAIL_TRANSPORTS = ["memory", "maildir", "mbox", "smtp", "smtp-unpooled"]
+
+
+def make_transport(name: str, tmp: str, sink: SMTPSink) -> Transport:
+    """Fresh transport for the mail benchmark; SMTP ones talk to the local sink"""
+    if name == "memory":
+        return MemoryTransport()
+    if name in ("maildir", "mbox"):
+        return MailboxTransport(os.path.join(tmp, f"{name}-{time.monotonic_ns()}"), name)
+    return SMTPTransport(sink.host, sink.port, starttls=False, pool_size=0 if name == "smtp-unpooled" else 2)
+
+
+def bench_mail(args) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp, SMTPSink() as sink:
+        cv_path = make_cv_pdf(os.path.join(tmp, "cv.pdf"), pages=args.cv_pages)
+        build_samples, messages = [], []
+        for index in range(args.messages):
+            draft = {"to": f"jobs{index}@example.com", "subject": f"Application {index}", "body": DEADLINE_JOB}
+            started = time.perf_counter()
+            messages.append(build_email(draft, "bench@example.com", cv_path))
+            build_samples.append(time.perf_counter() - started)
+        print(f"build     {summarize(build_samples)['p50'] * 1000:.3f}ms per message", file=sys.stderr)
+
+        results = []
+        for name in args.transports:
+            for batch_size in args.batch_sizes:
+                transport = make_transport(name, tmp, sink)
+                batches = [messages[i:i + batch_size] for i in range(0, len(messages), batch_size)]
+                samples = []
+                started = time.perf_counter()
+                for batch in batches:
+                    batch_started = time.perf_counter()
+                    transport.send(batch, "bench@example.com", "app-password")
+                    samples.append(time.perf_counter() - batch_started)
+                wall = time.perf_counter() - started
+                stats = transport.stats()
+                transport.close()
+                results.append({
+                    "transport": name,
+                    "batch_size": batch_size,
+                    "messages": len(messages),
+                    "batch_seconds": summarize(samples),
+                    "seconds_per_message": wall / len(messages),
+                    "messages_per_second": len(messages) / wall if wall else 0.0,
+                    "connections_opened": stats.get("connections_opened", 0),
+                })
+                print(f"{name:<13} batch={batch_size:<4} {wall / len(messages) * 1000:.3f}ms per message "
+                      f"({len(messages) / wall:.0f}/s)", file=sys.stderr)
+    return {
+        "benchmark": "mail",
+        "message_bytes": len(messages[0].as_bytes()) if messages else 0,
+        "build_seconds": summarize(build_samples),
+        "results": results,
+    }
+
+# ----------------- REGRESSION COMPARISON -----------------
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Return messages for p50 latencies that regressed by more than `threshold`"""
+    def key(result):
+        return (result["cv_pages"], result["concurrency"])
+
+    regressions = []
+    if current["benchmark"] == "skills":
+        previous = {round(result["megabytes"]): result for result in baseline.get("results", [])}
+        for result in current["results"]:
+            old_p50 = previous.get(round(result["megabytes"]), {}).get("seconds", {}).get("p50", 0.0)
+            if old_p50 > 0 and result["seconds"]["p50"] > old_p50 * (1 + threshold):
+                regressions.append(f"skills {result['megabytes']:.0f}MB p50 "
+                                   f"{old_p50 * 1000:.0f}ms -> {result['seconds']['p50'] * 1000:.0f}ms")
+        return regressions
+    if current["benchmark"] == "ranking":
+        old_p50 = baseline.get("seconds", {}).get("p50", 0.0)
+        new_p50 = current["seconds"]["p50"]
+        if old_p50 > 0 and new_p50 > old_p50 * (1 + threshold):
+            regressions.append(f"ranking p50 {old_p50 * 1000:.0f}ms -> {new_p50 * 1000:.0f}ms")
+        return regressions
+    if current["benchmark"] == "deadline":
+        old_p95 = baseline.get("results", {}).get("deadline", {}).get("seconds", {}).get("p95", 0.0)
+        new_p95 = current["results"]["deadline"]["seconds"]["p95"]
+        if old_p95 > 0 and new_p95 > old_p95 * (1 + threshold):
+            regressions.append(f"deadline p95 {old_p95 * 1000:.0f}ms -> {new_p95 * 1000:.0f}ms")
+        return regressions
+    if current["benchmark"] == "load":
+        previous = {result["sessions"]: result for result in baseline.get("results", [])}
+        for result in current["results"]:
+            old_steps = previous.get(result["sessions"], {}).get("steps", {})
+            for step, stats in result["steps"].items():
+                old_p95 = old_steps.get(step, {}).get("seconds", {}).get("p95", 0.0)
+                if old_p95 > 0 and stats["seconds"]["p95"] > old_p95 * (1 + threshold):
+                    regressions.append(f"load {step} sessions={result['sessions']}: "
+                                       f"p95 {old_p95 * 1000:.0f}ms -> {stats['seconds']['p95'] * 1000:.0f}ms")
+        return regressions
+    if current["benchmark"] == "mail":
+        previous = {(result["transport"], result["batch_size"]): result for result in baseline.get("results", [])}
+        for result in current["results"]:
+            old = previous.get((result["transport"], result["batch_size"]), {}).get("seconds_per_message", 0.0)
+            if old > 0 and result["seconds_per_message"] > old * (1 + threshold):
+                regressions.append(f"mail {result['transport']} batch={result['batch_size']}: "
+                                   f"{old * 1000:.3f}ms -> {result['seconds_per_message'] * 1000:.3f}ms per message")
+        return regressions
+    if current["benchmark"] == "startup":
+        old_p50 = baseline.get("first_paint_seconds", {}).get("p50", 0.0)
+        new_p50 = current["first_paint_seconds"]["p50"]
+        if old_p50 > 0 and new_p50 > old_p50 * (1 + threshold):
+            regressions.append(f"first paint p50 {old_p50 * 1000:.0f}ms -> {new_p50 * 1000:.0f}ms")
+        return regressions
+
+    previous = {key(result): result for result in baseline.get("results", [])}
+    for result in current["results"]:
+        old = previous.get(key(result))
+        if not old:
+            continue
+        for node, stats in result["nodes"].items():
+            old_p50 = old["nodes"].get(node, {}).get("p50", 0.0)
+            if old_p50 > 0 and stats["p50"] > old_p50 * (1 + threshold):
+                regressions.append(
+                    f"{node} pages={result['cv_pages']} concurrency={result['concurrency']}: "
+                    f"p50 {old_p50 * 1000:.1f}ms -> {stats['p50'] * 1000:.1f}ms"
+                )
+    return regressions
+
+# ----------------- ENTRY POINT -----------------
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Offline performance benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    nodes = subparsers.add_parser("nodes", help="Per-node latency and throughput of both graphs")
+    nodes.add_argument("--cv-pages", type=int, nargs="+", default=[1, 5, 20])
+    nodes.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    nodes.add_argument("--runs", type=int, default=8, help="Applications per configuration (at least concurrency)")
+    nodes.add_argument("--latency", type=float, default=0.05, help="Fake LLM base latency in seconds")
+    nodes.add_argument("--latency-per-1k-tokens", type=float, default=0.01)
+    nodes.add_argument("--output-tokens", type=int, default=200)
+    nodes.add_argument("--cassette", help="Replay the model calls recorded in this cassette (cassette.py)")
+    nodes.add_argument("--time-scale", type=float, default=1.0,
+                       help="With --cassette, multiply the recorded latencies by this (0 = no waiting)")
+    nodes.set_defaults(func=bench_nodes)
+
+    startup = subparsers.add_parser("startup", help="Cold-start time to first paint and import profile")
+    startup.add_argument("--runs", type=int, default=5)
+    startup.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    startup.set_defaults(func=bench_startup)
+
+    ranking = subparsers.add_parser("ranking", help="Local ranking of a synthetic job feed against a CV")
+    ranking.add_argument("--postings", type=int, default=10000)
+    ranking.add_argument("--words", type=int, default=400, help="Words per synthetic posting")
+    ranking.add_argument("--top-k", type=int, default=20)
+    ranking.add_argument("--chunk-size", type=int, default=1000)
+    ranking.add_argument("--runs", type=int, default=3)
+    ranking.add_argument("--cvs", type=int, default=5, help="CVs in the CV x job matrix measurement")
+    ranking.add_argument("--matrix-jobs", type=int, default=200, help="Jobs in the CV x job matrix measurement")
+    ranking.set_defaults(func=bench_ranking)
+
+    skills = subparsers.add_parser("skills", help="Aho-Corasick skill extraction on MB-scale text")
+    skills.add_argument("--megabytes", type=float, nargs="+", default=[1, 8])
+    skills.add_argument("--runs", type=int, default=3)
+    skills.add_argument("--reference-megabytes", type=float, default=1,
+                        help="Also time the regex-per-synonym reference up to this input size")
+    skills.set_defaults(func=bench_skills)
+
+    deadline = subparsers.add_parser("deadline", help="End-to-end tail latency with stalled model calls")
+    deadline.add_argument("--runs", type=int, default=20, help="Applications per mode")
+    deadline.add_argument("--concurrency", type=int, default=4)
+    deadline.add_argument("--deadline", type=float, default=1.0, help="Time budget of one application in seconds")
+    deadline.add_argument("--route-budget-scale", type=float, default=0.02,
+                          help="Scale of the route latency budgets (optional stages get twice theirs)")
+    deadline.add_argument("--latency", type=float, default=0.05, help="Fake LLM base latency in seconds")
+    deadline.add_argument("--stall-every", type=int, default=5, help="Every Nth model call stalls")
+    deadline.add_argument("--stall-seconds", type=float, default=2.0)
+    deadline.add_argument("--cancel-runs", type=int, default=3)
+    deadline.add_argument("--cancel-after", type=float, default=0.2, help="Seconds before cancel() is called")
+    deadline.add_argument("--max-overrun", type=float, default=0.25,
+                          help="Seconds a run may take past its deadline or cancel() before it counts as a violation")
+    deadline.set_defaults(func=bench_deadline)
+
+    load = subparsers.add_parser("load", help="Concurrent Streamlit sessions driven through all four steps")
+    add_load_arguments(load)
+    load.set_defaults(func=bench_load)
+
+    mail = subparsers.add_parser("mail", help="MIME construction and delivery through each mail transport")
+    mail.add_argument("--messages", type=int, default=200)
+    mail.add_argument("--cv-pages", type=int, default=2, help="Pages of the attached CV")
+    mail.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 50])
+    mail.add_argument("--transports", nargs="+", choices=MAIL_TRANSPORTS, default=MAIL_TRANSPORTS)
+    mail.set_defaults(func=bench_mail)
+
+    for sub in subparsers.choices.values():
+        sub.add_argument("--output", help="Write results as JSON to this file")
+        sub.add_argument("--compare", help="Baseline JSON to compare against")
+        sub.add_argument("--threshold", type=float, default=0.2, help="Allowed relative slowdown")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    report = args.func(args)
+    report["meta"] = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "args": {k: v for k, v in vars(args).items() if k != "func"},
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        return 1 if regressions or report.get("violations") else 0
+    return 1 if report.get("violations") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
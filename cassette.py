@@ -0,0 +1,340 @@
+"""Record / replay of structured model calls.
+
+In record mode every structured Gemini call made by agents.py is captured to
+a cassette: one compact JSON line per call with the schema, model,
+temperature, prompt hash and size, token usage, latency and the parsed
+response (or the error). Replay mode serves those responses back without
+network or API key, sleeping the recorded latency times a scale factor.
+
+    LLM_CASSETTE=calls.jsonl LLM_CASSETTE_MODE=record streamlit run app.py
+    LLM_CASSETTE=calls.jsonl LLM_CASSETTE_MODE=replay CASSETTE_TIME_SCALE=0.1 python cli.py ...
+    python cassette.py stats calls.jsonl --compare old.jsonl   # prompt size regressions
+
+Replay matches a call by schema, model, temperature and prompt hash, then by
+schema and prompt hash, then by schema alone, so runs with changed prompts
+(or synthetic CVs) still get realistic responses; the match levels are
+counted in the cassette_requests metric. Prompts are stored as hashes and
+sizes only, unless CASSETTE_PROMPTS=1.
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import atexit
+import hashlib
+import argparse
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from metrics import registry
+
+MATCH_LEVELS = ("exact", "prompt", "schema")
+
+class CassetteMiss(LookupError):
+    """Replay found no recorded call for a schema"""
+
+def schema_key(schema) -> str:
+    """Schema name plus its fields (partial CV schemas share a name)"""
+    return f"{schema.__name__}[{','.join(schema.model_fields)}]"
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+def _open(path: str, mode: str):
+    return gzip.open(path, mode + "t", encoding="utf-8") if path.endswith(".gz") else open(path, mode, encoding="utf-8")
+
+def _line(entry: Dict[str, Any]) -> str:
+    return json.dumps(entry, sort_keys=True, separators=(",", ":"), ensure_ascii=False) + "\n"
+
+# ----------------- CASSETTE -----------------
+class Cassette:
+    """Recorded calls of one cassette file, with the lookup used in replay"""
+
+    def __init__(self, path: str, mode: str = "replay"):
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self.entries: List[Dict[str, Any]] = []
+        # lookup key -> entries, and the next one to serve for that key
+        self._index: Dict[tuple, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[tuple, int] = {}
+        self._stats = {"requests": 0, "misses": 0, **{level: 0 for level in MATCH_LEVELS}}
+        if mode == "replay":
+            with _open(path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        self._add(json.loads(line))
+        else:
+            # Appended call by call so a crash keeps what was recorded; save() sorts it
+            with _open(path, "w"):
+                pass
+
+    @staticmethod
+    def _keys(schema: str, model: str, temperature: float, sha: str) -> Dict[str, tuple]:
+        return {"exact": (schema, model, temperature, sha), "prompt": (schema, sha), "schema": (schema,)}
+
+    def _add(self, entry: Dict[str, Any]):
+        self.entries.append(entry)
+        keys = self._keys(entry["schema"], entry["model"], entry["temperature"], entry["prompt_sha"])
+        for key in keys.values():
+            self._index.setdefault(key, []).append(entry)
+
+    def record(self, entry: Dict[str, Any]):
+        with self._lock:
+            entry["seq"] = len(self.entries)
+            self._add(entry)
+            with _open(self.path, "a") as f:
+                f.write(_line(entry))
+        registry.inc("cassette_recorded", schema=entry["schema"].split("[")[0])
+
+    def find(self, schema: str, model: str, temperature: float, sha: str) -> Tuple[Dict[str, Any], str]:
+        """(entry, match level) for a call; repeated calls cycle through the recorded ones"""
+        with self._lock:
+            self._stats["requests"] += 1
+            for level, key in self._keys(schema, model, temperature, sha).items():
+                candidates = self._index.get(key)
+                if candidates:
+                    cursor = self._cursor.get(key, 0)
+                    self._cursor[key] = cursor + 1
+                    self._stats[level] += 1
+                    registry.inc("cassette_requests", match=level)
+                    return candidates[cursor % len(candidates)], level
+            self._stats["misses"] += 1
+        registry.inc("cassette_requests", match="miss")
+        raise CassetteMiss(f"No recorded call for {schema} in {self.path}")
+
+    def save(self):
+        """Rewrite a recorded cassette in a stable order, so re-recordings diff cleanly"""
+        if self.mode != "record":
+            return
+        with self._lock:
+            entries = sorted(self.entries, key=lambda e: (e["schema"], e["prompt_sha"], e["model"], e["temperature"], e["seq"]))
+            # Keeps the extension, so a .gz cassette is rewritten compressed
+            root, ext = os.path.splitext(self.path)
+            tmp = f"{root}.tmp{ext}"
+            with _open(tmp, "w") as f:
+                for entry in entries:
+                    f.write(_line({k: v for k, v in entry.items() if k != "seq"}))
+            os.replace(tmp, self.path)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, entries=len(self.entries))
+
+# ----------------- CHAT MODELS -----------------
+def _raw_message(content: str, usage: Dict[str, int], model: str):
+    from langchain_core.messages import AIMessage
+    return AIMessage(content=content, usage_metadata=usage, response_metadata={"model_name": model})
+
+class _RecordingStructured:
+    def __init__(self, chat: "RecordingChatModel", schema, include_raw: bool):
+        self.chat = chat
+        self.schema = schema
+        self.include_raw = include_raw
+        self.inner = chat.base.with_structured_output(schema, include_raw=True)
+
+    def invoke(self, prompt, config=None, **kwargs):
+        text = prompt if isinstance(prompt, str) else str(prompt)
+        entry: Dict[str, Any] = {
+            "schema": schema_key(self.schema),
+            "model": self.chat.model,
+            "temperature": self.chat.temperature,
+            "prompt_sha": prompt_hash(text),
+            "prompt_chars": len(text),
+        }
+        if os.environ.get("CASSETTE_PROMPTS") == "1":
+            entry["prompt"] = text
+        started = time.perf_counter()
+        try:
+            result = self.inner.invoke(prompt, config, **kwargs)
+        except Exception as e:
+            # Errors (rate limits, timeouts) are replayed too
+            entry.update(seconds=round(time.perf_counter() - started, 4), error=f"{type(e).__name__}: {e}")
+            RecordingChatModel.cassette.record(entry)
+            raise
+        entry["seconds"] = round(time.perf_counter() - started, 4)
+        usage = getattr(result.get("raw"), "usage_metadata", None) or {}
+        entry["input_tokens"] = usage.get("input_tokens", 0)
+        entry["output_tokens"] = usage.get("output_tokens", 0)
+        if result.get("parsed") is not None:
+            entry["response"] = result["parsed"].model_dump()
+        else:
+            entry["error"] = f"ValueError: {result.get('parsing_error') or 'no structured output'}"
+        RecordingChatModel.cassette.record(entry)
+        return result if self.include_raw else result.get("parsed")
+
+class RecordingChatModel:
+    """Wraps the real chat model class and records every structured call"""
+
+    base_class = None
+    cassette: Optional[Cassette] = None
+
+    def __init__(self, model: str = "", temperature: float = 0.0, **kwargs):
+        self.model = model
+        self.temperature = temperature
+        self.base = RecordingChatModel.base_class(model=model, temperature=temperature, **kwargs)
+
+    def with_structured_output(self, schema, include_raw: bool = False, **kwargs):
+        return _RecordingStructured(self, schema, include_raw)
+
+class _ReplayStructured:
+    def __init__(self, chat: "ReplayChatModel", schema, include_raw: bool):
+        self.chat = chat
+        self.schema = schema
+        self.include_raw = include_raw
+
+    def invoke(self, prompt, config=None, **kwargs):
+        text = prompt if isinstance(prompt, str) else str(prompt)
+        sha = prompt_hash(text)
+        entry, level = ReplayChatModel.cassette.find(schema_key(self.schema), self.chat.model, self.chat.temperature, sha)
+        time.sleep(entry.get("seconds", 0.0) * ReplayChatModel.time_scale)
+        if "error" in entry:
+            raise RuntimeError(f"Replayed error: {entry['error']}")
+
+        parsed = self.schema.model_validate(entry["response"])
+        usage = {
+            # A different prompt than the recorded one is charged by its own size
+            "input_tokens": entry.get("input_tokens", 0) if entry["prompt_sha"] == sha else len(text) // 4 + 1,
+            "output_tokens": entry.get("output_tokens", 0),
+        }
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        ReplayChatModel.record(usage)
+        if not self.include_raw:
+            return parsed
+        return {"raw": _raw_message(json.dumps(entry["response"]), usage, self.chat.model),
+                "parsed": parsed, "parsing_error": None}
+
+class ReplayChatModel:
+    """Drop-in for ChatGoogleGenerativeAI that answers from a cassette"""
+
+    cassette: Optional[Cassette] = None
+    # Recorded latency multiplier: 1 = original timing, 0 = no waiting
+    time_scale = 1.0
+    calls: List[Dict[str, int]] = []
+    _lock = threading.Lock()
+
+    def __init__(self, model: str = "", temperature: float = 0.0, **kwargs):
+        self.model = model
+        self.temperature = temperature
+
+    def with_structured_output(self, schema, include_raw: bool = False, **kwargs):
+        return _ReplayStructured(self, schema, include_raw)
+
+    @classmethod
+    def record(cls, usage: Dict[str, int]):
+        with cls._lock:
+            cls.calls.append(usage)
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls.calls = []
+
+# ----------------- ACTIVATION -----------------
+def _collect() -> Dict[str, Any]:
+    cassette = ReplayChatModel.cassette or RecordingChatModel.cassette
+    return cassette.stats() if cassette else {}
+
+registry.register_collector("cassette", _collect)
+
+def chat_model_from_env():
+    """Chat model class for LLM_CASSETTE / LLM_CASSETTE_MODE, or None when no cassette is configured"""
+    path = os.environ.get("LLM_CASSETTE")
+    if not path:
+        return None
+    mode = os.environ.get("LLM_CASSETTE_MODE", "replay")
+    if mode == "record":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        RecordingChatModel.base_class = ChatGoogleGenerativeAI
+        RecordingChatModel.cassette = Cassette(path, "record")
+        atexit.register(RecordingChatModel.cassette.save)
+        return RecordingChatModel
+    if mode != "replay":
+        raise ValueError(f"LLM_CASSETTE_MODE must be 'record' or 'replay', not {mode!r}")
+    ReplayChatModel.cassette = Cassette(path, "replay")
+    ReplayChatModel.time_scale = float(os.environ.get("CASSETTE_TIME_SCALE", 1.0))
+    return ReplayChatModel
+
+@contextmanager
+def record(path: str):
+    """Record the calls of whatever chat model agents.py uses now (e.g. inside fakes.patch_llm)"""
+    import agents
+    original = agents.ChatGoogleGenerativeAI
+    if original is None:
+        from langchain_google_genai import ChatGoogleGenerativeAI as base_class
+    else:
+        base_class = original
+    RecordingChatModel.base_class = base_class
+    RecordingChatModel.cassette = Cassette(path, "record")
+    agents.ChatGoogleGenerativeAI = RecordingChatModel
+    try:
+        yield RecordingChatModel.cassette
+    finally:
+        agents.ChatGoogleGenerativeAI = original
+        RecordingChatModel.cassette.save()
+
+@contextmanager
+def replay(path: str, time_scale: float = 1.0):
+    """Serve agents.py's model calls from a cassette"""
+    import agents
+    original = agents.ChatGoogleGenerativeAI
+    ReplayChatModel.cassette = Cassette(path, "replay")
+    ReplayChatModel.time_scale = time_scale
+    ReplayChatModel.reset()
+    agents.ChatGoogleGenerativeAI = ReplayChatModel
+    try:
+        yield ReplayChatModel
+    finally:
+        agents.ChatGoogleGenerativeAI = original
+
+# ----------------- PROMPT SIZE REPORT -----------------
+def summarize(path: str) -> Dict[str, Dict[str, float]]:
+    """Per schema: calls, mean prompt characters and tokens, mean output tokens and seconds"""
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    with _open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                groups.setdefault(entry["schema"], []).append(entry)
+
+    def mean(entries, field):
+        return sum(entry.get(field, 0) for entry in entries) / len(entries)
+
+    return {
+        schema: {
+            "calls": len(entries),
+            "prompt_chars": mean(entries, "prompt_chars"),
+            "input_tokens": mean(entries, "input_tokens"),
+            "output_tokens": mean(entries, "output_tokens"),
+            "seconds": mean(entries, "seconds"),
+            "errors": sum("error" in entry for entry in entries),
+        }
+        for schema, entries in sorted(groups.items())
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect LLM cassettes")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    stats = subparsers.add_parser("stats", help="Prompt and response sizes per schema")
+    stats.add_argument("cassette")
+    stats.add_argument("--compare", help="Older cassette; fail when mean prompts grew")
+    stats.add_argument("--threshold", type=float, default=0.1, help="Allowed relative prompt growth")
+    args = parser.parse_args(argv)
+
+    current = summarize(args.cassette)
+    print(json.dumps(current, indent=2))
+    if not args.compare:
+        return 0
+    regressions = []
+    for schema, old in summarize(args.compare).items():
+        new = current.get(schema)
+        if new and old["prompt_chars"] and new["prompt_chars"] > old["prompt_chars"] * (1 + args.threshold):
+            regressions.append(f"{schema} prompt {old['prompt_chars']:.0f} -> {new['prompt_chars']:.0f} chars")
+    for message in regressions:
+        print(f"REGRESSION {message}", file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""Headless entry point: parse one or more CVs once, draft (and optionally
+send) an application for every job posting in a JSONL stream.
+
+    python cli.py --cv resume.pdf --jobs jobs.jsonl --out drafts.jsonl --concurrency 4
+    python cli.py --cv backend.pdf data.pdf --jobs alerts.mbox --top-k 20
+
+Each input line is a JSON object with the posting text in `job_text`, `text`
+or `body` (a `title` is prepended when present) and an optional id in `id`,
+`job_id` or `request_id`; an mbox of job alert emails works too. One JSON
+result per job is written to --out. With --top-k the feed is first ranked
+against the CVs locally (see ranking.py) and only the best K are drafted.
+With several CVs each job is drafted, and sent, with its best-matching CV.
+Near-duplicates of postings processed before (reposts, copies from another
+board) get status `duplicate`, reuse the earlier draft and are never sent.
+Every job has a time budget (--deadline-seconds); stages that ran out of
+time and returned a partial result are listed in the record's `fallbacks`.
+With --mail-transport maildir:<dir> (or mbox:<file>) --send writes the
+emails to a local mailbox instead of sending them (see transports.py).
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Dict
+
+from agents import create_workflow
+from deadline import Deadline, with_deadline
+from dedup import get_history
+from ranking import read_feed, best_cvs, rank_feed_best_cv
+from pipeline import load_or_parse_cvs, draft_application, get_alternates, get_fallbacks, send_application
+from transports import SMTPTransport, get_transport, set_transport, transport_from_spec
+
+# ----------------- PROCESSING -----------------
+def process_job(wf, index: int, job_id: str, job_text: str, parsed_cv: Dict[str, Any], cv_path: str,
+                match_score: float, args) -> Dict[str, Any]:
+    """Draft (and optionally send) one application with the given CV; never raises"""
+    started = time.perf_counter()
+    record: Dict[str, Any] = {"id": job_id, "status": "error", "cv": cv_path, "match_score": round(match_score, 4)}
+    history = get_history()
+    claimed = None
+    try:
+        if not job_text.strip():
+            raise ValueError("Empty job description")
+
+        # Reposts of a posting processed (or being processed) before reuse its draft and are never
+        # sent twice; the claim is atomic, so concurrent reposts cannot both be drafted
+        duplicate = None
+        if not args.allow_duplicates:
+            history_id, duplicate = history.claim(args.gmail_email, job_text)
+            claimed = history_id if duplicate is None else None
+        if duplicate:
+            record.update(status="duplicate", draft=duplicate["draft"], duplicate_of=duplicate["id"],
+                          similarity=duplicate["similarity"], already_sent=duplicate["sent"])
+        else:
+            # Feeds may repeat ids, so the row index keeps checkpoint threads apart
+            config = {"configurable": {"thread_id": f"cli-{index}-{job_id}"}}
+            deadline = Deadline(args.deadline_seconds) if args.deadline_seconds else Deadline.for_stage("draft")
+            draft = draft_application(wf, job_text, parsed_cv, cv_path, with_deadline(config, deadline))
+            if not draft:
+                raise ValueError("Could not generate email draft")
+            record["draft"] = draft
+            if args.variants > 1:
+                record["alternates"] = get_alternates(wf, config)
+            fallbacks = get_fallbacks(wf, config)
+            if fallbacks:
+                record["fallbacks"] = fallbacks
+            # Template drafts are written out for review but never remembered or sent
+            if "draft_email" in fallbacks:
+                raise ValueError("Time budget exceeded; wrote a template draft instead")
+            history.remember(args.gmail_email, job_text, draft)
+            record["status"] = "drafted"
+
+            if args.send:
+                record["result"] = send_application(draft, args.gmail_email, args.gmail_password, cv_path,
+                                                    Deadline.for_stage("send"))
+                history.remember(args.gmail_email, job_text, draft, sent=True)
+                record["status"] = "sent"
+    except Exception as e:
+        record["error"] = str(e)
+    finally:
+        if claimed is not None:
+            history.release(claimed)
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+def run(args) -> int:
+    if not args.api_key:
+        raise SystemExit("Missing Google AI API key (--api-key or GOOGLE_API_KEY)")
+    set_transport(transport_from_spec(args.mail_transport))
+    # Local transports only write files, so they need no account
+    if args.send and isinstance(get_transport(), SMTPTransport) and not (args.gmail_email and args.gmail_password):
+        raise SystemExit("--send needs --gmail-email and --gmail-password (or GMAIL_EMAIL / GMAIL_APP_PASSWORD)")
+
+    # CVs are parsed in parallel; saved profiles are reused when a CV was already parsed for this user
+    parsed_cvs = [parsed for parsed, _ in load_or_parse_cvs(args.api_key, args.cv, args.gmail_email, args.session_id,
+                                                            deadline=Deadline.for_stage("parse"))]
+    for path, parsed in zip(args.cv, parsed_cvs):
+        if not parsed:
+            raise SystemExit(f"Could not extract data from CV: {path}")
+
+    # One compiled workflow is shared; each job runs on its own checkpoint thread
+    wf = create_workflow(args.api_key, args.gmail_email, args.gmail_password, args.session_id, args.variants)
+
+    # Every job is drafted with the CV that matches it best (CV x job scores, one matrix per chunk)
+    if args.top_k:
+        # Rank the whole feed locally and only draft the best matches
+        ranked = rank_feed_best_cv(read_feed(args.jobs), parsed_cvs, args.top_k, min_score=args.min_score)
+        assignments = [(job["id"], job["job_text"], job["cv_index"], job["score"]) for job in ranked]
+        print(f"Drafting the top {len(ranked)} postings", file=sys.stderr)
+    else:
+        assignments = best_cvs(read_feed(args.jobs), parsed_cvs)
+
+    out = sys.stdout if args.out == '-' else open(args.out, 'w', encoding='utf-8')
+    write_lock = threading.Lock()
+    failures = 0
+
+    def emit(record: Dict[str, Any]):
+        nonlocal failures
+        failures += record["status"] == "error"
+        with write_lock:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            pending = set()
+            for index, (job_id, job_text, cv_index, match_score) in enumerate(assignments):
+                # Bounded in-flight work so arbitrarily long streams use constant memory
+                if len(pending) >= args.concurrency * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        emit(future.result())
+                pending.add(executor.submit(process_job, wf, index, job_id, job_text, parsed_cvs[cv_index],
+                                            args.cv[cv_index], match_score, args))
+            for future in wait(pending).done:
+                emit(future.result())
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        # Log out of pooled SMTP connections
+        get_transport().close()
+
+    return 1 if failures else 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Draft job application emails without the Streamlit UI")
+    parser.add_argument("--cv", required=True, nargs="+",
+                        help="Path to the CV PDF; with several, each job uses the best-matching one")
+    parser.add_argument("--jobs", default="-", help="JSONL or mbox file of job postings ('-' for JSONL on stdin)")
+    parser.add_argument("--out", default="-", help="JSONL file for drafts/results ('-' for stdout)")
+    parser.add_argument("--top-k", type=int, default=0,
+                        help="Rank the feed against the CV locally and only draft the best K (0 drafts all)")
+    parser.add_argument("--min-score", type=float, default=0.01,
+                        help="With --top-k, only draft postings scoring at least this (the weighted share of the "
+                             "CV's skills, titles and certificates they mention, 0-1); 0 also drafts postings "
+                             "that match nothing")
+    parser.add_argument("--concurrency", type=int, default=4, help="Jobs processed in parallel")
+    parser.add_argument("--variants", type=int, default=1,
+                        help="Draft this many candidates per job in parallel and keep the best")
+    parser.add_argument("--deadline-seconds", type=float, default=0,
+                        help="Time budget per job (default DEADLINE_DRAFT_SECONDS or 120)")
+    parser.add_argument("--send", action="store_true", help="Send each draft instead of only writing it")
+    parser.add_argument("--allow-duplicates", action="store_true",
+                        help="Draft (and send) near-duplicates of postings processed before")
+    parser.add_argument("--session-id", default="cli", help="Scheduler session id shared by this run")
+    parser.add_argument("--api-key", default=os.environ.get("GOOGLE_API_KEY", ""))
+    parser.add_argument("--gmail-email", default=os.environ.get("GMAIL_EMAIL", ""))
+    parser.add_argument("--gmail-password", default=os.environ.get("GMAIL_APP_PASSWORD", ""))
+    parser.add_argument("--mail-transport", default=os.environ.get("MAIL_TRANSPORT", "gmail"),
+                        help="gmail, smtp, maildir:<dir>, mbox:<file> or memory (see transports.py)")
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.concurrency < 1:
+        raise SystemExit("--concurrency must be at least 1")
+    return run(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
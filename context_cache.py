@@ -0,0 +1,125 @@
+"""Provider-side context caching for the stable prompt prefix.
+
+Draft and edit prompts start with a byte-identical system + candidate
+prefix (see agents.prompt_prefix). A context cache maps that prefix,
+keyed by its hash, to a provider cache handle; calls with a handle send
+only the variable suffix.
+
+CONTEXT_CACHE selects the implementation:
+    local   (default) full prompts are sent; prefix reuse is only measured
+    gemini  explicit Gemini context caches for prefixes of at least
+            CONTEXT_CACHE_MIN_TOKENS tokens (the provider minimum)
+    off     no caching and no measurements
+"""
+import os
+import time
+import hashlib
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from metrics import registry, record_cache
+from scheduler import estimate_tokens
+
+def prefix_hash(prefix: str) -> str:
+    return hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:16]
+
+class LocalContextCache:
+    """Stand-in that sends full prompts and reports how often a prefix could have been reused"""
+
+    def __init__(self, ttl_seconds: float = 600, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # prefix hash -> last use (monotonic seconds)
+        self._seen: Dict[str, float] = {}
+        self._stats = {"requests": 0, "hits": 0, "prefix_tokens": 0, "reused_tokens": 0}
+
+    def _record(self, prefix: str) -> bool:
+        """Count one use of `prefix`; True when it was used within the TTL"""
+        key = prefix_hash(prefix)
+        tokens = estimate_tokens(prefix)
+        now = time.monotonic()
+        with self._lock:
+            last = self._seen.pop(key, None)
+            hit = last is not None and now - last <= self.ttl_seconds
+            self._seen[key] = now
+            if len(self._seen) > self.max_entries:
+                self._seen.pop(next(iter(self._seen)))
+            self._stats["requests"] += 1
+            self._stats["prefix_tokens"] += tokens
+            if hit:
+                self._stats["hits"] += 1
+                self._stats["reused_tokens"] += tokens
+        record_cache("context_prefix", hit)
+        return hit
+
+    def handle(self, api_key: str, model: str, prefix: str) -> Optional[str]:
+        """Provider cache name holding `prefix` for this model, or None to send the full prompt"""
+        self._record(prefix)
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["hit_rate"] = stats["hits"] / stats["requests"] if stats["requests"] else 0.0
+        stats["reuse_rate"] = stats["reused_tokens"] / stats["prefix_tokens"] if stats["prefix_tokens"] else 0.0
+        return stats
+
+class GeminiContextCache(LocalContextCache):
+    """Explicit Gemini context caches, one per (API key, model, prefix hash), renewed when they expire"""
+
+    def __init__(self, ttl_seconds: float = 600, min_tokens: int = 32768, max_entries: int = 1024):
+        super().__init__(ttl_seconds, max_entries)
+        self.min_tokens = min_tokens
+        # (api_key, model, prefix hash) -> (cache name, expiry)
+        self._caches: Dict[Tuple[str, str, str], Tuple[str, float]] = {}
+
+    def handle(self, api_key: str, model: str, prefix: str) -> Optional[str]:
+        self._record(prefix)
+        if estimate_tokens(prefix) < self.min_tokens:
+            return None
+        key = (api_key, model, prefix_hash(prefix))
+        now = time.monotonic()
+        with self._lock:
+            cached = self._caches.get(key)
+        # Renew a little early so a call never starts on an expiring cache
+        if cached and cached[1] - 30 > now:
+            return cached[0]
+        try:
+            from google import genai
+            from google.genai import types
+            with registry.timer("context_cache_create_seconds", model=model):
+                created = genai.Client(api_key=api_key).caches.create(
+                    model=model,
+                    config=types.CreateCachedContentConfig(contents=[prefix], ttl=f"{int(self.ttl_seconds)}s"),
+                )
+        except Exception:
+            # Caching is an optimisation; the call goes out with the full prompt
+            registry.inc("context_cache_errors", model=model)
+            return None
+        with self._lock:
+            self._caches[key] = (created.name, now + self.ttl_seconds)
+        return created.name
+
+# ----------------- SHARED INSTANCE -----------------
+_cache: Optional[LocalContextCache] = None
+_cache_lock = threading.Lock()
+
+def get_context_cache() -> Optional[LocalContextCache]:
+    """Process-wide context cache from CONTEXT_CACHE (None when it is off)"""
+    global _cache
+    with _cache_lock:
+        kind = os.environ.get("CONTEXT_CACHE", "local")
+        if _cache is None and kind != "off":
+            ttl = float(os.environ.get("CONTEXT_CACHE_TTL_SECONDS", 600))
+            if kind == "gemini":
+                _cache = GeminiContextCache(ttl, int(os.environ.get("CONTEXT_CACHE_MIN_TOKENS", 32768)))
+            else:
+                _cache = LocalContextCache(ttl)
+        return _cache
+
+def _collect() -> Dict[str, Any]:
+    cache = get_context_cache()
+    return cache.stats() if cache else {}
+
+registry.register_collector("context_cache", _collect)
@@ -0,0 +1,193 @@
+"""Heuristic CV parser used as a fast path before the LLM.
+
+The extracted PDF text is segmented by its headings ("Skills", "Work
+Experience", "CERTIFICATIONS:" ...). Each DataExtractSchema field is then
+filled locally with a confidence between 0 and 1. Only fields below the
+threshold go to the model, together with just the sections they come from.
+"""
+import os
+import re
+from typing import Any, Dict, List, Tuple
+
+from skills import extract_skills, merge_skills
+
+# Fields below this confidence are sent to the model
+CONFIDENCE_THRESHOLD = float(os.environ.get("CV_CONFIDENCE_THRESHOLD", 0.6))
+
+CV_FIELDS = ["name", "location", "skills", "experience", "relevant_job_titles", "certificates", "projects"]
+
+SECTION_ALIASES = {
+    "summary": ["summary", "professional summary", "profile", "about me", "about", "objective", "career objective"],
+    "skills": ["skills", "technical skills", "core skills", "key skills", "skills & tools", "skills and tools",
+               "competencies", "core competencies", "technologies", "tech stack", "tools", "expertise"],
+    "experience": ["experience", "work experience", "professional experience", "employment",
+                   "employment history", "work history", "career history", "relevant experience"],
+    "projects": ["projects", "personal projects", "selected projects", "key projects", "side projects"],
+    "certificates": ["certifications", "certificates", "certification", "licenses & certifications",
+                     "licenses and certifications", "licenses", "courses", "training"],
+    "education": ["education", "academic background", "qualifications", "academic qualifications"],
+    "languages": ["languages", "language skills"],
+    "contact": ["contact", "contact information", "contact details", "personal details", "personal information"],
+    "interests": ["interests", "hobbies", "hobbies & interests", "volunteering", "references", "awards", "publications"],
+}
+
+# Sections each field is read from (and sent to the model when the field is uncertain)
+FIELD_SECTIONS = {
+    "name": ["header", "contact"],
+    "location": ["header", "contact"],
+    "skills": ["skills", "languages", "summary"],
+    "experience": ["experience"],
+    "relevant_job_titles": ["header", "summary", "experience"],
+    "certificates": ["certificates"],
+    "projects": ["projects"],
+}
+
+TITLE_KEYWORDS = (
+    "engineer", "developer", "programmer", "architect", "scientist", "analyst", "manager", "designer",
+    "consultant", "administrator", "specialist", "lead", "director", "intern", "researcher", "accountant",
+    "officer", "coordinator", "technician", "assistant", "owner", "head", "devops", "sre",
+)
+
+_ALIAS_TO_SECTION = {alias: section for section, aliases in SECTION_ALIASES.items() for alias in aliases}
+_HEADING = re.compile(
+    r"^\s*(?:[#*•▪\-]\s*)?(" + "|".join(re.escape(alias) for alias in sorted(_ALIAS_TO_SECTION, key=len, reverse=True))
+    + r")\s*([:|–-])?\s*(.*)$",
+    re.IGNORECASE,
+)
+_BULLET = re.compile(r"^\s*(?:[•▪◦●\-*–]|\d+[.)])\s+")
+_YEAR = re.compile(r"\b(?:19|20)\d{2}\b|\bpresent\b|\bcurrent\b", re.IGNORECASE)
+_NAME = re.compile(r"^[A-ZÀ-Ý][\w'’\-]+(?:\s+[A-ZÀ-Ý][\w'’\-.]*){1,3}$")
+_PLACE = re.compile(r"^[A-ZÀ-Ý][\w\-. ]+,\s*[A-ZÀ-Ý][\w\-. ]+$")
+_LOCATION_LABEL = re.compile(r"(?:location|address|based in|city)\s*[:\-]\s*([^|•\n]+)", re.IGNORECASE)
+_CONTACT = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+|\+\d[\d ()/-]{7,}\d")
+_TITLE_SPLIT = re.compile(r"\s+(?:at|@)\s+|\s*[,|–—]\s*|\s+-\s+")
+
+# ----------------- SEGMENTATION -----------------
+def split_sections(text: str) -> Dict[str, List[str]]:
+    """Lines of each recognised section; everything before the first heading is 'header'"""
+    sections: Dict[str, List[str]] = {"header": []}
+    current = "header"
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        match = _HEADING.match(line)
+        # A heading is a line of its own ("Work Experience") or "HEADING: content", not prose
+        if match and (match.group(2) or not match.group(3)):
+            current = _ALIAS_TO_SECTION[match.group(1).lower()]
+            sections.setdefault(current, [])
+            if match.group(3).strip():
+                sections[current].append(match.group(3).strip())
+            continue
+        # Contact lines (email, phone) belong to the contact details wherever they appear
+        section = "contact" if current != "header" and _CONTACT.search(line) else current
+        sections.setdefault(section, []).append(line)
+    return sections
+
+def _unique(items: List[str]) -> List[str]:
+    seen: Dict[str, str] = {}
+    for item in items:
+        item = item.strip(" .;,-–•")
+        if item and item.lower() not in seen:
+            seen[item.lower()] = item
+    return list(seen.values())
+
+def _entries(lines: List[str]) -> List[str]:
+    """Group a section into entries: a non-bullet line starts one, bullet lines extend it"""
+    entries: List[List[str]] = []
+    for line in lines:
+        if _BULLET.match(line) and entries:
+            entries[-1].append(_BULLET.sub("", line))
+        else:
+            entries.append([_BULLET.sub("", line)])
+    # A single inline line ("PROJECTS: a, b") is a list
+    if len(entries) == 1 and len(entries[0]) == 1 and not _YEAR.search(entries[0][0]):
+        return _unique(re.split(r"\s*[,;|]\s*", entries[0][0]))
+    return _unique(["; ".join(entry)[:300] for entry in entries])
+
+def _list_items(lines: List[str]) -> List[str]:
+    """Comma / bullet / pipe separated items of a list section"""
+    items = []
+    for line in lines:
+        line = _BULLET.sub("", line)
+        # "Languages: Python, Go" -> drop the sub-label
+        line = re.sub(r"^[\w &/]{2,30}:\s+", "", line)
+        items.extend(re.split(r"\s*[,;|•·▪]\s*", line))
+    return _unique([item for item in items if 1 < len(item) <= 40])
+
+# ----------------- FIELDS -----------------
+def _name(header: List[str]) -> Tuple[str, float]:
+    for line in header[:3]:
+        candidate = re.split(r"\s+[-|–•]\s+|\s*[|•,]\s*", line)[0].strip()
+        if _NAME.match(candidate) and not re.search(r"\d|@", candidate):
+            return candidate, 0.85
+    return "", 0.0
+
+def _location(lines: List[str], name: str) -> Tuple[str, float]:
+    for line in lines:
+        labelled = _LOCATION_LABEL.search(line)
+        if labelled:
+            return labelled.group(1).strip(), 0.85
+    for line in lines[:5]:
+        for part in re.split(r"\s+[-|–•]\s+|\s*[|•]\s*", line):
+            part = part.strip()
+            if part != name and _PLACE.match(part) and not re.search(r"\d|@", part):
+                return part, 0.7
+    return "", 0.0
+
+def _job_titles(lines: List[str]) -> List[str]:
+    titles = []
+    for line in lines:
+        candidate = _TITLE_SPLIT.split(_BULLET.sub("", line), maxsplit=1)[0].strip()
+        if 1 <= len(candidate.split()) <= 6 and any(word in candidate.lower() for word in TITLE_KEYWORDS):
+            titles.append(re.sub(r"\s*\(.*?\)\s*", " ", candidate).strip())
+    return _unique(titles)
+
+def parse_sections(text: str) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """(DataExtractSchema-shaped fields, confidence per field) from headings alone"""
+    sections = split_sections(text)
+    recognised = [section for section in sections if section != "header" and sections[section]]
+    # With several clean headings, a missing optional section most likely does not exist
+    structured = len(recognised) >= 3
+    fields: Dict[str, Any] = {}
+    confidence: Dict[str, float] = {}
+
+    header = sections.get("header", []) + sections.get("contact", [])
+    fields["name"], confidence["name"] = _name(header)
+    fields["location"], confidence["location"] = _location(header, fields["name"])
+
+    section_skills = _list_items(sections.get("skills", []) + sections.get("languages", []))
+    text_skills = extract_skills(text)
+    fields["skills"] = merge_skills(section_skills, text_skills)
+    confidence["skills"] = 0.9 if len(section_skills) >= 3 else 0.5 if len(text_skills) >= 3 else 0.2
+
+    experience = _entries(sections.get("experience", []))
+    fields["experience"] = experience
+    if experience:
+        dated = sum(1 for entry in experience if _YEAR.search(entry))
+        confidence["experience"] = 0.9 if dated >= len(experience) / 2 else 0.6
+    else:
+        confidence["experience"] = 0.0
+
+    titles = _job_titles([line for line in sections.get("experience", []) if not _BULLET.match(line)]
+                         + sections.get("header", [])[1:3])
+    fields["relevant_job_titles"] = titles
+    confidence["relevant_job_titles"] = 0.75 if titles else 0.0
+
+    for field in ("certificates", "projects"):
+        items = _entries(sections.get(field, []))
+        fields[field] = items
+        confidence[field] = 0.85 if items else 0.7 if structured and field not in sections else 0.0
+
+    return fields, confidence
+
+def section_text(text: str, fields: List[str]) -> str:
+    """Only the parts of the CV the given fields are read from (the whole CV if none were found)"""
+    sections = split_sections(text)
+    wanted: List[str] = []
+    for field in fields:
+        found = [section for section in FIELD_SECTIONS[field] if sections.get(section)]
+        if not found:
+            return text
+        wanted.extend(section for section in found if section not in wanted)
+    return "\n\n".join(f"{section.upper()}:\n" + "\n".join(sections[section]) for section in wanted)
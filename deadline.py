@@ -0,0 +1,127 @@
+"""End-to-end time budgets for one application.
+
+A Deadline is created at the entry point (UI step, CLI job, benchmark run)
+and carried in the graph config under configurable["deadline"]. Nodes read
+it with from_config(); model calls, scheduler waits and SMTP connections are
+bounded by its remaining time, and cancel() wakes every wait on it at once.
+Stages with a usable partial result fall back to it instead of failing.
+
+DEADLINE_<KIND>_SECONDS overrides the default budget of each entry point.
+"""
+import os
+import time
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+from metrics import registry
+from workers import get_pool
+
+# Entry point -> default budget in seconds
+DEFAULT_BUDGETS: Dict[str, float] = {"draft": 120.0, "revise": 60.0, "parse": 60.0, "send": 30.0}
+
+# Optional stages (job analysis, model help with uncertain CV fields) never take
+# more than this many times their route budget, so drafting keeps most of the time
+OPTIONAL_STAGE_FACTOR = 2.0
+
+class DeadlineExceeded(TimeoutError):
+    """The time budget ran out (or was cancelled) before `stage` finished"""
+
+    def __init__(self, stage: str, cancelled: bool = False):
+        self.stage = stage
+        self.cancelled = cancelled
+        super().__init__(f"{'Cancelled' if cancelled else 'Time budget exceeded'} during {stage}")
+
+class Deadline:
+    """Absolute point in time (monotonic) by which one application must finish"""
+
+    def __init__(self, seconds: float, parent: Optional["Deadline"] = None):
+        self.expires_at = time.monotonic() + seconds
+        if parent is not None:
+            self.expires_at = min(self.expires_at, parent.expires_at)
+        self.parent = parent
+        self._cond = threading.Condition()
+        self._cancelled = False
+
+    @classmethod
+    def for_stage(cls, kind: str) -> "Deadline":
+        """Deadline with the configured budget of an entry point ("draft", "revise", "parse", "send")"""
+        return cls(float(os.environ.get(f"DEADLINE_{kind.upper()}_SECONDS", DEFAULT_BUDGETS[kind])))
+
+    def child(self, seconds: float) -> "Deadline":
+        """Shorter deadline for one stage; cancelling this deadline cancels it too"""
+        return Deadline(seconds, parent=self)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled or (self.parent is not None and self.parent.cancelled)
+
+    def remaining(self) -> float:
+        return 0.0 if self.cancelled else max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self, stage: str):
+        """Raise DeadlineExceeded when there is no time left for `stage`"""
+        if self.expired():
+            registry.inc("deadline_exceeded", stage=stage, reason="cancelled" if self.cancelled else "expired")
+            raise DeadlineExceeded(stage, self.cancelled)
+
+    def cancel(self):
+        """Stop all work waiting on this deadline"""
+        with self._cond:
+            self._cancelled = True
+            self._cond.notify_all()
+        registry.inc("deadline_cancellations")
+
+    def _wait(self, predicate: Callable[[], bool]):
+        # Waits on the parent too, so cancelling the application wakes its stages
+        with self._cond:
+            while not predicate() and not self.cancelled:
+                remaining = self.remaining()
+                if remaining <= 0:
+                    return
+                # Short slices keep a parent's cancel() noticed promptly
+                self._cond.wait(min(remaining, 0.05) if self.parent is not None else remaining)
+
+    def run(self, stage: str, fn: Callable[[], Any]) -> Any:
+        """Run `fn` on the shared I/O pool (workers.py) and return its result, abandoning it at the deadline.
+
+        A request that is already on the wire cannot be interrupted; its result
+        is discarded when it finally arrives (and it keeps its worker until then).
+        On an I/O worker `fn` gets a thread of its own instead: waiting on a task
+        queued behind this one could deadlock a saturated pool.
+        """
+        self.check(stage)
+        pool = get_pool("io")
+        if pool.on_worker():
+            future: Future = pool.spawn(stage, fn)
+        else:
+            future = pool.submit(stage, fn, deadline=self)
+        future.add_done_callback(lambda _: self._notify())
+        self._wait(future.done)
+        if not future.done():
+            future.cancel()
+            registry.inc("deadline_abandoned_calls", stage=stage)
+            self.check(stage)
+        return future.result()
+
+    def _notify(self):
+        with self._cond:
+            self._cond.notify_all()
+
+# ----------------- GRAPH CONFIG -----------------
+def with_deadline(config: Dict[str, Any], deadline: Optional[Deadline]) -> Dict[str, Any]:
+    """Copy of a graph config that carries `deadline` to every node"""
+    config = dict(config)
+    config["configurable"] = dict(config.get("configurable") or {}, deadline=deadline)
+    return config
+
+def from_config(config: Optional[Dict[str, Any]]) -> Optional[Deadline]:
+    """Deadline carried by a graph config, if any"""
+    return ((config or {}).get("configurable") or {}).get("deadline")
+
+def remaining(deadline: Optional[Deadline]) -> Optional[float]:
+    """Seconds left, or None without a deadline"""
+    return deadline.remaining() if deadline is not None else None
@@ -0,0 +1,231 @@
+import os
+import re
+import json
+import time
+import zlib
+import sqlite3
+import threading
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from metrics import registry, record_cache
+from profiles import DEFAULT_DB_PATH
+
+_MASK32 = np.uint64((1 << 32) - 1)
+_EMPTY_HASH = np.uint32((1 << 32) - 1)
+_SHINGLE_MULTIPLIER = np.uint64(1000003)
+
+# ----------------- MINHASH -----------------
+def normalize(text: str) -> List[str]:
+    """Lowercased word tokens; punctuation, markup and whitespace differences vanish"""
+    return re.findall(r"[a-z0-9+#]+", text.lower())
+
+def shingle_hashes(text: str, size: int = 3) -> np.ndarray:
+    """Distinct 32-bit hashes of the word `size`-grams (the whole text for very short postings)"""
+    words = normalize(text)
+    word_hashes = np.fromiter((zlib.crc32(word.encode("utf-8")) for word in words),
+                              dtype=np.uint64, count=len(words))
+    count = max(1, len(words) - size + 1) if words else 0
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset in range(min(size, len(words))):
+        hashes = (hashes * _SHINGLE_MULTIPLIER + word_hashes[offset:offset + count]) & _MASK32
+    return np.unique(hashes)
+
+class MinHasher:
+    """Fixed family of `num_perm` hash functions turning a text into a MinHash signature"""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        # x -> a * x + b (mod 2**32) with odd a is a permutation of the 32-bit hashes
+        rng = np.random.RandomState(seed)
+        self._a = (rng.randint(0, 1 << 31, size=num_perm).astype(np.uint32) << np.uint32(1)) | np.uint32(1)
+        self._b = rng.randint(0, 1 << 31, size=num_perm).astype(np.uint32)
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = shingle_hashes(text, self.shingle_size).astype(np.uint32)
+        if hashes.size == 0:
+            return np.full(self.num_perm, _EMPTY_HASH, dtype=np.uint32)
+        # (num_shingles, num_perm) permuted values; uint32 arithmetic wraps instead of a slow modulo
+        values = np.outer(hashes, self._a)
+        values += self._b
+        return values.min(axis=0)
+
+def jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures"""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+# ----------------- LSH INDEX -----------------
+def lsh_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """(bands, rows) with the largest rows whose S-curve midpoint stays at or below `threshold`.
+
+    Erring low favours recall; candidates are verified against the threshold anyway.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if (1 / bands) ** (1 / rows) <= threshold:
+            best = (bands, rows)
+    return best
+
+class LSHIndex:
+    """Banded LSH over MinHash signatures; queries touch only colliding buckets"""
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128):
+        self.threshold = threshold
+        self.bands, self.rows = lsh_bands(num_perm, threshold)
+        self._buckets: List[Dict[bytes, List[Hashable]]] = [{} for _ in range(self.bands)]
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, key: Hashable, signature: np.ndarray):
+        self._signatures[key] = signature
+        for bucket, band in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(band, []).append(key)
+
+    def query(self, signature: np.ndarray) -> List[Tuple[Hashable, float]]:
+        """Indexed keys at or above the threshold, most similar first"""
+        candidates = set()
+        for bucket, band in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(band, ()))
+        matches = [(key, jaccard(signature, self._signatures[key])) for key in candidates]
+        return sorted((m for m in matches if m[1] >= self.threshold), key=lambda m: -m[1])
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+# ----------------- JOB HISTORY -----------------
+class JobHistory:
+    """Every processed posting per user, persisted next to the profiles and indexed in memory"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user TEXT NOT NULL,
+        signature BLOB NOT NULL,
+        preview TEXT NOT NULL,
+        draft TEXT,
+        sent INTEGER NOT NULL DEFAULT 0,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS jobs_user ON jobs (user);
+    """
+
+    def __init__(self, path: Optional[str] = None, threshold: Optional[float] = None, num_perm: int = 128):
+        self.path = path or os.environ.get("PROFILE_DB", DEFAULT_DB_PATH)
+        self.threshold = threshold if threshold is not None else float(os.environ.get("DEDUP_THRESHOLD", 0.8))
+        self.hasher = MinHasher(num_perm)
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._indexes: Dict[str, LSHIndex] = {}
+        # Rows claimed by a caller that is still drafting them (this process only)
+        self._in_progress: Set[int] = set()
+        with self._lock, self._conn:
+            self._conn.executescript(self.SCHEMA)
+            for row in self._conn.execute("SELECT id, user, signature FROM jobs"):
+                self._index(row["user"]).add(row["id"], np.frombuffer(row["signature"], dtype=np.uint32))
+
+    def _index(self, user: str) -> LSHIndex:
+        if user not in self._indexes:
+            self._indexes[user] = LSHIndex(self.threshold, self.hasher.num_perm)
+        return self._indexes[user]
+
+    def _duplicate(self, row: sqlite3.Row, similarity: float) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "similarity": similarity,
+            "preview": row["preview"],
+            "draft": json.loads(row["draft"]) if row["draft"] else None,
+            "sent": bool(row["sent"]),
+            "created_at": row["created_at"],
+            "in_progress": row["id"] in self._in_progress,
+        }
+
+    def _insert(self, user: str, job_text: str, signature: np.ndarray, draft: Optional[Dict[str, Any]],
+                sent: bool) -> int:
+        cursor = self._conn.execute(
+            "INSERT INTO jobs (user, signature, preview, draft, sent, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (user, signature.tobytes(), " ".join(job_text.split())[:200],
+             json.dumps(draft) if draft else None, int(sent), time.time()),
+        )
+        self._index(user).add(cursor.lastrowid, signature)
+        return cursor.lastrowid
+
+    def find_duplicate(self, user: str, job_text: str) -> Optional[Dict[str, Any]]:
+        """Most similar earlier posting of this user above the threshold, or None"""
+        started = time.perf_counter()
+        signature = self.hasher.signature(job_text)
+        with self._lock:
+            matches = self._index(user).query(signature)
+            duplicate = None
+            if matches:
+                row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (matches[0][0],)).fetchone()
+                duplicate = self._duplicate(row, matches[0][1])
+        seconds = time.perf_counter() - started
+        registry.observe("dedup_lookup_seconds", seconds)
+        record_cache("job_dedup", duplicate is not None, seconds)
+        return duplicate
+
+    def claim(self, user: str, job_text: str) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """Atomically look up a near-duplicate or record this posting as being processed.
+
+        Returns (job id, duplicate). With no duplicate (or only an earlier claim
+        that never produced a draft) the caller owns the row until release();
+        concurrent reposts then see it with in_progress set.
+        """
+        started = time.perf_counter()
+        signature = self.hasher.signature(job_text)
+        with self._lock, self._conn:
+            matches = self._index(user).query(signature)
+            duplicate = None
+            if matches:
+                row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (matches[0][0],)).fetchone()
+                job_id, duplicate = row["id"], self._duplicate(row, matches[0][1])
+                # An earlier claim that never produced a draft is taken over
+                if not (duplicate["draft"] or duplicate["sent"] or duplicate["in_progress"]):
+                    duplicate = None
+            else:
+                job_id = self._insert(user, job_text, signature, None, False)
+            if duplicate is None:
+                self._in_progress.add(job_id)
+        seconds = time.perf_counter() - started
+        registry.observe("dedup_lookup_seconds", seconds)
+        record_cache("job_dedup", duplicate is not None, seconds)
+        return job_id, duplicate
+
+    def release(self, job_id: int):
+        """End a claim; a claimed posting that was never drafted can be drafted by the next repost"""
+        with self._lock:
+            self._in_progress.discard(job_id)
+
+    def remember(self, user: str, job_text: str, draft: Optional[Dict[str, Any]] = None, sent: bool = False) -> int:
+        """Record a processed posting; an existing near-duplicate is updated instead of re-added"""
+        signature = self.hasher.signature(job_text)
+        with self._lock, self._conn:
+            matches = self._index(user).query(signature)
+            if matches:
+                job_id = matches[0][0]
+                self._conn.execute(
+                    "UPDATE jobs SET draft = COALESCE(?, draft), sent = MAX(sent, ?) WHERE id = ?",
+                    (json.dumps(draft) if draft else None, int(sent), job_id),
+                )
+                return job_id
+            return self._insert(user, job_text, signature, draft, sent)
+
+# ----------------- SHARED INSTANCE -----------------
+_history: Optional[JobHistory] = None
+_history_lock = threading.Lock()
+
+def get_history() -> JobHistory:
+    """Return the process-wide job history (same database as the profile store)"""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = JobHistory()
+        return _history
@@ -0,0 +1,229 @@
+"""Local interpreter for mechanical revision requests.
+
+Feedback such as "change subject to X", "replace Dear Hiring Manager with
+Dear Ms. Lee", "shorten to 120 words" or "remove the last paragraph" is
+applied directly to the EmailSchema fields in milliseconds. Anything this
+module does not fully understand returns None and goes to the model.
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+APPROVAL_PHRASES = {
+    "approve", "approved", "send", "send it", "ok", "okay", "yes", "good", "looks good",
+    "looks good send it", "lgtm", "perfect", "great", "go ahead",
+}
+
+ORDINALS = {"first": 0, "1st": 0, "second": 1, "2nd": 1, "third": 2, "3rd": 2, "fourth": 3, "4th": 3,
+            "fifth": 4, "5th": 4, "last": -1, "final": -1}
+
+_EMAIL = r"[\w.+-]+@[\w-]+\.[\w.-]+"
+_SIGN_OFF = re.compile(r"^(?:best|kind|warm|many thanks|thanks|thank you|regards|sincerely|yours|cheers)\b", re.IGNORECASE)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+# Line breaks, semicolons and sentence ends, but not "Ms. Lee" or "J. Doe"
+_CLAUSE_BREAK = re.compile(r"[\n;]+|(?<!\bMr)(?<!\bMs)(?<!\bDr)(?<!\bMrs)(?<!\bProf)(?<!\b[A-Z])\.\s+(?=[A-Z])")
+
+# (operation, pattern); groups are the operation's arguments. Matched case-insensitively
+# against the original clause, so the arguments keep the user's casing.
+PATTERNS: List[Tuple[str, re.Pattern]] = [(operation, re.compile(pattern, re.IGNORECASE)) for operation, pattern in [
+    ("subject", r"^(?:change|set|make|update|rename)\s+(?:the\s+)?subject(?:\s+line)?\s+(?:to|as|into)\s*:?\s*(.+)$"),
+    ("subject", r"^(?:new\s+)?subject(?:\s+line)?\s*(?:[:=]|should be)\s*(.+)$"),
+    ("subject", r"^use\s+(.+?)\s+as\s+(?:the\s+)?subject(?:\s+line)?$"),
+    ("recipient", r"^(?:send\s+(?:it|this|the\s+email)|address\s+it|(?:change|set)\s+(?:the\s+)?(?:recipient|to\s+address)|recipient)\s*(?:to|:|=)?\s*(" + _EMAIL + r")$"),
+    ("words", r"^(?:shorten|trim|cut|condense)\s+(?:it|this|the\s+(?:email|body|text|draft))?\s*(?:down\s+)?(?:to|under|below|at\s+most|max(?:imum)?|within|around|about)?\s*(\d+)\s+words?$"),
+    ("words", r"^(?:keep\s+it\s+)?(?:under|below|at\s+most|max(?:imum)?|no\s+more\s+than)\s+(\d+)\s+words?$"),
+    ("remove_paragraph", r"^(?:remove|delete|drop|cut)\s+the\s+(first|1st|second|2nd|third|3rd|fourth|4th|fifth|5th|last|final)\s+paragraph$"),
+    ("replace", r"^(?:replace|swap)\s+(.+?)\s+(?:with|by|for)\s+(.+)$"),
+    ("replace_reversed", r"^(?:use|say|write)\s+(.+?)\s+instead\s+of\s+(.+)$"),
+    ("remove_text", r"^(?:remove|delete|drop|cut)\s+(?:the\s+)?(?:sentence|phrase|line|words?|part|text)?\s*(.+)$"),
+]]
+
+# Shorter replace/remove targets ("I", "AI") are too ambiguous to edit without the model
+MIN_TARGET_CHARS = 3
+
+# Words that cannot end a sentence, or meet each other, once the text between them is removed
+FUNCTION_WORDS = {"a", "an", "the", "and", "or", "but", "of", "in", "on", "at", "to", "for", "with", "by",
+                  "from", "into", "as", "about", "my", "our", "your", "i", "we"}
+
+# ----------------- PARSING -----------------
+def _clean(text: str) -> str:
+    return text.strip().strip(" .!").strip()
+
+def _unquote(value: str) -> str:
+    value = _clean(value)
+    if len(value) >= 2 and value[0] in "\"'“‘" and value[-1] in "\"'”’":
+        return value[1:-1]
+    return value
+
+def is_approval(feedback: str) -> bool:
+    """True for short approvals ("ok", "looks good, send it") that need no interpretation"""
+    normalized = re.sub(r"[^a-z ]+", " ", feedback.lower())
+    return " ".join(normalized.split()) in APPROVAL_PHRASES
+
+def _clauses(feedback: str) -> List[str]:
+    clauses = []
+    for line in _CLAUSE_BREAK.split(feedback.strip()):
+        line = re.sub(r"^(?:please|and|then|also)\s+|\s+please$", "", _clean(line), flags=re.IGNORECASE)
+        if line:
+            clauses.append(line)
+    return clauses
+
+def _parse_clause(clause: str) -> Optional[Tuple[str, ...]]:
+    for operation, pattern in PATTERNS:
+        match = pattern.match(clause)
+        if match:
+            args = tuple(_unquote(group) for group in match.groups())
+            if all(args):
+                return (operation, *args)
+    return None
+
+def parse_edits(feedback: str) -> Optional[List[Tuple[str, ...]]]:
+    """Operations of a purely mechanical request, or None when any part is open-ended"""
+    operations = []
+    for clause in _clauses(feedback):
+        # "replace X with Y and shorten to 100 words" is two operations. When either half does
+        # not parse, the greedy patterns would swallow it into a literal subject or replacement,
+        # so the whole request goes to the model
+        parts = [_parse_clause(part) for part in re.split(r"\s+and\s+", clause)]
+        if None in parts:
+            return None
+        operations.extend(parts)
+    return operations or None
+
+# ----------------- BODY STRUCTURE -----------------
+def _split_body(body: str) -> Tuple[List[str], List[str], List[str]]:
+    """(greeting, content paragraphs, closing) blocks of an email body"""
+    blocks = [block.strip() for block in re.split(r"\n\s*\n", body.strip()) if block.strip()]
+    greeting = blocks[:1] if blocks and len(blocks[0].split()) <= 8 and blocks[0].rstrip().endswith((",", ":")) else []
+    rest = blocks[len(greeting):]
+    closing_start = len(rest)
+    for index in range(len(rest) - 1, 0, -1):
+        if _SIGN_OFF.match(rest[index]):
+            closing_start = index
+            break
+    return greeting, rest[:closing_start], rest[closing_start:]
+
+def _join_body(greeting: List[str], content: List[str], closing: List[str]) -> str:
+    return "\n\n".join(greeting + content + closing)
+
+def _word_count(blocks: List[str]) -> int:
+    return sum(len(block.split()) for block in blocks)
+
+def _shorten(body: str, max_words: int) -> str:
+    """Drop trailing sentences of the longest paragraphs until the body fits; greeting and closing stay"""
+    greeting, content, closing = _split_body(body)
+    sentences = [_SENTENCE_END.split(paragraph) for paragraph in content]
+    while _word_count(greeting + closing) + sum(_word_count(s) for s in sentences) > max_words:
+        # The opening sentence of the first paragraph (the position applied for) goes last
+        candidates = [i for i, s in enumerate(sentences) if len(s) > 1 or (i > 0 and s)]
+        if not candidates:
+            break
+        longest = max(candidates, key=lambda i: _word_count(sentences[i]))
+        sentences[longest] = sentences[longest][:-1]
+    return _join_body(greeting, [" ".join(s) for s in sentences if s], closing)
+
+# ----------------- APPLYING -----------------
+def _whole_word(old: str) -> re.Pattern:
+    """`old` as a whole word or phrase ("team" but not "teammate")"""
+    return re.compile(r"(?<!\w)" + re.escape(old) + r"(?!\w)", re.IGNORECASE)
+
+def _replace(text: str, old: str, new: str) -> str:
+    return _whole_word(old).sub(lambda _: new, text)
+
+def _remove_from_sentence(sentence: str, pattern: re.Pattern) -> Optional[str]:
+    """`sentence` without the matches of `pattern`; "" when none of it is left, None when the rest would not read"""
+    for match in pattern.finditer(sentence):
+        before = re.search(r"(\w+)\W*$", sentence[:match.start()])
+        after = re.match(r"[\s,]*(\w+)", sentence[match.end():])
+        # "pipelines in." or "and at Example Corp": a preposition or conjunction left without its object
+        if before and before.group(1).lower() in FUNCTION_WORDS and (
+                after is None or after.group(1).lower() in FUNCTION_WORDS):
+            return None
+        # "is great." after removing its subject
+        if before is None and after is not None and not re.match(r"\s*,", sentence[match.end():]):
+            return None
+    rest = pattern.sub("", sentence)
+    words = re.findall(r"\w+", rest)
+    if not words:
+        return ""
+    if all(word.lower() in FUNCTION_WORDS for word in words):
+        return None
+    rest = re.sub(r"[ \t]{2,}", " ", rest)
+    rest = re.sub(r"[ \t]+([,.;:!?])", r"\1", rest)
+    rest = re.sub(r"[,;:]+(?=[.!?])|(?<=[,;:])[,;:]+", "", rest)
+    rest = re.sub(r"([.!?])[.!?]+", r"\1", rest)
+    return re.sub(r"^[\s,;:]+", "", rest).strip()
+
+def _remove(body: str, target: str) -> Optional[str]:
+    """`body` without `target`, dropping sentences that are removed whole; None when a sentence would be left broken"""
+    pattern = _whole_word(target)
+    # Sentences and the separators between them (sentence ends and line breaks)
+    pieces = re.split(r"(\s*\n\s*|(?<=[.!?])[ \t]+)", body)
+    kept: List[str] = []
+    for index in range(0, len(pieces), 2):
+        sentence = pieces[index]
+        separator = pieces[index + 1] if index + 1 < len(pieces) else ""
+        if pattern.search(sentence):
+            sentence = _remove_from_sentence(sentence, pattern)
+            if sentence is None:
+                return None
+            if not sentence:
+                # Keep the larger break (a paragraph end) when the sentence before it goes
+                if kept and separator.count("\n") > kept[-1].count("\n"):
+                    kept[-1] = separator
+                continue
+        kept += [sentence, separator]
+    return re.sub(r"\n{3,}", "\n\n", "".join(kept)).strip()
+
+def _apply(email: Dict[str, Any], operation: Tuple[str, ...]) -> bool:
+    kind, args = operation[0], operation[1:]
+    body = email.get('body', '')
+    if kind == "subject":
+        email['subject'] = args[0]
+    elif kind == "recipient":
+        email['to'] = args[0]
+    elif kind == "words":
+        max_words = int(args[0])
+        # Lengthening (or a body already within the limit) is the model's job
+        if max_words < 20 or max_words >= len(body.split()):
+            return False
+        shortened = _shorten(body, max_words)
+        # Run-on paragraphs cannot be cut at sentence ends; the model rewrites those
+        if shortened == body or len(shortened.split()) > max_words:
+            return False
+        email['body'] = shortened
+    elif kind == "remove_paragraph":
+        greeting, content, closing = _split_body(body)
+        if not content:
+            return False
+        index = ORDINALS[args[0].lower()]
+        if index >= len(content):
+            return False
+        content.pop(index)
+        email['body'] = _join_body(greeting, content, closing)
+    elif kind in ("replace", "replace_reversed"):
+        old, new = args if kind == "replace" else args[::-1]
+        if len(old) < MIN_TARGET_CHARS or not _whole_word(old).search(body + "\n" + email.get('subject', '')):
+            return False
+        email['body'] = _replace(body, old, new)
+        email['subject'] = _replace(email.get('subject', ''), old, new)
+    elif kind == "remove_text":
+        if len(args[0]) < MIN_TARGET_CHARS or not _whole_word(args[0]).search(body):
+            return False
+        body = _remove(body, args[0])
+        if body is None:
+            return False
+        email['body'] = body
+    else:
+        return False
+    return True
+
+def apply_edits(email: Dict[str, Any], feedback: str) -> Optional[Dict[str, Any]]:
+    """Edited copy of the email when the feedback is mechanical and applies cleanly, else None"""
+    operations = parse_edits(feedback)
+    if not operations:
+        return None
+    edited = dict(email)
+    for operation in operations:
+        if not _apply(edited, operation):
+            return None
+    return edited
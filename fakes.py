@@ -0,0 +1,352 @@
+"""Offline stand-ins for the external services used by agents.py: a
+deterministic chat model, a local SMTP sink (or any mail transport) and a
+tiny PDF writer for synthetic CVs. Used by the benchmark and load-test
+harnesses.
+"""
+import re
+import time
+import smtplib
+import socketserver
+import threading
+import typing
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+import agents
+from transports import Transport, get_transport, set_transport
+
+# ----------------- FAKE LLM -----------------
+FAKE_SKILLS = ["Python", "SQL", "Docker", "Kubernetes", "AWS", "React", "Communication", "Leadership"]
+APPROVAL_WORDS = ("approve", "send", "ok", "yes", "good", "looks good", "send it")
+
+
+def _words(count: int) -> str:
+    filler = "I am excited to apply and bring relevant experience to your team".split()
+    return " ".join(filler[i % len(filler)] for i in range(count))
+
+
+def _fill(schema, prompt: str, body_words: int):
+    """Build a deterministic instance of `schema` from the prompt"""
+    name = schema.__name__
+    if name == "DataExtractSchema" or (name == "DataExtractFields" and schema.model_fields):
+        values = dict(
+            name="Jane Doe",
+            skills=FAKE_SKILLS,
+            experience=["Software Engineer at Example Corp (2019-2024)"],
+            relevant_job_titles=["Software Engineer"],
+            certificates=["AWS Certified Developer"],
+            location="Berlin, Germany",
+            projects=["Open-source job assistant"],
+        )
+        # Partial schemas (the CV fast path) ask for a subset of the fields
+        return schema(**{field: values[field] for field in schema.model_fields})
+    if name == "EmailSchema":
+        emails = re.findall(r"[\w.+-]+@[\w-]+\.[\w.-]+", prompt)
+        return schema(
+            to=emails[-1] if emails else "hr@company.com",
+            subject="Application for the advertised position",
+            body=f"Dear Hiring Manager,\n\n{_words(body_words)}\n\nBest regards,\nJane Doe",
+            similarity=0.5,
+        )
+    if name == "JobAnalysisSchema":
+        posting = prompt.split("Analyze this job posting:", 1)[-1]
+        emails = re.findall(r"[\w.+-]+@[\w-]+\.[\w.-]+", posting)
+        return schema(
+            title=next((line.strip() for line in posting.splitlines() if line.strip()), "")[:80],
+            company="Example GmbH",
+            requirements=[skill for skill in FAKE_SKILLS if skill.lower() in posting.lower()],
+            contact_email=emails[0] if emails else "",
+            summary="Build and run backend services with a small product team.",
+        )
+    if name == "UserFeedbackSchema":
+        quoted = re.search(r'"(.*?)"', prompt, re.S)
+        user_input = (quoted.group(1) if quoted else prompt).strip().lower()
+        approved = any(user_input.startswith(word) for word in APPROVAL_WORDS)
+        return schema(suggestion="" if approved else user_input,
+                      llm_decision="approved" if approved else "needs_improvement")
+
+    # Generic fallback: fill every field with a type-appropriate placeholder
+    values: Dict[str, Any] = {}
+    for field_name, field in schema.model_fields.items():
+        annotation = field.annotation
+        origin = typing.get_origin(annotation)
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            values[field_name] = _fill(annotation, prompt, body_words)
+        elif origin is typing.Literal:
+            values[field_name] = typing.get_args(annotation)[0]
+        elif origin in (list, List):
+            values[field_name] = []
+        elif annotation is float:
+            values[field_name] = 0.5
+        elif annotation is int:
+            values[field_name] = 0
+        elif annotation is bool:
+            values[field_name] = False
+        else:
+            values[field_name] = "stub"
+    return schema(**values)
+
+
+class FakeStructuredModel:
+    """Result of FakeChatModel.with_structured_output"""
+
+    def __init__(self, chat: "FakeChatModel", schema, include_raw: bool = False):
+        self.chat = chat
+        self.schema = schema
+        self.include_raw = include_raw
+
+    def invoke(self, prompt, config=None, **kwargs):
+        prompt = prompt if isinstance(prompt, str) else str(prompt)
+        settings = FakeChatModel.settings
+        stall = settings["stall_seconds"] if FakeChatModel.stalls_next() else 0.0
+        time.sleep(settings["latency"] + settings["model_latency"].get(self.chat.model, 0.0)
+                   + settings["latency_per_1k_tokens"] * len(prompt) / 4000 + stall)
+        parsed = _fill(self.schema, prompt, settings["body_words"])
+
+        usage = {
+            "input_tokens": len(prompt) // 4 + 1,
+            "output_tokens": settings["output_tokens"],
+        }
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        FakeChatModel.record(usage)
+
+        if not self.include_raw:
+            return parsed
+        from langchain_core.messages import AIMessage
+        raw = AIMessage(content=parsed.model_dump_json(), usage_metadata=usage,
+                        response_metadata={"model_name": self.chat.model})
+        return {"raw": raw, "parsed": parsed, "parsing_error": None}
+
+
+class FakeChatModel:
+    """Deterministic drop-in for ChatGoogleGenerativeAI.
+
+    Latency and token counts are class-level settings so they apply to the
+    models that the graph factories construct internally.
+    """
+
+    # model_latency adds per-model seconds, e.g. {"gemini-1.5-pro": 2.0};
+    # every stall_every-th call (0 = none) hangs for another stall_seconds
+    settings = {"latency": 0.0, "latency_per_1k_tokens": 0.0, "output_tokens": 200, "body_words": 150,
+                "model_latency": {}, "stall_every": 0, "stall_seconds": 0.0}
+    calls: List[Dict[str, int]] = []
+    _started = 0
+    _lock = threading.Lock()
+
+    def __init__(self, model: str = "fake", temperature: float = 0.0, **kwargs):
+        self.model = model
+        self.temperature = temperature
+        self.kwargs = kwargs
+
+    def with_structured_output(self, schema, include_raw: bool = False, **kwargs):
+        return FakeStructuredModel(self, schema, include_raw)
+
+    @classmethod
+    def configure(cls, **settings):
+        unknown = set(settings) - set(cls.settings)
+        if unknown:
+            raise ValueError(f"Unknown fake model settings: {sorted(unknown)}")
+        cls.settings = {**cls.settings, **settings}
+
+    @classmethod
+    def record(cls, usage: Dict[str, int]):
+        with cls._lock:
+            cls.calls.append(usage)
+
+    @classmethod
+    def stalls_next(cls) -> bool:
+        """Count a started call; True when it is one of the injected stalls"""
+        with cls._lock:
+            cls._started += 1
+            return bool(cls.settings["stall_every"]) and cls._started % cls.settings["stall_every"] == 0
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls.calls = []
+            cls._started = 0
+
+
+@contextmanager
+def patch_llm(**settings):
+    """Swap ChatGoogleGenerativeAI in agents.py for FakeChatModel"""
+    original = agents.ChatGoogleGenerativeAI
+    previous = dict(FakeChatModel.settings)
+    FakeChatModel.configure(**settings)
+    FakeChatModel.reset()
+    agents.ChatGoogleGenerativeAI = FakeChatModel
+    try:
+        yield FakeChatModel
+    finally:
+        agents.ChatGoogleGenerativeAI = original
+        FakeChatModel.settings = previous
+
+# ----------------- LOCAL SMTP SINK -----------------
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO, AUTH, MAIL, RCPT, DATA, QUIT"""
+
+    def reply(self, line: str):
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        self.reply("220 localhost sink ready")
+        mail_from, rcpt_to = "", []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.reply("250-localhost")
+                self.reply("250-AUTH PLAIN LOGIN")
+                self.reply("250 8BITMIME")
+            elif verb == "HELO":
+                self.reply("250 localhost")
+            elif verb == "AUTH":
+                self.reply("235 2.7.0 Authentication successful")
+            elif verb == "MAIL":
+                mail_from, rcpt_to = command[10:].strip("<> "), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                rcpt_to.append(command[8:].strip("<> "))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                chunks = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line == b".\r\n":
+                        break
+                    chunks.append(data_line)
+                self.server.sink.deliver(mail_from, rcpt_to, b"".join(chunks))
+                self.reply("250 OK queued")
+            elif verb in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class _ThreadingSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    """Local SMTP server on 127.0.0.1 that stores every delivered message"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.messages: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._server = _ThreadingSMTPServer((host, port), _SMTPHandler)
+        self._server.sink = self
+        self.host, self.port = self._server.server_address
+        self._thread: Optional[threading.Thread] = None
+
+    def deliver(self, mail_from: str, rcpt_to: List[str], data: bytes):
+        with self._lock:
+            self.messages.append({"from": mail_from, "to": rcpt_to, "size": len(data)})
+
+    def start(self) -> "SMTPSink":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+@contextmanager
+def patch_smtp(sink: SMTPSink):
+    """Redirect smtplib.SMTP connections (e.g. smtp.gmail.com:587) to `sink`"""
+    original = smtplib.SMTP
+
+    class SinkSMTP(original):
+        def __init__(self, host: str = "", port: int = 0, *args, **kwargs):
+            super().__init__(sink.host, sink.port, *args, **kwargs)
+
+        def starttls(self, *args, **kwargs):
+            return (220, b"TLS skipped by local sink")
+
+    # Pooled connections must not outlive the redirect (in either direction)
+    get_transport().close()
+    smtplib.SMTP = SinkSMTP
+    try:
+        yield sink
+    finally:
+        get_transport().close()
+        smtplib.SMTP = original
+
+
+@contextmanager
+def patch_transport(transport: Transport):
+    """Deliver every email through `transport` (e.g. transports.MemoryTransport) instead of MAIL_TRANSPORT"""
+    previous = set_transport(transport)
+    try:
+        yield transport
+    finally:
+        transport.close()
+        set_transport(previous)
+
+# ----------------- SYNTHETIC CVS -----------------
+CV_LINES = [
+    "Jane Doe - Berlin, Germany - jane.doe@example.com",
+    "SKILLS: Python, SQL, Docker, Kubernetes, AWS, React, Communication, Leadership",
+    "EXPERIENCE: Software Engineer at Example Corp (2019-2024), built data pipelines and APIs",
+    "PROJECTS: Open-source job assistant, real-time analytics dashboard",
+    "CERTIFICATIONS: AWS Certified Developer",
+]
+
+# The same candidate without headings: the local parser is unsure and asks the model
+PROSE_CV_LINES = [
+    "Jane Doe",
+    "I am a software engineer who has spent five years building data pipelines and APIs.",
+    "Most of my work is in Python and SQL, deployed with Docker on AWS.",
+    "I enjoy leading small teams and communicating with stakeholders.",
+]
+
+
+def make_cv_pdf(path: str, pages: int = 1, lines_per_page: int = 40, cv_lines: Optional[List[str]] = None) -> str:
+    """Write a minimal text PDF with `pages` pages of CV-like content (CV_LINES by default)"""
+    cv_lines = cv_lines or CV_LINES
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page in range(pages):
+        lines = [cv_lines[(page + i) % len(cv_lines)] for i in range(lines_per_page)]
+        text = " T* ".join(
+            "(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") Tj" for line in lines
+        )
+        stream = f"BT /F1 9 Tf 12 TL 40 800 Td {text} ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        page_ids.append(len(objects))
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+    return path
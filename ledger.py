@@ -0,0 +1,142 @@
+"""Per-session ledger of model calls, cache lookups and SMTP operations.
+
+Every model call (node, model, seconds, tokens, estimated cost), cache lookup
+and SMTP phase is appended to the ledger of the session that caused it. The
+active ledger travels in a context variable: each Streamlit script or
+fragment run activates its session's ledger with recording(), and executors
+working on behalf of a session submit through contextvars.copy_context() so
+their threads record into the same ledger. Without an active ledger (CLI,
+benchmarks) nothing is recorded.
+
+LLM_PRICES overrides the USD prices per million tokens with JSON, e.g.
+    {"gemini-1.5-pro": {"input": 1.25, "output": 5.0}}
+"""
+import os
+import io
+import csv
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# model -> USD per million input / output tokens (prompts up to 128k tokens)
+DEFAULT_PRICES: Dict[str, Dict[str, float]] = {
+    "gemini-1.5-flash-8b": {"input": 0.0375, "output": 0.15},
+    "gemini-1.5-flash": {"input": 0.075, "output": 0.30},
+    "gemini-1.5-pro": {"input": 1.25, "output": 5.00},
+}
+# Input tokens served from a provider context cache are billed at this fraction
+CACHED_INPUT_FACTOR = 0.25
+
+FIELDS = ["time", "kind", "name", "detail", "status", "seconds",
+          "input_tokens", "cached_tokens", "output_tokens", "cost_usd"]
+
+def _load_prices() -> Dict[str, Dict[str, float]]:
+    prices = {model: dict(price) for model, price in DEFAULT_PRICES.items()}
+    for model, price in json.loads(os.environ.get("LLM_PRICES") or "{}").items():
+        prices[model] = {**prices.get(model, {"input": 0.0, "output": 0.0}), **price}
+    return prices
+
+PRICES = _load_prices()
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> float:
+    """Estimated USD cost of one call (0 for models without a price, e.g. fakes)"""
+    price = PRICES.get(model)
+    if not price:
+        return 0.0
+    uncached = max(0, input_tokens - cached_tokens)
+    return (uncached * price["input"] + cached_tokens * price["input"] * CACHED_INPUT_FACTOR
+            + output_tokens * price["output"]) / 1e6
+
+class Ledger:
+    """Bounded, thread-safe list of the operations of one session"""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self._entries = deque(maxlen=max_entries or int(os.environ.get("LEDGER_MAX_ENTRIES", 5000)))
+        self._lock = threading.Lock()
+
+    def add(self, kind: str, name: str, seconds: float = 0.0, detail: str = "", status: str = "ok",
+            input_tokens: int = 0, output_tokens: int = 0, cached_tokens: int = 0, cost_usd: float = 0.0):
+        entry = {"time": time.time(), "kind": kind, "name": name, "detail": detail, "status": status,
+                 "seconds": seconds, "input_tokens": input_tokens, "cached_tokens": cached_tokens,
+                 "output_tokens": output_tokens, "cost_usd": cost_usd}
+        with self._lock:
+            self._entries.append(entry)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._entries)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Totals per kind ("llm", "cache", "smtp"), plus hits/misses per cache"""
+        totals: Dict[str, Dict[str, Any]] = {}
+        for entry in self.entries():
+            kind = totals.setdefault(entry["kind"], {"count": 0, "errors": 0, "seconds": 0.0, "input_tokens": 0,
+                                                     "cached_tokens": 0, "output_tokens": 0, "cost_usd": 0.0})
+            kind["count"] += 1
+            kind["errors"] += entry["status"] not in ("ok", "hit", "miss")
+            for field in ("seconds", "input_tokens", "cached_tokens", "output_tokens", "cost_usd"):
+                kind[field] += entry[field]
+            if entry["kind"] == "cache":
+                cache = kind.setdefault("caches", {}).setdefault(entry["name"], {"hit": 0, "miss": 0})
+                cache[entry["status"]] = cache.get(entry["status"], 0) + 1
+        return totals
+
+    def to_csv(self) -> str:
+        out = io.StringIO()
+        writer = csv.DictWriter(out, FIELDS)
+        writer.writeheader()
+        for entry in self.entries():
+            writer.writerow({**entry, "time": datetime.fromtimestamp(entry["time"]).isoformat(timespec="milliseconds"),
+                             "seconds": f"{entry['seconds']:.6f}", "cost_usd": f"{entry['cost_usd']:.8f}"})
+        return out.getvalue()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# ----------------- ACTIVE LEDGER -----------------
+_active: ContextVar[Optional[Ledger]] = ContextVar("ledger", default=None)
+
+@contextmanager
+def recording(ledger: Optional[Ledger]):
+    """Record the operations of this block (and of work submitted from it) into `ledger`"""
+    token = _active.set(ledger)
+    try:
+        yield ledger
+    finally:
+        _active.reset(token)
+
+def current() -> Optional[Ledger]:
+    return _active.get()
+
+def record(kind: str, name: str, seconds: float = 0.0, **fields):
+    """Add an entry to the active ledger, if there is one"""
+    ledger = _active.get()
+    if ledger is not None:
+        ledger.add(kind, name, seconds, **fields)
+
+@contextmanager
+def timed(kind: str, name: str, detail: str = ""):
+    """Record the duration of the block; status "error" when it raises"""
+    ledger = _active.get()
+    if ledger is None:
+        yield
+        return
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        ledger.add(kind, name, time.perf_counter() - started, detail, status)
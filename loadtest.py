@@ -0,0 +1,345 @@
+"""Multi-session load test of the Streamlit app.
+
+Drives app.py headlessly through all four steps (configure, upload CV, job
+details, review & send) for N concurrent sessions with Streamlit's AppTest,
+against the fake chat model (or a recorded cassette) and a local SMTP sink.
+Every session is a separate AppTest in its own thread of this process, the
+way one Streamlit server runs its sessions, so RSS and thread counts are
+those of a single instance.
+
+Reports per-step latency percentiles, script runs per step (1 = no extra
+rerun), peak RSS and peak thread count:
+
+    python loadtest.py --sessions 1 4 16 --output load.json
+    python benchmark.py load --sessions 8 --compare load.json
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, List, Optional
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+# Interactions of one session in order; step 4 is split into drafting and sending
+STEPS = ["start", "configure", "upload", "job", "draft", "send"]
+
+JOB_TEXT = ("Backend Engineer at Example GmbH, Berlin. We are looking for a Python developer with SQL, "
+            "Docker and AWS experience to build data pipelines and APIs. Apply to jobs@example.com")
+
+# ----------------- PROCESS SAMPLING -----------------
+def rss_bytes() -> int:
+    """Current resident set size of this process (peak RSS where /proc is unavailable)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class ProcessSampler:
+    """Samples RSS and the live thread count in the background"""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.samples: List[tuple] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        self.samples.append((time.perf_counter(), rss_bytes(), threading.active_count()))
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self) -> "ProcessSampler":
+        self._sample()
+        self._thread = threading.Thread(target=self._loop, name="loadtest-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    def summary(self) -> Dict[str, Any]:
+        rss = [sample[1] for sample in self.samples]
+        threads = [sample[2] for sample in self.samples]
+        return {
+            "rss_mb_start": rss[0] / 2**20,
+            "rss_mb_peak": max(rss) / 2**20,
+            "rss_mb_end": rss[-1] / 2**20,
+            "threads_start": threads[0],
+            "threads_peak": max(threads),
+            "threads_end": threads[-1],
+        }
+
+# ----------------- CONCURRENT APPTESTS -----------------
+_runs = threading.local()
+
+
+@contextmanager
+def concurrent_apptests():
+    """Make AppTest safe to run from several threads and count the script runs of every interaction.
+
+    AppTest installs a mock Runtime singleton for each run and removes it
+    afterwards, so a session finishing its run would pull the runtime from
+    under the others, and it patches the config option that marks test runs
+    the same way. While this is active the last installed runtime stays
+    visible to every thread, the option stays set, and all runs share one
+    compiled script like the sessions of a real server (concurrent compiles
+    also trip CPython 3.11).
+
+    AppTest executes an interaction and all the reruns it triggers (st.rerun(),
+    fragment runs) in one LocalScriptRunner.run call on the calling thread;
+    take_script_runs() on the same thread returns the runs counted since it
+    was last called.
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner import ScriptRunnerEvent
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+    from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+    from streamlit.testing.v1.util import patch_config_options
+
+    original_run = LocalScriptRunner.run
+    original_instance, original_exists = Runtime.__dict__["instance"], Runtime.__dict__["exists"]
+    shared = []
+    script_cache = ScriptCache()
+    # Session threads touch st.session_state outside a script run; the warning about it is noise here
+    context_logger = logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context")
+    original_level = context_logger.level
+
+    def run(self, *args, **kwargs):
+        try:
+            return original_run(self, *args, **kwargs)
+        finally:
+            started = sum(1 for event in self.events if event == ScriptRunnerEvent.SCRIPT_STARTED)
+            _runs.count = getattr(_runs, "count", 0) + started
+
+    def instance(cls):
+        if cls._instance is not None:
+            shared[:] = [cls._instance]
+            return cls._instance
+        return shared[0] if shared else original_instance.__func__(cls)
+
+    def exists(cls):
+        return cls._instance is not None or bool(shared)
+
+    LocalScriptRunner.run = run
+    Runtime.instance, Runtime.exists = classmethod(instance), classmethod(exists)
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+    app_test.patch_config_options = lambda overrides: nullcontext()
+    context_logger.setLevel(logging.ERROR)
+    try:
+        with patch_config_options({"global.appTest": True}):
+            yield
+    finally:
+        app_test.patch_config_options = patch_config_options
+        LocalScriptRunner.run = original_run
+        Runtime.instance, Runtime.exists = original_instance, original_exists
+        app_test.ScriptCache = local_script_runner.ScriptCache = ScriptCache
+        context_logger.setLevel(original_level)
+
+
+def take_script_runs() -> int:
+    count, _runs.count = getattr(_runs, "count", 0), 0
+    return count
+
+# ----------------- ONE SESSION -----------------
+def _failure(at, step: str) -> Optional[str]:
+    """Error shown by the app after `step`, if any"""
+    if at.exception:
+        return f"{step}: {at.exception[0].value}"
+    if at.error:
+        return f"{step}: {at.error[0].value}"
+    return None
+
+
+def run_session(index: int, user: str, cv_bytes: bytes, think_seconds: float = 0.0,
+                timeout: float = 120.0) -> Dict[str, Any]:
+    """Drive one session of `user` from the first page load to a sent application.
+
+    Returns seconds and script runs per step, and the first error (the
+    session stops there).
+    """
+    from streamlit.testing.v1 import AppTest
+
+    steps: Dict[str, Dict[str, float]] = {}
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+
+    def step(name: str, interact):
+        if think_seconds:
+            time.sleep(think_seconds)
+        take_script_runs()
+        started = time.perf_counter()
+        interact()
+        steps[name] = {"seconds": time.perf_counter() - started, "script_runs": take_script_runs()}
+        return _failure(at, name)
+
+    def button(label: str):
+        return next(b for b in at.button if b.label == label)
+
+    interactions = [
+        ("start", lambda: at.run()),
+        ("configure", lambda: (
+            at.text_input(key="api_input").input("fake-key"),
+            at.text_input(key="gmail_email_input").input(user),
+            at.text_input(key="gmail_password_input").input("app-password"),
+            button("Next: Upload CV ➡️").click().run(),
+        )),
+        # Parsing happens on the upload rerun; the click moves on to step 3
+        ("upload", lambda: (
+            at.file_uploader[0].set_value((f"cv-{index}.pdf", cv_bytes, "application/pdf")).run(),
+            button("Next: Job Details ➡️").click().run(),
+        )),
+        ("job", lambda: at.text_area(key="job_input").input(JOB_TEXT).run()),
+        # Entering step 4 drafts the email (or picks up the speculative draft)
+        ("draft", lambda: button("Next: Review & Send ➡️").click().run()),
+        ("send", lambda: button("✉️ Send Application").click().run()),
+    ]
+
+    error = None
+    for name, interact in interactions:
+        try:
+            error = step(name, interact)
+        except Exception as e:
+            error = f"{name}: {type(e).__name__}: {e}"
+        if error:
+            break
+    if error is None and not at.success:
+        error = "send: no confirmation shown"
+    return {"session": index, "steps": steps, "completed": error is None, "error": error}
+
+# ----------------- LOAD RUN -----------------
+def run_load(sessions: int, ramp_seconds: float = 0.0, think_seconds: float = 0.0, timeout: float = 120.0,
+             latency: float = 0.05, latency_per_1k_tokens: float = 0.01, output_tokens: int = 200,
+             cassette: Optional[str] = None, time_scale: float = 1.0, cv_pages: int = 1) -> Dict[str, Any]:
+    """Run `sessions` concurrent sessions (started over `ramp_seconds`) and summarize them"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from benchmark import summarize
+    from cassette import replay
+    from fakes import SMTPSink, make_cv_pdf, patch_llm, patch_smtp
+    from scheduler import LLMScheduler, set_scheduler
+    from workers import get_pool
+    import warmup
+
+    set_scheduler(LLMScheduler(requests_per_minute=1e9, tokens_per_minute=1e12))
+    run_id = uuid.uuid4().hex[:8]
+    llm_patch = replay(cassette, time_scale) if cassette else \
+        patch_llm(latency=latency, latency_per_1k_tokens=latency_per_1k_tokens, output_tokens=output_tokens)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(make_cv_pdf(os.path.join(tmp, "cv.pdf"), pages=cv_pages), "rb") as f:
+            cv_bytes = f.read()
+
+        def start(index: int) -> Dict[str, Any]:
+            time.sleep(ramp_seconds * index / sessions)
+            # A new user per session and run, so no saved profile or earlier draft is reused
+            return run_session(index, f"loadtest-{run_id}-{index}@example.com", cv_bytes, think_seconds, timeout)
+
+        with SMTPSink() as sink, patch_smtp(sink), llm_patch as llm, concurrent_apptests(), ProcessSampler() as sampler:
+            llm.reset()
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="loadtest-session") as executor:
+                results = list(executor.map(start, range(sessions)))
+            wall = time.perf_counter() - started
+            # Client warm-up must finish against the fake model, and before the interpreter exits
+            warmup.wait(clients=True)
+
+    per_step = {}
+    for name in STEPS:
+        samples = [result["steps"][name] for result in results if name in result["steps"]]
+        per_step[name] = {
+            "seconds": summarize([sample["seconds"] for sample in samples]),
+            "script_runs": summarize([sample["script_runs"] for sample in samples]),
+        }
+    completed = sum(result["completed"] for result in results)
+    return {
+        "sessions": sessions,
+        "completed": completed,
+        "wall_seconds": wall,
+        "sessions_per_second": completed / wall if wall else 0.0,
+        "llm_calls": len(llm.calls),
+        "emails_delivered": len(sink.messages),
+        "steps": per_step,
+        "process": sampler.summary(),
+        # Process-wide since start-up: max_queued and rejected show back-pressure
+        "worker_pools": {name: get_pool(name).stats() for name in ("cpu", "io")},
+        "errors": [result["error"] for result in results if result["error"]][:5],
+    }
+
+
+def bench_load(args) -> Dict[str, Any]:
+    # The saved-profile and history stores of the test users stay out of the real database
+    previous_db = os.environ.get("PROFILE_DB")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["PROFILE_DB"] = os.path.join(tmp, "loadtest.db")
+        results = []
+        for sessions in args.sessions:
+            result = run_load(sessions, args.ramp_seconds, args.think_seconds, args.timeout,
+                              args.latency, args.latency_per_1k_tokens, args.output_tokens,
+                              args.cassette, args.time_scale, args.cv_pages)
+            results.append(result)
+            steps = " ".join(f"{name}={stats['seconds']['p95']:.2f}s" for name, stats in result["steps"].items())
+            print(f"sessions={sessions:<3} completed={result['completed']:<3} wall={result['wall_seconds']:.2f}s "
+                  f"rss={result['process']['rss_mb_peak']:.0f}MB threads={result['process']['threads_peak']} "
+                  f"p95 {steps}", file=sys.stderr)
+            for error in result["errors"]:
+                print(f"  error {error}", file=sys.stderr)
+    if previous_db is None:
+        os.environ.pop("PROFILE_DB", None)
+    else:
+        os.environ["PROFILE_DB"] = previous_db
+    violations = [f"{result['sessions'] - result['completed']} of {result['sessions']} sessions failed"
+                  for result in results if result["completed"] < result["sessions"]]
+    return {"benchmark": "load", "results": results, "violations": violations}
+
+# ----------------- ENTRY POINT -----------------
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16], help="Concurrent sessions per run")
+    parser.add_argument("--ramp-seconds", type=float, default=0.0, help="Spread the session starts over this time")
+    parser.add_argument("--think-seconds", type=float, default=0.0,
+                        help="Pause before every interaction, like a user reading the page")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds one interaction may take")
+    parser.add_argument("--cv-pages", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake LLM base latency in seconds")
+    parser.add_argument("--latency-per-1k-tokens", type=float, default=0.01)
+    parser.add_argument("--output-tokens", type=int, default=200)
+    parser.add_argument("--cassette", help="Replay the model calls recorded in this cassette (cassette.py)")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="With --cassette, multiply the recorded latencies by this (0 = no waiting)")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent-session load test of the Streamlit app")
+    add_arguments(parser)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+    report = bench_load(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 1 if report["violations"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
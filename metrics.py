@@ -0,0 +1,200 @@
+import os
+import json
+import time
+import threading
+import functools
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import ledger
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _label_key(labels: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_labels(key: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = ['%s="%s"' % (k, v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')) for k, v in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+# ----------------- REGISTRY -----------------
+class MetricsRegistry:
+    """Process-wide counters and latency histograms"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[tuple, float]] = {}
+        self._histograms: Dict[str, Dict[tuple, Dict[str, Any]]] = {}
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = {"count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * len(self.buckets)}
+            hist["count"] += 1
+            hist["sum"] += seconds
+            hist["max"] = max(hist["max"], seconds)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    hist["buckets"][i] += 1
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def register_collector(self, name: str, collect: Callable[[], Dict[str, Any]]):
+        """Add a callable whose dict of numbers is included in every export"""
+        with self._lock:
+            self._collectors[name] = collect
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    # ----------------- EXPORT -----------------
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serialisable view of all metrics"""
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            histograms = {
+                name: [
+                    {
+                        "labels": dict(key),
+                        "count": hist["count"],
+                        "sum": hist["sum"],
+                        "mean": hist["sum"] / hist["count"] if hist["count"] else 0.0,
+                        "max": hist["max"],
+                        "buckets": dict(zip((str(b) for b in self.buckets), hist["buckets"])),
+                    }
+                    for key, hist in series.items()
+                ]
+                for name, series in self._histograms.items()
+            }
+            collectors = dict(self._collectors)
+        return {
+            "timestamp": time.time(),
+            "counters": counters,
+            "histograms": histograms,
+            "collectors": {name: collect() for name, collect in collectors.items()},
+        }
+
+    def render_openmetrics(self) -> str:
+        """OpenMetrics text exposition of all metrics"""
+        snapshot = self.snapshot()
+        lines = []
+        for name, series in sorted(snapshot["counters"].items()):
+            lines.append(f"# TYPE {name} counter")
+            for sample in series:
+                key = _label_key(sample["labels"])
+                lines.append(f"{name}_total{_format_labels(key)} {sample['value']}")
+        for name, series in sorted(snapshot["histograms"].items()):
+            lines.append(f"# TYPE {name} histogram")
+            lines.append(f"# UNIT {name} seconds")
+            for sample in series:
+                key = _label_key(sample["labels"])
+                for bound, count in sample["buckets"].items():
+                    labels = _format_labels(key, 'le="%s"' % bound)
+                    lines.append(f"{name}_bucket{labels} {count}")
+                labels = _format_labels(key, 'le="+Inf"')
+                lines.append(f"{name}_bucket{labels} {sample['count']}")
+                lines.append(f"{name}_count{_format_labels(key)} {sample['count']}")
+                lines.append(f"{name}_sum{_format_labels(key)} {sample['sum']}")
+        for collector, values in sorted(snapshot["collectors"].items()):
+            for field, value in sorted(values.items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"# TYPE {collector}_{field} gauge")
+                    lines.append(f"{collector}_{field} {value}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# ----------------- HELPERS -----------------
+def instrument(node: str):
+    """Decorator recording duration and errors of a graph node or helper"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                registry.inc("node_errors", node=node)
+                raise
+            finally:
+                registry.observe("node_duration_seconds", time.perf_counter() - started, node=node)
+        return wrapper
+    return decorator
+
+def record_tokens(node: str, usage: Optional[Dict[str, Any]]):
+    """Count input/output tokens from a LangChain usage_metadata dict"""
+    registry.inc("llm_calls", node=node)
+    if not usage:
+        return
+    registry.inc("llm_tokens", usage.get("input_tokens", 0), node=node, kind="input")
+    registry.inc("llm_tokens", usage.get("output_tokens", 0), node=node, kind="output")
+
+def record_cache(cache: str, hit: bool, seconds: float = 0.0):
+    """Count a cache lookup (and add it to the session's ledger, see ledger.py)"""
+    result = "hit" if hit else "miss"
+    registry.inc("cache_requests", cache=cache, result=result)
+    ledger.record("cache", cache, seconds, status=result)
+
+# ----------------- HTTP EXPORTER -----------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body, content_type = json.dumps(registry.snapshot()).encode(), "application/json"
+        elif self.path.startswith("/metrics"):
+            body = registry.render_openmetrics().encode()
+            content_type = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+def serve(port: Optional[int] = None) -> Optional[ThreadingHTTPServer]:
+    """Start (once per process) an HTTP exporter on /metrics and /metrics.json.
+
+    The port defaults to the METRICS_PORT environment variable; nothing is
+    started when neither is set.
+    """
+    global _server
+    port = port or int(os.environ.get("METRICS_PORT", 0) or 0)
+    with _server_lock:
+        if _server is None and port:
+            _server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+        return _server
@@ -0,0 +1,170 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from agents import create_cv_subgraph, create_workflow, EmailSchema, send_email_directly
+from deadline import Deadline, with_deadline
+from metrics import record_cache
+from profiles import get_store, cv_hash
+
+# ----------------- HELPERS -----------------
+def to_dict(value: Any) -> Dict[str, Any]:
+    """Convert pydantic models / plain objects returned by the graphs to dicts"""
+    if hasattr(value, 'model_dump'):
+        return value.model_dump()
+    if isinstance(value, dict):
+        return value
+    if hasattr(value, '__dict__'):
+        return vars(value)
+    return value
+
+def profile_dict(parsed_data: Any) -> Dict[str, Any]:
+    """Parsed CV in the shape the UI uses"""
+    parsed_data = to_dict(parsed_data)
+    return {
+        'name': parsed_data.get('name', 'Not specified'),
+        'location': parsed_data.get('location', 'Not specified'),
+        'skills': parsed_data.get('skills', []),
+        'experience': parsed_data.get('experience', []),
+        'projects': parsed_data.get('projects', []),
+        'certificates': parsed_data.get('certificates', []),
+        'relevant_job_titles': parsed_data.get('relevant_job_titles', [])
+    }
+
+# Stages whose fallback leaves the parsed CV incomplete
+PARSE_STAGES = ("parse_cv", "parse_data")
+
+# ----------------- PIPELINE STEPS -----------------
+def _parse_cv(api_key: str, filepath: str, session_id: str = "default",
+              deadline: Optional[Deadline] = None) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """(parsed CV, complete); incomplete when the deadline left only the local parse"""
+    cv_workflow = create_cv_subgraph(api_key, session_id)
+    result = cv_workflow.invoke({"filepath": filepath}, with_deadline({}, deadline))
+
+    if not (result and 'parsed_data' in result and result['parsed_data']):
+        return None, False
+    return profile_dict(result['parsed_data']), not result.get('fallbacks')
+
+def parse_cv(api_key: str, filepath: str, session_id: str = "default",
+             deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+    """Run the CV subgraph and return the parsed CV in the shape the UI uses"""
+    return _parse_cv(api_key, filepath, session_id, deadline)[0]
+
+def load_or_parse_cv(api_key: str, filepath: str, user: str, session_id: str = "default",
+                     filename: str = "", deadline: Optional[Deadline] = None) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """Parsed CV from the profile store, parsing (and storing) it on a miss.
+
+    Returns (parsed_cv, from_store). A hit skips both PDF extraction and the LLM.
+    A profile cut short by the deadline is returned but not stored.
+    """
+    with open(filepath, 'rb') as f:
+        pdf_bytes = f.read()
+    store = get_store()
+    key = cv_hash(pdf_bytes)
+    
+    started = time.perf_counter()
+    profile = store.get(user, key)
+    record_cache("profile_store", profile is not None, time.perf_counter() - started)
+    if profile:
+        return profile['parsed'], True
+    
+    parsed_cv, complete = _parse_cv(api_key, filepath, session_id, deadline)
+    if parsed_cv and complete:
+        store.save(user, key, parsed_cv, filename or os.path.basename(filepath), pdf_bytes)
+    return parsed_cv, False
+
+def load_or_parse_cvs(api_key: str, filepaths: List[str], user: str, session_id: str = "default",
+                      max_workers: int = 4, deadline: Optional[Deadline] = None) -> List[Tuple[Optional[Dict[str, Any]], bool]]:
+    """load_or_parse_cv for several CVs in parallel, in the order given (sharing one deadline)"""
+    if not filepaths:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(filepaths)))) as executor:
+        return list(executor.map(lambda path: load_or_parse_cv(api_key, path, user, session_id, deadline=deadline),
+                                 filepaths))
+
+def draft_application(wf, job_text: str, parsed_cv: Dict[str, Any], cv_path: str,
+                      config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Run the workflow up to (but not including) sending and return the draft.
+
+    A deadline in `config` (see deadline.with_deadline) bounds the whole run.
+    """
+    initial_state = {
+        "filepath": cv_path,
+        "text": job_text,
+        "parsed_data": parsed_cv,
+        "fallbacks": None
+    }
+    result = wf.invoke(initial_state, config, interrupt_before=["send_email"])
+
+    if not (result and 'email_schema' in result):
+        return None
+    return to_dict(result['email_schema'])
+
+def revise_draft(wf, config: Dict[str, Any], email_draft: Dict[str, Any], feedback: str,
+                 context: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """Apply revision feedback to the current draft and return the revised draft.
+
+    Mechanical edits are applied locally; open-ended feedback goes through the
+    workflow's revision loop. `context` (job text, parsed CV, CV path) seeds a
+    workflow that did not draft this email itself, e.g. for a reused draft.
+    """
+    wf.update_state(config, dict(context or {}, email_schema=email_draft, user_input=feedback, fallbacks=None),
+                    as_node="draft_email")
+    result = wf.invoke(None, config, interrupt_before=["send_email"])
+    if not (result and 'email_schema' in result):
+        return None
+    return to_dict(result['email_schema'])
+
+def get_alternates(wf, config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Scored best-of-N candidates of the last draft (best first, empty for single drafts)"""
+    return wf.get_state(config).values.get('alternates') or []
+
+def get_fallbacks(wf, config: Dict[str, Any]) -> List[str]:
+    """Stages of the last run that returned a partial result at the deadline"""
+    return wf.get_state(config).values.get('fallbacks') or []
+
+def create_draft(api_key: str, gmail_email: str, gmail_password: str, session_id: str,
+                 job_text: str, parsed_cv: Dict[str, Any], cv_path: str,
+                 config: Dict[str, Any], variants: int = 1) -> Tuple[Any, Optional[Dict[str, Any]]]:
+    """Build a workflow and draft one application; returns (workflow, draft).
+
+    Takes plain values only (no Streamlit state) so it can run on a background thread.
+    """
+    wf = create_workflow(api_key, gmail_email, gmail_password, session_id, variants)
+    return wf, draft_application(wf, job_text, parsed_cv, cv_path, config)
+
+def parse_and_draft(api_key: str, gmail_email: str, gmail_password: str, session_id: str,
+                    job_text: str, cv_path: str, user: str, config: Dict[str, Any], variants: int = 1,
+                    filename: str = "") -> Tuple[Any, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Draft from a CV that has not been parsed yet; returns (workflow, draft, parsed_cv).
+
+    A saved profile is used when there is one. Otherwise the CV is parsed by the
+    draft call itself (one model round trip instead of two) and the extracted
+    profile is saved like load_or_parse_cv would.
+    """
+    with open(cv_path, 'rb') as f:
+        pdf_bytes = f.read()
+    store = get_store()
+    key = cv_hash(pdf_bytes)
+    
+    started = time.perf_counter()
+    profile = store.get(user, key)
+    record_cache("profile_store", profile is not None, time.perf_counter() - started)
+    if profile:
+        wf, draft = create_draft(api_key, gmail_email, gmail_password, session_id, job_text,
+                                 profile['parsed'], cv_path, config, variants)
+        return wf, draft, profile['parsed']
+    
+    wf = create_workflow(api_key, gmail_email, gmail_password, session_id, variants, fused=True)
+    draft = draft_application(wf, job_text, {}, cv_path, config)
+    parsed_data = wf.get_state(config).values.get('parsed_data')
+    parsed_cv = profile_dict(parsed_data) if parsed_data else None
+    if parsed_cv and not set(PARSE_STAGES) & set(get_fallbacks(wf, config)):
+        store.save(user, key, parsed_cv, filename or os.path.basename(cv_path), pdf_bytes)
+    return wf, draft, parsed_cv
+
+def send_application(email_draft, gmail_email: str, gmail_password: str, cv_path: str = "",
+                     deadline: Optional[Deadline] = None) -> str:
+    """Send a draft (dict or EmailSchema) with the CV attached"""
+    email_obj = EmailSchema(**email_draft) if isinstance(email_draft, dict) else email_draft
+    return send_email_directly(email_obj, gmail_email, gmail_password, cv_path, deadline)
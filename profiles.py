@@ -0,0 +1,208 @@
+import os
+import re
+import json
+import math
+import time
+import base64
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from agents import DataExtractSchema
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".job_assistant", "profiles.db")
+
+# cv_hash() values: hex SHA-256
+HASH_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+# ----------------- DERIVED ARTIFACTS -----------------
+def cv_hash(pdf_bytes: bytes) -> str:
+    """Content hash identifying a CV file"""
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+def skill_vector(parsed: Dict[str, Any]) -> Dict[str, float]:
+    """L2-normalised term weights: skills count fully, titles/certificates half"""
+    weights: Dict[str, float] = {}
+    for field, weight in (('skills', 1.0), ('relevant_job_titles', 0.5), ('certificates', 0.5)):
+        for item in parsed.get(field) or []:
+            term = re.sub(r"\s+", " ", str(item).strip().lower())
+            if term:
+                weights[term] = max(weights.get(term, 0.0), weight)
+    norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+    return {term: w / norm for term, w in weights.items()}
+
+def compact_summary(parsed: Dict[str, Any], max_chars: int = 400) -> str:
+    """One-paragraph candidate summary, small enough to reuse in prompts"""
+    parts = [parsed.get('name') or 'Candidate']
+    if parsed.get('location'):
+        parts[0] += f" ({parsed['location']})"
+    if parsed.get('relevant_job_titles'):
+        parts.append("Titles: " + ", ".join(parsed['relevant_job_titles'][:3]))
+    if parsed.get('skills'):
+        parts.append("Skills: " + ", ".join(parsed['skills'][:10]))
+    if parsed.get('experience'):
+        parts.append("Recent: " + parsed['experience'][0])
+    if parsed.get('certificates'):
+        parts.append("Certificates: " + ", ".join(parsed['certificates'][:3]))
+    summary = ". ".join(parts)
+    return summary if len(summary) <= max_chars else summary[:max_chars - 3].rstrip() + "..."
+
+# ----------------- STORE -----------------
+class ProfileStore:
+    """SQLite store of parsed CVs keyed by (user, CV content hash)"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS profiles (
+        user TEXT NOT NULL,
+        cv_hash TEXT NOT NULL,
+        name TEXT NOT NULL DEFAULT '',
+        filename TEXT NOT NULL DEFAULT '',
+        parsed TEXT NOT NULL,
+        skill_vector TEXT NOT NULL,
+        summary TEXT NOT NULL,
+        cv_pdf BLOB,
+        created_at REAL NOT NULL,
+        last_used_at REAL NOT NULL,
+        PRIMARY KEY (user, cv_hash)
+    );
+    CREATE INDEX IF NOT EXISTS profiles_cv_hash ON profiles (cv_hash);
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.environ.get("PROFILE_DB", DEFAULT_DB_PATH)
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; Streamlit sessions run on different threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            if self.path != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_to_profile(row: sqlite3.Row, with_pdf: bool = False) -> Dict[str, Any]:
+        profile = {
+            "user": row["user"],
+            "cv_hash": row["cv_hash"],
+            "name": row["name"],
+            "filename": row["filename"],
+            "parsed": json.loads(row["parsed"]),
+            "skill_vector": json.loads(row["skill_vector"]),
+            "summary": row["summary"],
+            "created_at": row["created_at"],
+            "last_used_at": row["last_used_at"],
+        }
+        if with_pdf:
+            profile["cv_pdf"] = row["cv_pdf"]
+        return profile
+
+    def get(self, user: str, cv_hash: str, with_pdf: bool = False) -> Optional[Dict[str, Any]]:
+        """Profile for this user and CV hash (touches last_used_at), or None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM profiles WHERE user = ? AND cv_hash = ?", (user, cv_hash)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE profiles SET last_used_at = ? WHERE user = ? AND cv_hash = ?",
+                         (time.time(), user, cv_hash))
+        return self._row_to_profile(row, with_pdf)
+
+    def save(self, user: str, cv_hash: str, parsed: Dict[str, Any], filename: str = "",
+             cv_pdf: Optional[bytes] = None) -> Dict[str, Any]:
+        """Insert or replace a profile; derived artifacts are recomputed"""
+        parsed = DataExtractSchema(**{k: v for k, v in parsed.items() if k in DataExtractSchema.model_fields}).model_dump()
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """INSERT INTO profiles (user, cv_hash, name, filename, parsed, skill_vector, summary, cv_pdf,
+                                         created_at, last_used_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (user, cv_hash) DO UPDATE SET
+                       name = excluded.name, filename = excluded.filename, parsed = excluded.parsed,
+                       skill_vector = excluded.skill_vector, summary = excluded.summary,
+                       cv_pdf = COALESCE(excluded.cv_pdf, profiles.cv_pdf), last_used_at = excluded.last_used_at""",
+                (user, cv_hash, parsed.get('name', ''), filename, json.dumps(parsed),
+                 json.dumps(skill_vector(parsed)), compact_summary(parsed), cv_pdf, now, now),
+            )
+        return self.get(user, cv_hash)
+
+    def list(self, user: str) -> List[Dict[str, Any]]:
+        """All profiles of a user, most recently used first (without PDFs)"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM profiles WHERE user = ? ORDER BY last_used_at DESC", (user,)).fetchall()
+        return [self._row_to_profile(row) for row in rows]
+
+    def delete(self, user: str, cv_hash: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM profiles WHERE user = ? AND cv_hash = ?", (user, cv_hash))
+
+    # ----------------- JSON IMPORT / EXPORT -----------------
+    def export_json(self, user: str) -> str:
+        """All of a user's profiles (PDFs base64-encoded) as a JSON document"""
+        profiles = []
+        for profile in self.list(user):
+            full = self.get(user, profile["cv_hash"], with_pdf=True)
+            pdf = full.pop("cv_pdf")
+            full.pop("user")
+            full["cv_pdf_base64"] = base64.b64encode(pdf).decode("ascii") if pdf else None
+            profiles.append(full)
+        return json.dumps({"version": 1, "profiles": profiles}, indent=2)
+
+    def import_json(self, user: str, text: str) -> Tuple[int, int]:
+        """Import profiles exported by export_json; returns (stored, skipped).
+
+        A record is skipped when its parsed data does not validate against
+        DataExtractSchema, its PDF does not decode, or its cv_hash is malformed
+        or does not match the PDF it carries (a stale or edited export).
+        """
+        document = json.loads(text)
+        if not isinstance(document, dict) or not isinstance(document.get("profiles"), list):
+            raise ValueError("Not a profile export: expected an object with a 'profiles' list")
+        stored = skipped = 0
+        for profile in document["profiles"]:
+            try:
+                hash_value, parsed, pdf = self._validate_import(profile)
+            except (ValueError, TypeError):
+                # pydantic.ValidationError and binascii.Error are ValueErrors
+                skipped += 1
+                continue
+            self.save(user, hash_value, parsed, str(profile.get("filename") or ""), pdf)
+            stored += 1
+        return stored, skipped
+
+    @staticmethod
+    def _validate_import(profile: Any) -> Tuple[str, Dict[str, Any], Optional[bytes]]:
+        """(cv hash, parsed data, PDF) of one exported record; raises ValueError when it cannot be trusted"""
+        if not isinstance(profile, dict) or not isinstance(profile.get("parsed"), dict):
+            raise ValueError("record without parsed data")
+        parsed = DataExtractSchema.model_validate(
+            {k: v for k, v in profile["parsed"].items() if k in DataExtractSchema.model_fields}).model_dump()
+        pdf = base64.b64decode(profile["cv_pdf_base64"], validate=True) if profile.get("cv_pdf_base64") else None
+        claimed = profile.get("cv_hash")
+        if pdf is not None:
+            if claimed and claimed != cv_hash(pdf):
+                raise ValueError("cv_hash does not match the CV")
+            return cv_hash(pdf), parsed, pdf
+        if not isinstance(claimed, str) or not HASH_PATTERN.fullmatch(claimed):
+            raise ValueError("malformed cv_hash")
+        return claimed, parsed, None
+
+# ----------------- SHARED INSTANCE -----------------
+_store: Optional[ProfileStore] = None
+_store_lock = threading.Lock()
+
+def get_store() -> ProfileStore:
+    """Return the process-wide profile store (path from PROFILE_DB)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ProfileStore()
+        return _store
@@ -0,0 +1,244 @@
+"""Local ranking of large job feeds against a parsed CV.
+
+Postings are read as a stream (JSONL or mbox), hashed into sparse
+unigram/bigram feature vectors one chunk at a time and scored with a
+sparse-matrix x dense-matrix product against the CV term weights. Only a
+top-K heap and the current chunk are kept in memory, so feeds of any size
+rank in bounded memory without a single LLM call.
+"""
+import re
+import sys
+import json
+import heapq
+import zlib
+import mailbox
+from email.message import Message
+from itertools import chain, islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from scoring import matched_skills
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9+#]+")
+_BIGRAM_MULTIPLIER = np.uint64(1000003)
+_MASK32 = np.uint64((1 << 32) - 1)
+
+# Weight of each CV field in the query vector
+FIELD_WEIGHTS = {"skills": 1.0, "relevant_job_titles": 0.5, "certificates": 0.5}
+
+# ----------------- FEED INPUT -----------------
+def read_jobs(stream) -> Iterator[Tuple[str, str]]:
+    """Yield (job_id, job_text) pairs from a JSONL stream"""
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        job_id = str(record.get('id') or record.get('job_id') or record.get('request_id') or line_number)
+        text = record.get('job_text') or record.get('text') or record.get('body') or ''
+        if record.get('title'):
+            text = f"{record['title']}\n\n{text}"
+        yield job_id, text
+
+def _message_text(message: Message) -> str:
+    """Subject plus the plain-text body (HTML stripped when there is no text part)"""
+    parts = list(message.walk()) if message.is_multipart() else [message]
+    bodies = {}
+    for part in parts:
+        content_type = part.get_content_type()
+        if content_type in ("text/plain", "text/html") and content_type not in bodies:
+            payload = part.get_payload(decode=True) or b""
+            bodies[content_type] = payload.decode(part.get_content_charset() or "utf-8", errors="replace")
+    body = bodies.get("text/plain") or re.sub(r"<[^>]+>", " ", bodies.get("text/html", ""))
+    return f"{message.get('Subject', '')}\n\n{body}"
+
+def _mbox_records(path: str) -> Iterator[Tuple[str, str]]:
+    for index, message in enumerate(mailbox.mbox(path, create=False), start=1):
+        yield str(message.get('Message-ID') or index).strip(), _message_text(message)
+
+def read_feed(path: str, fmt: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+    """Yield (job_id, job_text) from a JSONL file ('-' for stdin) or an mbox file"""
+    if path == '-':
+        yield from read_jobs(sys.stdin)
+        return
+    if fmt is None:
+        with open(path, 'rb') as f:
+            fmt = "mbox" if path.endswith(".mbox") or f.read(5) == b"From " else "jsonl"
+    if fmt == "mbox":
+        yield from _mbox_records(path)
+    else:
+        with open(path, encoding='utf-8') as f:
+            yield from read_jobs(f)
+
+# ----------------- VECTORIZATION -----------------
+class HashingVectorizer:
+    """Unigram + bigram features hashed into `2 ** bits` dimensions (no vocabulary to keep)"""
+
+    def __init__(self, bits: int = 20, cache_size: int = 500_000):
+        self._bits = np.uint64(bits)
+        self.dimensions = 1 << bits
+        self._mask = np.uint64(self.dimensions - 1)
+        self._cache_size = cache_size
+        self._token_hashes: Dict[str, int] = {}
+
+    def _hash_tokens(self, tokens: List[str]) -> np.ndarray:
+        cache = self._token_hashes
+        if len(cache) > self._cache_size:
+            cache.clear()
+        for token in set(tokens).difference(cache):
+            cache[token] = zlib.crc32(token.encode("utf-8"))
+        return np.fromiter(map(cache.__getitem__, tokens), dtype=np.uint64, count=len(tokens))
+
+    def transform(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Binary CSR structure (indptr, sorted indices per row) of a chunk of texts"""
+        token_lists = [TOKEN_PATTERN.findall(text.lower()) for text in texts]
+        hashes = self._hash_tokens(list(chain.from_iterable(token_lists)))
+        rows = np.repeat(np.arange(len(texts), dtype=np.uint64),
+                         np.fromiter(map(len, token_lists), dtype=np.int64, count=len(texts)))
+
+        # Bigrams only between neighbouring tokens of the same text
+        same_row = rows[:-1] == rows[1:]
+        bigrams = ((hashes[:-1] * _BIGRAM_MULTIPLIER + hashes[1:]) & _MASK32)[same_row]
+        features = np.concatenate([hashes, bigrams]) & self._mask
+        feature_rows = np.concatenate([rows, rows[:-1][same_row]])
+
+        # One sort for the whole chunk deduplicates (row, feature) pairs and orders them like CSR
+        keys = np.sort((feature_rows << self._bits) | features)
+        keys = keys[np.concatenate([keys[:1] == keys[:1], keys[1:] != keys[:-1]])]
+        indptr = np.searchsorted(keys >> self._bits, np.arange(len(texts) + 1, dtype=np.uint64))
+        return indptr.astype(np.int64), (keys & self._mask).astype(np.int64)
+
+    def features(self, text: str) -> np.ndarray:
+        """Sorted distinct feature ids of a text"""
+        return self.transform([text])[1]
+
+    def term_feature(self, term: str) -> Optional[int]:
+        """Feature id of a one- or two-word term; longer terms use their first two words"""
+        tokens = TOKEN_PATTERN.findall(term.lower())[:2]
+        if not tokens:
+            return None
+        hashes = self._hash_tokens(tokens)
+        value = hashes[0] if len(tokens) == 1 else (hashes[0] * _BIGRAM_MULTIPLIER + hashes[1]) & _MASK32
+        return int(value & self._mask)
+
+def query_matrix(vectorizer: HashingVectorizer, parsed_cvs: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """(feature ids, weights) of all CVs: weights is (len(ids), len(parsed_cvs)), columns sum to 1"""
+    columns: List[Dict[int, float]] = []
+    for parsed in parsed_cvs:
+        column: Dict[int, float] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in parsed.get(field) or []:
+                feature = vectorizer.term_feature(str(term))
+                if feature is not None:
+                    column[feature] = max(column.get(feature, 0.0), weight)
+        columns.append(column)
+
+    ids = np.array(sorted({feature for column in columns for feature in column}), dtype=np.int64)
+    position = {feature: i for i, feature in enumerate(ids.tolist())}
+    weights = np.zeros((len(ids), len(columns)), dtype=np.float64)
+    for j, column in enumerate(columns):
+        for feature, weight in column.items():
+            weights[position[feature], j] = weight
+        total = weights[:, j].sum()
+        if total:
+            weights[:, j] /= total
+    return ids, weights
+
+def score_chunk(indptr: np.ndarray, indices: np.ndarray, query_ids: np.ndarray,
+                query_weights: np.ndarray) -> np.ndarray:
+    """Sparse chunk (binary CSR) times query weights -> (rows, CVs) scores in [0, 1]"""
+    rows = len(indptr) - 1
+    # Only non-zeros that hit a query feature contribute; find them with one sorted search
+    slots = np.searchsorted(query_ids, indices)
+    slots[slots == len(query_ids)] = 0
+    hits = np.flatnonzero(query_ids[slots] == indices) if len(query_ids) else np.zeros(0, dtype=np.int64)
+    row_of_hit = np.searchsorted(indptr, hits, side='right') - 1
+    scores = np.zeros((rows, query_weights.shape[1]), dtype=np.float64)
+    np.add.at(scores, row_of_hit, query_weights[slots[hits]])
+    return scores
+
+# ----------------- RANKING -----------------
+def match_matrix(job_texts: List[str], parsed_cvs: List[Dict[str, Any]],
+                 vectorizer: Optional[HashingVectorizer] = None) -> np.ndarray:
+    """(jobs, CVs) match scores of every CV against every job from one sparse product"""
+    vectorizer = vectorizer or HashingVectorizer()
+    query_ids, query_weights = query_matrix(vectorizer, parsed_cvs)
+    indptr, indices = vectorizer.transform(job_texts)
+    return score_chunk(indptr, indices, query_ids, query_weights)
+
+def best_cvs(feed: Iterable[Tuple[str, str]], parsed_cvs: List[Dict[str, Any]],
+             chunk_size: int = 200) -> Iterator[Tuple[str, str, int, float]]:
+    """Yield (job_id, job_text, best CV index, score) for a stream of jobs, one matrix per chunk"""
+    vectorizer = HashingVectorizer()
+    feed = iter(feed)
+    while True:
+        chunk = list(islice(feed, chunk_size))
+        if not chunk:
+            break
+        scores = match_matrix([text for _, text in chunk], parsed_cvs, vectorizer)
+        best = scores.argmax(axis=1)
+        for (job_id, text), index, row in zip(chunk, best, scores):
+            yield job_id, text, int(index), float(row[index])
+
+def rank_feed(feed: Iterable[Tuple[str, str]], parsed_cvs: List[Dict[str, Any]], top_k: int = 20,
+              chunk_size: int = 1000, min_score: float = 0.0,
+              vectorizer: Optional[HashingVectorizer] = None) -> List[List[Dict[str, Any]]]:
+    """Best `top_k` postings scoring at least `min_score` for every CV (best first), in one streaming pass"""
+    vectorizer = vectorizer or HashingVectorizer()
+    query_ids, query_weights = query_matrix(vectorizer, parsed_cvs)
+    heaps: List[List[tuple]] = [[] for _ in parsed_cvs]
+    feed = iter(feed)
+    seen = 0
+
+    while True:
+        chunk = list(islice(feed, chunk_size))
+        if not chunk:
+            break
+        indptr, indices = vectorizer.transform([text for _, text in chunk])
+        scores = score_chunk(indptr, indices, query_ids, query_weights)
+        for j, heap in enumerate(heaps):
+            column = scores[:, j]
+            # Only rows that can enter the heap are touched in Python: while it is filling, anything
+            # at or above min_score (so a CV matching nothing still gets K postings); after that,
+            # only scores beating the current K-th (ties go to the earlier posting)
+            candidates = column > heap[0][0] if len(heap) >= top_k else column >= min_score
+            for row in np.flatnonzero(candidates):
+                item = (float(column[row]), -(seen + int(row)), chunk[row])
+                if len(heap) < top_k:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+        seen += len(chunk)
+
+    rankings = []
+    for parsed, heap in zip(parsed_cvs, heaps):
+        rankings.append([
+            {
+                "id": job_id,
+                "job_text": text,
+                "score": round(score, 4),
+                "matched_skills": matched_skills(parsed.get('skills') or [], text),
+            }
+            for score, _, (job_id, text) in sorted(heap, reverse=True)
+        ])
+    return rankings
+
+def rank_jobs(feed: Iterable[Tuple[str, str]], parsed_cv: Dict[str, Any], top_k: int = 20,
+              chunk_size: int = 1000, min_score: float = 0.0) -> List[Dict[str, Any]]:
+    """Best `top_k` postings for a single CV"""
+    return rank_feed(feed, [parsed_cv], top_k, chunk_size, min_score)[0]
+
+def rank_feed_best_cv(feed: Iterable[Tuple[str, str]], parsed_cvs: List[Dict[str, Any]], top_k: int = 20,
+                      chunk_size: int = 1000, min_score: float = 0.0) -> List[Dict[str, Any]]:
+    """Best `top_k` postings by their best-matching CV, each tagged with that CV's index.
+
+    A posting in the overall top-K is always in the top-K of the CV it matches best,
+    so merging the per-CV rankings is exact.
+    """
+    best: Dict[str, Dict[str, Any]] = {}
+    for cv_index, ranked in enumerate(rank_feed(feed, parsed_cvs, top_k, chunk_size, min_score)):
+        for job in ranked:
+            if job["id"] not in best or job["score"] > best[job["id"]]["score"]:
+                best[job["id"]] = dict(job, cv_index=cv_index)
+    return sorted(best.values(), key=lambda job: -job["score"])[:top_k]
@@ -0,0 +1,126 @@
+"""Per-node model routing with latency budgets.
+
+Every graph node has a route: the model it should use and a latency budget
+for one call. Cheap extraction and classification nodes default to the
+fastest tier; drafting and editing stay on gemini-1.5-flash, the model every
+call used before routing (the scheduler's per-minute budget is sized for it).
+The pro tier is opt-in through MODEL_ROUTES. When the observed latency
+of a node's model exceeds its budget, calls are downgraded to the next
+faster tier; every PROBE_EVERY-th downgraded call still goes to the
+configured model so the router notices when it has recovered.
+
+MODEL_ROUTES overrides routes with JSON, e.g.
+    {"draft_email": {"model": "gemini-1.5-pro", "budget": 20}, "human_in_loop": "gemini-1.5-flash"}
+"""
+import os
+import re
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from metrics import registry
+
+# Fastest first
+MODEL_TIERS = ["gemini-1.5-flash-8b", "gemini-1.5-flash", "gemini-1.5-pro"]
+
+# node -> (model, latency budget in seconds for one call)
+DEFAULT_ROUTES: Dict[str, Tuple[str, float]] = {
+    "parse_data": ("gemini-1.5-flash-8b", 10.0),
+    "analyze_job": ("gemini-1.5-flash-8b", 8.0),
+    "human_in_loop": ("gemini-1.5-flash-8b", 3.0),
+    "draft_email": ("gemini-1.5-flash", 15.0),
+    "edit_message_node": ("gemini-1.5-flash", 10.0),
+}
+DEFAULT_ROUTE = ("gemini-1.5-flash", 10.0)
+
+PROBE_EVERY = int(os.environ.get("ROUTE_PROBE_EVERY", 10))
+EWMA_ALPHA = 0.3
+
+def _load_routes() -> Dict[str, Tuple[str, float]]:
+    routes = dict(DEFAULT_ROUTES)
+    overrides = json.loads(os.environ.get("MODEL_ROUTES") or "{}")
+    for node, route in overrides.items():
+        model, budget = routes.get(node, DEFAULT_ROUTE)
+        if isinstance(route, str):
+            model = route
+        else:
+            model, budget = route.get("model", model), float(route.get("budget", budget))
+        routes[node] = (model, budget)
+    return routes
+
+class Router:
+    """Chooses the model of each call from its node's route and recent latencies"""
+
+    def __init__(self, routes: Optional[Dict[str, Tuple[str, float]]] = None, tiers: Optional[List[str]] = None):
+        self.routes = routes if routes is not None else _load_routes()
+        self.tiers = tiers or MODEL_TIERS
+        self._lock = threading.Lock()
+        # (node, model) -> exponentially weighted mean latency of one call
+        self._latency: Dict[Tuple[str, str], float] = {}
+        self._downgraded_calls: Dict[str, int] = {}
+
+    def route(self, node: str) -> Tuple[str, float]:
+        return self.routes.get(node, DEFAULT_ROUTE)
+
+    def models(self) -> List[str]:
+        return sorted({model for model, _ in self.routes.values()} | {DEFAULT_ROUTE[0]})
+
+    def _faster(self, model: str) -> Optional[str]:
+        if model not in self.tiers:
+            return None
+        index = self.tiers.index(model)
+        return self.tiers[index - 1] if index > 0 else None
+
+    def choose(self, node: str, budget: Optional[float] = None) -> Tuple[str, bool]:
+        """(model, downgraded) for the next call of this node; `budget` overrides the route's"""
+        model, route_budget = self.route(node)
+        budget = route_budget if budget is None else min(budget, route_budget)
+        with self._lock:
+            chosen = model
+            estimate = self._latency.get((node, chosen))
+            while estimate is not None and estimate > budget:
+                faster = self._faster(chosen)
+                if faster is None:
+                    break
+                chosen = faster
+                estimate = self._latency.get((node, chosen))
+            if chosen != model:
+                calls = self._downgraded_calls.get(node, 0) + 1
+                # Re-measure the configured model now and then
+                self._downgraded_calls[node] = 0 if calls >= PROBE_EVERY else calls
+                if calls >= PROBE_EVERY:
+                    chosen = model
+        downgraded = chosen != model
+        registry.inc("route_requests", node=node, model=chosen, downgraded="yes" if downgraded else "no")
+        return chosen, downgraded
+
+    def observe(self, node: str, model: str, seconds: float):
+        key = (node, model)
+        with self._lock:
+            previous = self._latency.get(key)
+            self._latency[key] = seconds if previous is None else EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * previous
+        registry.observe("route_latency_seconds", seconds, node=node, model=model)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Current latency estimates as "node_model" -> seconds (metric-name safe)"""
+        with self._lock:
+            return {re.sub(r"\W", "_", f"{node}_{model}"): seconds for (node, model), seconds in self._latency.items()}
+
+# ----------------- SHARED INSTANCE -----------------
+_router: Optional[Router] = None
+_router_lock = threading.Lock()
+
+def get_router() -> Router:
+    """Process-wide router (routes from MODEL_ROUTES)"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = Router()
+        return _router
+
+def set_router(router: Router):
+    global _router
+    with _router_lock:
+        _router = router
+
+registry.register_collector("route_latency_estimate", lambda: get_router().snapshot())
@@ -0,0 +1,217 @@
+import os
+import time
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Optional
+from metrics import registry
+from deadline import Deadline
+
+# ----------------- TOKEN BUCKET -----------------
+class TokenBucket:
+    """Refilling budget of `capacity` units per minute"""
+
+    def __init__(self, capacity_per_minute: float):
+        self.capacity = float(capacity_per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available (0 if available now)"""
+        self._refill(now)
+        # Oversized requests are clamped to a full bucket so they cannot block forever
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+    def drain(self, seconds: float, now: float):
+        """Empty the bucket so nothing is admitted for roughly `seconds`"""
+        self._refill(now)
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token)"""
+    return len(text or "") // 4 + 1
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    message = str(error)
+    return "429" in message or "ResourceExhausted" in message or "quota" in message.lower()
+
+# ----------------- FAIR SCHEDULER -----------------
+class LLMScheduler:
+    """Process-wide admission control for LLM calls.
+
+    Requests and tokens per minute are limited with token buckets. Waiting
+    calls are queued per session and sessions are served round-robin, so a
+    batch user with many queued calls cannot starve interactive users.
+    """
+
+    def __init__(self, requests_per_minute: float = 15, tokens_per_minute: float = 1_000_000,
+                 output_tokens: int = 512, max_retries: int = 2, cooldown_seconds: float = 10.0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.output_tokens = output_tokens
+        self.max_retries = max_retries
+        self.cooldown_seconds = cooldown_seconds
+
+        self._cond = threading.Condition()
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()
+        self._waits = deque(maxlen=1000)
+        self._admitted = 0
+        self._throttled = 0
+        self._rate_limited = 0
+        self._max_depth = 0
+
+    def _head(self) -> Optional[object]:
+        for queue in self._queues.values():
+            return queue[0]
+        return None
+
+    def _depth(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def acquire(self, session_id: str, tokens: int = 1, deadline: Optional[Deadline] = None) -> float:
+        """Block until this session's call is admitted; returns seconds waited.
+
+        With a deadline the wait gives up (DeadlineExceeded) when it expires or is cancelled.
+        """
+        ticket = object()
+        enqueued = time.monotonic()
+        with self._cond:
+            queue = self._queues.setdefault(session_id, deque())
+            queue.append(ticket)
+            self._max_depth = max(self._max_depth, self._depth())
+            throttled = False
+            try:
+                while True:
+                    if deadline is not None:
+                        deadline.check("scheduler_queue")
+                    if self._head() is ticket:
+                        now = time.monotonic()
+                        wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+                        if wait <= 0:
+                            break
+                        throttled = True
+                    else:
+                        wait = None
+                    if deadline is not None:
+                        # Short slices so a cancelled deadline is noticed without a notify
+                        wait = min(wait if wait is not None else deadline.remaining(), deadline.remaining(), 0.25)
+                    self._cond.wait(wait)
+            except BaseException:
+                queue.remove(ticket)
+                if not queue:
+                    del self._queues[session_id]
+                self._cond.notify_all()
+                raise
+
+            self.requests.consume(1)
+            self.tokens.consume(tokens)
+            queue.popleft()
+            if queue:
+                # Round-robin: this session goes to the back of the rotation
+                self._queues.move_to_end(session_id)
+            else:
+                del self._queues[session_id]
+
+            waited = time.monotonic() - enqueued
+            self._waits.append(waited)
+            self._admitted += 1
+            self._throttled += int(throttled)
+            self._cond.notify_all()
+        return waited
+
+    def report_rate_limited(self):
+        """Back off all sessions after the provider answered 429"""
+        with self._cond:
+            self._rate_limited += 1
+            self.requests.drain(self.cooldown_seconds, time.monotonic())
+            self._cond.notify_all()
+
+    def run(self, session_id: str, fn: Callable[[], Any], tokens: int = 1,
+            deadline: Optional[Deadline] = None) -> Any:
+        """Admit and run `fn`, retrying after a cool-down on provider rate limits"""
+        attempt = 0
+        while True:
+            self.acquire(session_id, tokens, deadline)
+            try:
+                return fn()
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_rate_limit_error(e):
+                    raise
+                attempt += 1
+                registry.inc("llm_retries", reason="rate_limit")
+                self.report_rate_limited()
+
+    def request_tokens(self, prompt: str) -> int:
+        """Token budget charged for one call with `prompt`"""
+        return estimate_tokens(prompt) + self.output_tokens
+
+    def invoke(self, session_id: str, runnable, prompt: str) -> Any:
+        """Invoke a LangChain runnable with `prompt` through the scheduler"""
+        return self.run(session_id, lambda: runnable.invoke(prompt), self.request_tokens(prompt))
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth and wait-time statistics"""
+        with self._cond:
+            waits = sorted(self._waits)
+            depth_by_session = {sid: len(queue) for sid, queue in self._queues.items()}
+            stats = {
+                "queue_depth": sum(depth_by_session.values()),
+                "queue_depth_by_session": depth_by_session,
+                "max_queue_depth": self._max_depth,
+                "admitted": self._admitted,
+                "throttled": self._throttled,
+                "rate_limited": self._rate_limited,
+            }
+
+        def percentile(p: float) -> float:
+            return waits[min(len(waits) - 1, int(p * len(waits)))] if waits else 0.0
+
+        stats["wait_seconds"] = {
+            "count": len(waits),
+            "mean": sum(waits) / len(waits) if waits else 0.0,
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "max": waits[-1] if waits else 0.0,
+        }
+        return stats
+
+# ----------------- SHARED INSTANCE -----------------
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler() -> LLMScheduler:
+    """Return the process-wide scheduler (configured from the environment)"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler(
+                requests_per_minute=float(os.environ.get("LLM_REQUESTS_PER_MINUTE", 15)),
+                tokens_per_minute=float(os.environ.get("LLM_TOKENS_PER_MINUTE", 1_000_000)),
+            )
+        return _scheduler
+
+def set_scheduler(scheduler: LLMScheduler):
+    """Replace the process-wide scheduler (e.g. an unthrottled one for benchmarks)"""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = scheduler
+
+def _collect() -> Dict[str, Any]:
+    stats = get_scheduler().metrics()
+    flat = {k: v for k, v in stats.items() if isinstance(v, (int, float))}
+    flat.update({f"wait_seconds_{k}": v for k, v in stats["wait_seconds"].items()})
+    return flat
+
+registry.register_collector("llm_scheduler", _collect)
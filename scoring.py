@@ -0,0 +1,89 @@
+import re
+from typing import Any, Dict, List, Set, Tuple
+
+from skills import extract_skills, is_known_skill, normalize_skill
+
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+
+# Relative weight of each check in score_draft
+WEIGHTS = {"length": 0.25, "skills": 0.35, "recipient": 0.25, "subject": 0.15}
+
+def _contains(text: str, phrase: str) -> bool:
+    return re.search(r"(?<![\w+#])" + re.escape(phrase.lower()) + r"(?![\w+#])", text) is not None
+
+def _mentions(skill: str, text: str, text_skills: Set[str]) -> bool:
+    """True when lowercased `text` (whose taxonomy skills are `text_skills`) mentions `skill`.
+
+    Skills the taxonomy knows only match through it, so its ambiguity rules hold
+    ("C" or "Go" in free text is not the language); others fall back to a phrase search.
+    """
+    if normalize_skill(skill) in text_skills:
+        return True
+    return not is_known_skill(skill) and _contains(text, skill)
+
+def matched_skills(skills: List[str], job_text: str) -> List[str]:
+    """CV skills that are also mentioned in the job text (synonyms count, e.g. k8s for Kubernetes)"""
+    job_skills = set(extract_skills(job_text))
+    job = job_text.lower()
+    return [skill for skill in skills if skill and _mentions(skill, job, job_skills)]
+
+def skill_overlap(skills: List[str], job_text: str) -> Tuple[List[str], List[str]]:
+    """(posting skills the CV has, posting skills the CV lacks), both in taxonomy names"""
+    cv_skills = {normalize_skill(skill) for skill in skills if skill}
+    job_skills = extract_skills(job_text)
+    return ([skill for skill in job_skills if skill in cv_skills],
+            [skill for skill in job_skills if skill not in cv_skills])
+
+def skill_similarity(skills: List[str], job_text: str) -> float:
+    """Share of the skills named in the posting that the CV covers (0 when it names none)"""
+    have, missing = skill_overlap(skills, job_text)
+    return round(len(have) / (len(have) + len(missing)), 4) if have or missing else 0.0
+
+def score_breakdown(email: Dict[str, Any], cv_data: Dict[str, Any], job_text: str,
+                    min_words: int = 120, max_words: int = 220) -> Dict[str, float]:
+    """Cheap local checks of a draft, each between 0 and 1"""
+    body = (email.get('body') or '').lower()
+    subject = (email.get('subject') or '').strip()
+    recipient = (email.get('to') or '').strip().lower()
+
+    # Length: full marks inside the range, linear decay outside it
+    words = len(body.split())
+    if words < min_words:
+        length = max(0.0, words / min_words)
+    elif words > max_words:
+        length = max(0.0, 1 - (words - max_words) / max_words)
+    else:
+        length = 1.0
+
+    # Skills: how many of the (up to 3) skills shared with the job the body mentions
+    shared = matched_skills(cv_data.get('skills', []) or [], job_text)
+    if shared:
+        body_skills = set(extract_skills(body))
+        mentioned = sum(1 for skill in shared if _mentions(skill, body, body_skills))
+        skills = min(1.0, mentioned / min(3, len(shared)))
+    else:
+        skills = 0.5
+
+    # Recipient: must be one of the addresses in the posting when it has any
+    posting_emails = {address.lower().rstrip('.') for address in EMAIL_PATTERN.findall(job_text)}
+    if posting_emails:
+        recipient_score = 1.0 if recipient in posting_emails else 0.0
+    else:
+        recipient_score = 1.0 if EMAIL_PATTERN.fullmatch(recipient) else 0.0
+
+    # Subject: present, reasonably short and about this posting
+    if not subject:
+        subject_score = 0.0
+    else:
+        job_words = {word for word in re.findall(r"[a-z][a-z+#]{3,}", job_text[:500].lower())}
+        subject_words = set(re.findall(r"[a-z][a-z+#]{3,}", subject.lower()))
+        subject_score = 1.0 if subject_words & job_words else 0.5
+        if len(subject) > 120:
+            subject_score *= 0.5
+
+    return {"length": length, "skills": skills, "recipient": recipient_score, "subject": subject_score}
+
+def score_draft(email: Dict[str, Any], cv_data: Dict[str, Any], job_text: str, **limits) -> float:
+    """Weighted score between 0 and 1 used to pick the best of several drafts"""
+    breakdown = score_breakdown(email, cv_data, job_text, **limits)
+    return round(sum(WEIGHTS[check] * value for check, value in breakdown.items()), 4)
@@ -0,0 +1,278 @@
+"""Local skill extraction with a normalized taxonomy.
+
+Every synonym in the taxonomy is tokenized and compiled into one
+Aho-Corasick automaton over tokens, so a text of any length is scanned in
+a single linear pass. Every match is reported under its canonical name
+("JS" -> "JavaScript", "k8s" -> "Kubernetes").
+"""
+import os
+import re
+import json
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# A token may carry '+'/'#' (c++, c#) and inner dots (node.js, asp.net, .net)
+TOKEN_PATTERN = re.compile(r"\.?[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+
+# Canonical skill -> synonyms; the canonical name matches itself unless it is AMBIGUOUS
+TAXONOMY: Dict[str, List[str]] = {
+    # Languages
+    "Python": ["python3"],
+    "JavaScript": ["js", "ecmascript", "es6", "vanilla js"],
+    "TypeScript": [],
+    "Java": ["java 8", "java 11", "java 17"],
+    "Kotlin": [],
+    "Scala": [],
+    "Go": ["golang", "go lang"],
+    "Rust": ["rust language", "rust programming", "rustlang"],
+    "C": ["ansi c", "c language", "c programming"],
+    "C++": ["cpp", "c plus plus"],
+    "C#": ["csharp", "c sharp"],
+    "PHP": [],
+    "Ruby": [],
+    "Swift": ["swift language", "swift programming", "swiftui"],
+    "Objective-C": ["objective c", "objc"],
+    "R": ["r language", "r programming", "rstudio"],
+    "MATLAB": [],
+    "Bash": ["shell scripting", "shell script", "sh scripting"],
+    "PowerShell": [],
+    "SQL": ["structured query language", "t-sql", "tsql", "pl/sql", "plsql"],
+    "HTML": ["html5"],
+    "CSS": ["css3", "scss", "sass"],
+    # Frameworks and libraries
+    "React": ["react.js", "reactjs", "react js"],
+    "React Native": [],
+    "Angular": ["angularjs", "angular.js"],
+    "Vue.js": ["vue", "vuejs", "vue js"],
+    "Next.js": ["nextjs"],
+    "Node.js": ["nodejs", "node js"],
+    "Express": ["express.js", "expressjs", "node express"],
+    "Django": [],
+    "Flask": [],
+    "FastAPI": ["fast api"],
+    "Spring": ["spring boot", "springboot", "spring framework"],
+    ".NET": ["dotnet", "dot net", "asp.net", ".net core"],
+    "Ruby on Rails": ["rails", "ror"],
+    "Laravel": [],
+    "pandas": [],
+    "NumPy": [],
+    "scikit-learn": ["sklearn", "scikit learn"],
+    "TensorFlow": ["tf2"],
+    "PyTorch": ["torch"],
+    "Keras": [],
+    "Spark": ["apache spark", "pyspark", "spark sql", "spark streaming"],
+    "Hadoop": [],
+    "Kafka": ["apache kafka"],
+    "Airflow": ["apache airflow"],
+    "dbt": [],
+    "GraphQL": [],
+    "REST APIs": ["restful", "rest api", "restful api", "restful apis"],
+    "gRPC": [],
+    "LangChain": [],
+    # Data stores
+    "PostgreSQL": ["postgres", "psql", "postgre sql"],
+    "MySQL": [],
+    "SQLite": [],
+    "Microsoft SQL Server": ["sql server", "mssql", "ms sql"],
+    "Oracle Database": ["oracle db", "oracle database"],
+    "MongoDB": ["mongo"],
+    "Redis": [],
+    "Elasticsearch": ["elastic search", "elk"],
+    "Cassandra": [],
+    "DynamoDB": [],
+    "Snowflake": [],
+    "BigQuery": ["big query"],
+    # Cloud and DevOps
+    "AWS": ["amazon web services"],
+    "Azure": ["microsoft azure"],
+    "GCP": ["google cloud", "google cloud platform"],
+    "Docker": [],
+    "Kubernetes": ["k8s", "kube"],
+    "Terraform": [],
+    "Ansible": [],
+    "Helm": ["helm chart", "helm charts", "kubernetes helm"],
+    "Jenkins": [],
+    "GitHub Actions": [],
+    "GitLab CI": ["gitlab ci/cd"],
+    "CI/CD": ["ci cd", "cicd", "continuous integration", "continuous delivery", "continuous deployment"],
+    "Git": [],
+    "Linux": ["unix"],
+    "Microservices": ["microservice", "micro services"],
+    "Serverless": ["lambda functions"],
+    # Data, ML and AI
+    "Machine Learning": ["ml"],
+    "Deep Learning": ["neural networks"],
+    "Artificial Intelligence": [],
+    "Natural Language Processing": ["nlp"],
+    "Computer Vision": ["opencv"],
+    "Large Language Models": ["llm", "llms"],
+    "Data Analysis": ["data analytics", "analytics"],
+    "Data Engineering": ["etl", "data pipelines", "data pipeline"],
+    "Statistics": ["statistical analysis"],
+    "Power BI": ["powerbi"],
+    "Tableau": [],
+    "Excel": ["microsoft excel", "ms excel", "excel spreadsheets", "advanced excel"],
+    # Practices and tools
+    "Agile": ["scrum", "kanban"],
+    "Test-Driven Development": ["tdd"],
+    "Unit Testing": ["unit tests", "pytest", "junit", "jest"],
+    "Jira": [],
+    "Figma": [],
+    "UX Design": ["ux", "user experience"],
+    "UI Design": ["user interface design", "ui design"],
+    "SAP": [],
+    "Salesforce": [],
+    "Accounting": ["bookkeeping"],
+    "Project Management": ["project manager", "pmp"],
+    "Product Management": ["product manager"],
+    "Cybersecurity": ["cyber security", "information security", "infosec"],
+    # Soft skills
+    "Communication": ["communication skills", "communicator"],
+    "Leadership": ["team lead", "leading teams"],
+    "Teamwork": ["team player", "collaboration"],
+    "Problem Solving": ["problem-solving", "problem solver"],
+    "Time Management": [],
+    "English": ["fluent english", "english language", "business english", "english proficiency"],
+    "German": ["fluent german", "deutsch"],
+}
+
+# Canonical names that are also everyday words ("an excel-lent team", "spark interest",
+# "at the helm"); free text only matches their qualified synonyms ("ms excel", "apache spark")
+AMBIGUOUS = {"Go", "C", "R", "Spring", "Express", "Excel", "Swift", "Rust", "Spark", "Helm", "English"}
+
+# Deliberately absent synonyms: mapping a broader or neighbouring term to a skill
+# ("containerization" -> Docker, "github" -> Git, "ai"/"ui") inflates overlap scores,
+# and "aws lambda" -> Serverless would swallow the AWS mention.
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+# ----------------- AHO-CORASICK -----------------
+class SkillExtractor:
+    """Aho-Corasick automaton whose alphabet is tokens, compiled from a taxonomy"""
+
+    def __init__(self, taxonomy: Optional[Dict[str, List[str]]] = None, ambiguous: Iterable[str] = AMBIGUOUS):
+        taxonomy = taxonomy if taxonomy is not None else TAXONOMY
+        ambiguous = set(ambiguous)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # (canonical, phrase length in tokens) ending at each state, including via fail links
+        self._output: List[List[Tuple[str, int]]] = [[]]
+        self._canonical: Dict[Tuple[str, ...], str] = {}
+
+        for canonical, synonyms in taxonomy.items():
+            for phrase in [canonical, *synonyms]:
+                tokens = tuple(tokenize(phrase))
+                if tokens and tokens not in self._canonical:
+                    self._canonical[tokens] = canonical
+                    if not (phrase == canonical and canonical in ambiguous):
+                        self._add(tokens, canonical)
+        self._build_fail_links()
+
+    def _add(self, tokens: Tuple[str, ...], canonical: str):
+        state = 0
+        for token in tokens:
+            if token not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][token] = len(self._goto) - 1
+            state = self._goto[state][token]
+        self._output[state].append((canonical, len(tokens)))
+
+    def _build_fail_links(self):
+        # Breadth-first, so a state's fail target is final before its children are visited;
+        # depth-1 states keep failing to the root
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(token, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def scan(self, text: str) -> Iterable[Tuple[str, int, int]]:
+        """Yield every (canonical skill, start token, end token) match, overlapping ones included"""
+        goto, fail, output = self._goto, self._fail, self._output
+        root = goto[0]
+        state = 0
+        for position, token in enumerate(tokenize(text)):
+            if state == 0:
+                # Fast path: most tokens are not the start of any skill
+                state = root.get(token, 0)
+            else:
+                while state and token not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(token, 0)
+            for canonical, length in output[state]:
+                yield canonical, position - length + 1, position
+
+    def matches(self, text: str) -> List[Tuple[str, int, int]]:
+        """Leftmost-longest non-overlapping matches ("React Native" wins over "React")"""
+        kept: List[Tuple[str, int, int]] = []
+        last_end = -1
+        for canonical, start, end in sorted(self.scan(text), key=lambda match: (match[1], -match[2])):
+            if start > last_end:
+                kept.append((canonical, start, end))
+                last_end = end
+        return kept
+
+    def extract(self, text: str) -> List[str]:
+        """Canonical skills mentioned in the text, in order of first mention"""
+        return list(dict.fromkeys(canonical for canonical, _, _ in self.matches(text)))
+
+    def counts(self, text: str) -> Dict[str, int]:
+        """How often each canonical skill is mentioned"""
+        counts: Dict[str, int] = {}
+        for canonical, _, _ in self.matches(text):
+            counts[canonical] = counts.get(canonical, 0) + 1
+        return counts
+
+    def normalize(self, skill: str) -> str:
+        """Canonical name of a skill, or the skill itself (trimmed) when it is not in the taxonomy"""
+        return self._canonical.get(tuple(tokenize(skill)), skill.strip())
+
+    def known(self, skill: str) -> bool:
+        """True when the skill is a canonical name or synonym of the taxonomy"""
+        return tuple(tokenize(skill)) in self._canonical
+
+# ----------------- SHARED INSTANCE -----------------
+_extractor: Optional[SkillExtractor] = None
+_extractor_lock = threading.Lock()
+
+def get_extractor() -> SkillExtractor:
+    """Process-wide extractor; SKILLS_TAXONOMY may point to a JSON file extending the taxonomy"""
+    global _extractor
+    with _extractor_lock:
+        if _extractor is None:
+            taxonomy = dict(TAXONOMY)
+            path = os.environ.get("SKILLS_TAXONOMY")
+            if path:
+                with open(path, encoding="utf-8") as f:
+                    for canonical, synonyms in json.load(f).items():
+                        taxonomy[canonical] = list(taxonomy.get(canonical, [])) + list(synonyms)
+            _extractor = SkillExtractor(taxonomy)
+        return _extractor
+
+def extract_skills(text: str) -> List[str]:
+    return get_extractor().extract(text)
+
+def normalize_skill(skill: str) -> str:
+    return get_extractor().normalize(skill)
+
+def is_known_skill(skill: str) -> bool:
+    return get_extractor().known(skill)
+
+def merge_skills(*skill_lists: Iterable[str]) -> List[str]:
+    """Normalized union of skill lists, first occurrence wins, case-insensitive"""
+    merged: Dict[str, str] = {}
+    for skills in skill_lists:
+        for skill in skills:
+            if skill and skill.strip():
+                canonical = normalize_skill(skill)
+                merged.setdefault(canonical.lower(), canonical)
+    return list(merged.values())
@@ -0,0 +1,91 @@
+import os
+import json
+import hashlib
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+
+from metrics import registry, record_cache
+from deadline import Deadline
+
+# Shared by all sessions; speculative work must never crowd out real requests
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("SPECULATIVE_WORKERS", 4)),
+    thread_name_prefix="speculative-draft"
+)
+
+def content_hash(value: Any) -> str:
+    """Stable hash of a string or JSON-serialisable value"""
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:16]
+
+def draft_key(parsed_cv: Any, job_text: str, variants: int = 1) -> Tuple[str, str, int]:
+    """(CV hash, job-text hash, variants) identifying one speculative draft"""
+    return content_hash(parsed_cv), content_hash(job_text.strip()), variants
+
+class SpeculativeDraft:
+    """At most one in-flight speculative draft per session.
+
+    Submitting a different key cancels the stale future. A future that is
+    already running is stopped through its deadline (the one `fn` runs
+    under): its waits end and the model calls in flight are abandoned.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.key: Optional[Tuple[str, str, int]] = None
+        self.future: Optional[Future] = None
+        self.deadline: Optional[Deadline] = None
+
+    def submit(self, key: Tuple[str, str, int], fn: Callable[[], Any],
+               deadline: Optional[Deadline] = None) -> Future:
+        with self._lock:
+            if self.key == key and self.future is not None and not self.future.cancelled():
+                return self.future
+            self._cancel()
+            self.key = key
+            self.deadline = deadline
+            # The draft records into the submitting session's ledger
+            self.future = _executor.submit(contextvars.copy_context().run, fn)
+            registry.inc("speculative_drafts", result="submitted")
+            return self.future
+
+    def take(self, key: Tuple[str, str, int]) -> Optional[Future]:
+        """Hand over the future for `key` once it has started (running or finished), or None.
+
+        A draft still queued behind other sessions' drafts is cancelled:
+        drafting directly is faster than waiting for a free worker.
+        """
+        with self._lock:
+            if self.key == key and self.future is not None and not self.future.cancelled():
+                future = self.future
+                self.key, self.future, self.deadline = None, None, None
+                if not future.cancel():
+                    record_cache("speculative_draft", True)
+                    return future
+                registry.inc("speculative_drafts", result="cancelled")
+            self._cancel()
+            record_cache("speculative_draft", False)
+            return None
+
+    def cancel(self):
+        with self._lock:
+            self._cancel()
+
+    def _cancel(self):
+        if self.future is not None and not self.future.done():
+            if not self.future.cancel() and self.deadline is not None:
+                self.deadline.cancel()
+            registry.inc("speculative_drafts", result="cancelled")
+        self.key, self.future, self.deadline = None, None, None
+
+    def pending(self, key: Tuple[str, str, int]) -> bool:
+        with self._lock:
+            return self.key == key and self.future is not None
+
+    def ready(self, key: Tuple[str, str, int]) -> bool:
+        """True once the draft for `key` has finished (and was not cancelled)"""
+        with self._lock:
+            return self.key == key and self.future is not None and self.future.done() and not self.future.cancelled()
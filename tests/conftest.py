@@ -0,0 +1,33 @@
+import pytest
+
+import agents
+import dedup
+import profiles
+from fakes import make_cv_pdf, patch_llm
+from routing import DEFAULT_ROUTES, Router, set_router
+from scheduler import LLMScheduler, set_scheduler
+
+@pytest.fixture
+def fake_llm(monkeypatch, tmp_path):
+    """Deterministic fake model behind an unthrottled scheduler, default routes, fresh caches and profile store"""
+    monkeypatch.delenv("LLM_CASSETTE", raising=False)
+    monkeypatch.delenv("MODEL_ROUTES", raising=False)
+    monkeypatch.setenv("PROFILE_DB", str(tmp_path / "profiles.db"))
+    monkeypatch.setattr(profiles, "_store", None)
+    monkeypatch.setattr(dedup, "_history", None)
+    monkeypatch.setattr(agents, "_job_analyses", {})
+    set_scheduler(LLMScheduler(requests_per_minute=1e9, tokens_per_minute=1e12))
+    set_router(Router(dict(DEFAULT_ROUTES)))
+    with patch_llm() as llm:
+        yield llm
+
+
+@pytest.fixture
+def cv_path(tmp_path):
+    """Synthetic CV PDF with headings the local parser understands"""
+    return make_cv_pdf(str(tmp_path / "cv.pdf"), lines_per_page=5)
+
+
+@pytest.fixture
+def job_text():
+    return "Backend Engineer at Example GmbH. Python, SQL, Docker. Apply to jobs@example.com"
@@ -0,0 +1,29 @@
+from pipeline import create_draft, get_alternates
+from scoring import score_draft
+
+CV = {"name": "Jane Doe", "skills": ["Python", "SQL", "Docker"]}
+
+
+def test_variants_are_drafted_scored_and_ranked(fake_llm, cv_path, job_text):
+    config = {"configurable": {"thread_id": "best-of-n"}}
+    wf, draft = create_draft("fake-key", "jane@example.com", "app-password", "best-of-n", job_text, CV, cv_path,
+                             config, variants=3)
+    alternates = get_alternates(wf, config)
+    assert len(alternates) == 3 and len({candidate["tone"] for candidate in alternates}) == 3
+    assert [c["score"] for c in alternates] == sorted((c["score"] for c in alternates), reverse=True)
+    assert draft["body"] == alternates[0]["body"] and draft["to"] == "jobs@example.com"
+
+
+def test_single_draft_has_no_alternates(fake_llm, cv_path, job_text):
+    config = {"configurable": {"thread_id": "single"}}
+    wf, draft = create_draft("fake-key", "jane@example.com", "app-password", "single", job_text, CV, cv_path, config)
+    assert draft and get_alternates(wf, config) == []
+
+
+def test_score_prefers_specific_well_addressed_drafts(job_text):
+    words = " ".join(["word"] * 150)
+    generic = {"to": "hr@company.com", "subject": "Hello", "body": f"Dear team, {words}"}
+    specific = {"to": "jobs@example.com", "subject": "Backend Engineer application",
+                "body": f"Dear team, I use Python, SQL and Docker daily. {words}"}
+    assert score_draft(specific, CV, job_text) > score_draft(generic, CV, job_text)
+    assert 0 <= score_draft(generic, CV, job_text) <= 1
@@ -0,0 +1,65 @@
+import json
+import os
+
+import pytest
+
+import agents
+from agents import create_workflow
+from cassette import Cassette, CassetteMiss, main, record, replay
+from pipeline import draft_application
+
+
+def _draft(cv_path, job_text, thread):
+    wf = create_workflow("fake-key", "jane@example.com", "app-password", thread)
+    return draft_application(wf, job_text, {}, cv_path, {"configurable": {"thread_id": thread}})
+
+
+def _entry(schema="EmailSchema[to,body]", sha="abc", **fields):
+    return {"schema": schema, "model": "gemini-1.5-flash", "temperature": 0.3, "prompt_sha": sha,
+            "prompt_chars": 400, "seconds": 0.0, "response": {"body": "recorded"}, **fields}
+
+
+def test_replay_serves_the_recorded_run(fake_llm, tmp_path, cv_path, job_text):
+    path = os.path.join(tmp_path, "calls.jsonl.gz")
+    with record(path) as cassette:
+        recorded = _draft(cv_path, job_text, "record")
+    assert len(cassette.entries) == len(fake_llm.calls) > 0
+    assert all("prompt" not in entry and "seq" not in entry for entry in Cassette(path).entries)
+
+    fake_llm.reset()
+    agents._job_analyses.clear()
+    with replay(path, time_scale=0) as model:
+        replayed = _draft(cv_path, job_text, "replay")
+        stats = model.cassette.stats()
+    assert replayed == recorded
+    assert fake_llm.calls == [] and len(model.calls) == stats["exact"] == len(cassette.entries)
+
+
+def test_lookup_falls_back_to_looser_matches(tmp_path):
+    path = os.path.join(tmp_path, "calls.jsonl")
+    with open(path, "w") as f:
+        f.write(json.dumps(_entry()) + "\n")
+        f.write(json.dumps(_entry(sha="def", response={"body": "other"})) + "\n")
+    cassette = Cassette(path)
+
+    assert cassette.find("EmailSchema[to,body]", "gemini-1.5-flash", 0.3, "abc")[1] == "exact"
+    assert cassette.find("EmailSchema[to,body]", "gemini-1.5-pro", 0.0, "def")[1] == "prompt"
+    # An unseen prompt cycles through every recording of its schema
+    bodies = {cassette.find("EmailSchema[to,body]", "gemini-1.5-flash", 0.3, "new")[0]["response"]["body"]
+              for _ in range(2)}
+    assert bodies == {"recorded", "other"} and cassette.stats()["schema"] == 2
+    with pytest.raises(CassetteMiss):
+        cassette.find("JobAnalysisSchema[title]", "gemini-1.5-flash", 0.3, "abc")
+    assert cassette.stats()["misses"] == 1
+
+
+def test_stats_flags_prompt_growth(tmp_path, capsys):
+    old, new = os.path.join(tmp_path, "old.jsonl"), os.path.join(tmp_path, "new.jsonl")
+    with open(old, "w") as f:
+        f.write(json.dumps(_entry()) + "\n")
+    with open(new, "w") as f:
+        f.write(json.dumps(_entry(prompt_chars=480)) + "\n")
+
+    assert main(["stats", new, "--compare", old, "--threshold", "0.3"]) == 0
+    assert main(["stats", new, "--compare", old]) == 1
+    assert "REGRESSION EmailSchema[to,body] prompt 400 -> 480 chars" in capsys.readouterr().err
@@ -0,0 +1,49 @@
+import context_cache
+from agents import prompt_prefix
+from context_cache import GeminiContextCache, LocalContextCache
+from pipeline import create_draft, load_or_parse_cv
+
+CV = {"name": "Jane Doe", "location": "Berlin", "skills": ["Python", "SQL"],
+      "experience": ["Software Engineer at Example Corp"]}
+
+
+def test_prefix_depends_only_on_the_cv():
+    assert prompt_prefix(dict(CV)) == prompt_prefix(dict(CV))
+    assert prompt_prefix(CV) != prompt_prefix({**CV, "skills": ["Go"]})
+    assert prompt_prefix(CV).endswith("\n\n")
+
+
+def test_local_cache_counts_reuse_within_ttl():
+    cache = LocalContextCache(ttl_seconds=60, max_entries=2)
+    assert cache.handle("key", "model", "a") is None
+    cache.handle("key", "model", "a")
+    stats = cache.stats()
+    assert stats["requests"] == 2 and stats["hits"] == 1 and stats["reuse_rate"] == 0.5
+
+    # Oldest prefix is evicted once the table is full
+    cache.handle("key", "model", "b")
+    cache.handle("key", "model", "c")
+    cache.handle("key", "model", "a")
+    assert cache.stats()["hits"] == 1
+
+    expired = LocalContextCache(ttl_seconds=-1)
+    expired.handle("key", "model", "a")
+    expired.handle("key", "model", "a")
+    assert expired.stats()["hits"] == 0
+
+
+def test_gemini_cache_skips_short_prefixes():
+    cache = GeminiContextCache(min_tokens=1_000_000)
+    assert cache.handle("key", "gemini-1.5-flash", prompt_prefix(CV)) is None
+    assert cache.stats()["requests"] == 1
+
+
+def test_drafts_for_one_cv_share_the_prefix(fake_llm, monkeypatch, cv_path, job_text):
+    cache = LocalContextCache()
+    monkeypatch.setattr(context_cache, "_cache", cache)
+    parsed, _ = load_or_parse_cv("fake-key", cv_path, "jane")
+    for thread in ("first", "second"):
+        create_draft("fake-key", "jane@example.com", "app-password", thread, job_text, parsed, cv_path,
+                     {"configurable": {"thread_id": thread}})
+    stats = cache.stats()
+    assert stats["requests"] == 2 and stats["hits"] == 1
@@ -0,0 +1,63 @@
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from profiles import cv_hash, get_store
+from ranking import best_cvs, match_matrix
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+BACKEND = {"name": "Jane Doe", "skills": ["Python", "SQL", "Docker"], "relevant_job_titles": ["Backend Engineer"]}
+BAKER = {"name": "Jane Doe", "skills": ["Baking", "Pastry", "Sourdough"], "relevant_job_titles": ["Pastry Chef"]}
+BAKERY_JOB = "Pastry Chef wanted: baking, pastry and sourdough experience. Apply to bakery@example.com"
+
+
+def test_score_matrix_picks_the_best_cv_per_job(job_text):
+    scores = match_matrix([job_text, BAKERY_JOB], [BACKEND, BAKER])
+    assert scores.shape == (2, 2)
+    assert list(scores.argmax(axis=1)) == [0, 1]
+    assert [index for _, _, index, _ in best_cvs(iter([("a", job_text), ("b", BAKERY_JOB)]), [BACKEND, BAKER])] == [0, 1]
+
+
+@pytest.fixture
+def job_step(fake_llm, tmp_path):
+    """The app on step 3 using the backend CV, with a baker CV saved as well"""
+    own_pdf, baker_pdf = b"%PDF-1.4 backend", b"%PDF-1.4 baker"
+    own_path = tmp_path / "own.pdf"
+    own_path.write_bytes(own_pdf)
+    store = get_store()
+    store.save("jane@example.com", cv_hash(own_pdf), BACKEND, "backend.pdf", own_pdf)
+    store.save("jane@example.com", cv_hash(baker_pdf), BAKER, "baker.pdf", baker_pdf)
+
+    app = AppTest.from_file(APP, default_timeout=60)
+    app.session_state["workflow_step"] = 3
+    app.session_state["api_key"] = "fake-key"
+    app.session_state["gmail_email"] = "jane@example.com"
+    app.session_state["parsed_cv"] = store.get("jane@example.com", cv_hash(own_pdf))["parsed"]
+    app.session_state["cv_parsed"] = True
+    app.session_state["temp_cv_path"] = str(own_path)
+    app.run()
+    app.text_area(key="job_input").input(BAKERY_JOB).run()
+    assert not app.exception
+    return app, str(own_path)
+
+
+def test_best_cv_is_only_suggested(job_step):
+    app, own_path = job_step
+    assert app.session_state["cv_choice"]["filename"] == "baker.pdf"
+    assert app.session_state["parsed_cv"]["skills"] == BACKEND["skills"]
+    assert app.session_state["temp_cv_path"] == own_path
+
+
+def test_opting_in_switches_and_opting_out_restores(job_step):
+    app, own_path = job_step
+    app.checkbox(key="auto_select_cv_input").check().run()
+    switched_path = app.session_state["temp_cv_path"]
+    assert app.session_state["parsed_cv"]["skills"] == BAKER["skills"]
+    with open(switched_path, "rb") as f:
+        assert f.read() == b"%PDF-1.4 baker"
+
+    app.checkbox(key="auto_select_cv_input").uncheck().run()
+    assert app.session_state["parsed_cv"]["skills"] == BACKEND["skills"]
+    assert app.session_state["temp_cv_path"] == own_path
+    assert not os.path.exists(switched_path)
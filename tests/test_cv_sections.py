@@ -0,0 +1,59 @@
+from cv_sections import CONFIDENCE_THRESHOLD, parse_sections, section_text, split_sections
+from fakes import PROSE_CV_LINES
+
+STRUCTURED = """Jane Doe
+Senior Backend Engineer | Berlin, Germany | jane.doe@example.com
+
+Skills
+Python, SQL, Docker, Kubernetes, AWS
+
+Work Experience
+Backend Engineer at Example Corp (2019 - present)
+- Built data pipelines in Python
+Software Developer at Startup GmbH (2016 - 2019)
+
+Certifications
+AWS Certified Developer
+"""
+
+
+def uncertain(confidence):
+    return sorted(field for field, value in confidence.items() if value < CONFIDENCE_THRESHOLD)
+
+
+def test_headings_split_the_cv():
+    sections = split_sections(STRUCTURED)
+    assert sections["skills"] == ["Python, SQL, Docker, Kubernetes, AWS"]
+    assert sections["header"][0] == "Jane Doe"
+    assert len(sections["experience"]) == 3
+
+
+def test_structured_cv_is_parsed_locally_with_confidence():
+    fields, confidence = parse_sections(STRUCTURED)
+    assert fields["name"] == "Jane Doe" and fields["location"] == "Berlin, Germany"
+    assert {"Python", "SQL", "Docker", "Kubernetes", "AWS"} <= set(fields["skills"])
+    assert fields["relevant_job_titles"][:2] == ["Backend Engineer", "Software Developer"]
+    assert fields["certificates"] == ["AWS Certified Developer"]
+    assert len(fields["experience"]) == 2 and confidence["experience"] == 0.9
+    # Projects has no heading in an otherwise structured CV: most likely there are none
+    assert fields["projects"] == [] and uncertain(confidence) == []
+
+
+def test_prose_cv_leaves_fields_to_the_model():
+    fields, confidence = parse_sections("\n".join(PROSE_CV_LINES))
+    assert fields["name"] == "Jane Doe"
+    assert {"experience", "relevant_job_titles", "certificates", "projects"} <= set(uncertain(confidence))
+
+
+def test_model_only_sees_the_sections_of_uncertain_fields():
+    text = section_text(STRUCTURED, ["certificates"])
+    assert text == "CERTIFICATES:\nAWS Certified Developer"
+    assert section_text(STRUCTURED, ["projects"]) == STRUCTURED
+
+
+def test_structured_pdf_needs_no_model_call(fake_llm, cv_path):
+    from pipeline import parse_cv
+
+    parsed = parse_cv("fake-key", cv_path, "cv-sections")
+    assert parsed["name"] == "Jane Doe" and "Kubernetes" in parsed["skills"]
+    assert fake_llm.calls == []
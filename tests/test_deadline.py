@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+from deadline import Deadline, DeadlineExceeded
+from ledger import Ledger, record, recording
+from workers import WorkerPool, get_pool, set_pool
+
+
+@pytest.fixture
+def io_pool():
+    previous = get_pool("io")
+    pool = WorkerPool("io", 1, 0, admit_seconds=0.5)
+    set_pool("io", pool)
+    yield pool
+    set_pool("io", previous)
+
+
+def test_run_on_io_worker_does_not_queue_behind_itself(io_pool):
+    deadline = Deadline(2)
+    assert io_pool.run("outer", lambda: deadline.run("inner", lambda: "done")) == "done"
+    assert io_pool.stats()["rejected"] == 0
+
+
+def test_run_checks_deadline_first(io_pool):
+    deadline = Deadline(0)
+    with pytest.raises(DeadlineExceeded):
+        io_pool.run("outer", lambda: deadline.run("inner", lambda: "done"))
+
+
+def test_deadline_holds_on_io_worker(io_pool):
+    hung = threading.Event()
+    deadline = Deadline(0.2)
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        io_pool.run("outer", lambda: deadline.run("inner", lambda: hung.wait(5)))
+    assert time.monotonic() - started < 1
+    hung.set()
+
+
+def test_run_abandons_a_hung_call(io_pool):
+    hung = threading.Event()
+    with pytest.raises(DeadlineExceeded):
+        Deadline(0.1).run("call", lambda: hung.wait(5))
+    hung.set()
+
+
+def test_cancel_wakes_the_waiting_caller(io_pool):
+    hung = threading.Event()
+    deadline = Deadline(5)
+    threading.Timer(0.1, deadline.cancel).start()
+    with pytest.raises(DeadlineExceeded) as raised:
+        deadline.run("call", lambda: hung.wait(5))
+    assert raised.value.cancelled
+    hung.set()
+
+
+def test_child_never_outlives_its_parent():
+    parent = Deadline(1)
+    assert parent.child(10).expires_at == parent.expires_at
+    parent.cancel()
+    assert parent.child(10).expired()
+
+
+def test_calls_record_into_the_callers_ledger(io_pool):
+    ledger = Ledger()
+    with recording(ledger):
+        io_pool.run("outer", lambda: Deadline(1).run("inner", lambda: record("llm", "draft_email")))
+    assert len(ledger) == 1
@@ -0,0 +1,42 @@
+from dedup import JobHistory
+
+POSTING = ("Senior Backend Engineer at Example Corp. You will build data pipelines in Python, run services "
+           "on Kubernetes and AWS, and mentor a small team of engineers across Europe.")
+REPOST = POSTING.replace("Senior Backend Engineer", "Senior Backend Engineer (remote)")
+OTHER = "Pastry chef wanted for a busy bakery; croissant and laminated dough experience required."
+
+
+def history():
+    return JobHistory(":memory:", threshold=0.5)
+
+
+def test_claim_then_repost_is_in_progress():
+    jobs = history()
+    job_id, duplicate = jobs.claim("jane", POSTING)
+    assert duplicate is None
+    again_id, duplicate = jobs.claim("jane", REPOST)
+    assert again_id == job_id and duplicate["in_progress"]
+
+
+def test_released_claim_without_draft_is_taken_over():
+    jobs = history()
+    job_id, _ = jobs.claim("jane", POSTING)
+    jobs.release(job_id)
+    assert jobs.claim("jane", REPOST) == (job_id, None)
+
+
+def test_remembered_draft_is_served_to_reposts():
+    jobs = history()
+    job_id, _ = jobs.claim("jane", POSTING)
+    jobs.remember("jane", POSTING, {"subject": "Application", "body": "Hello"})
+    jobs.release(job_id)
+    _, duplicate = jobs.claim("jane", REPOST)
+    assert duplicate["draft"] == {"subject": "Application", "body": "Hello"} and not duplicate["in_progress"]
+
+
+def test_histories_are_per_user_and_per_posting():
+    jobs = history()
+    jobs.remember("jane", POSTING, {"subject": "Application", "body": "Hello"})
+    assert jobs.find_duplicate("john", POSTING) is None
+    assert jobs.find_duplicate("jane", OTHER) is None
+    assert jobs.find_duplicate("jane", REPOST)["similarity"] >= 0.5
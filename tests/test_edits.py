@@ -0,0 +1,79 @@
+from edits import apply_edits, parse_edits
+
+BODY = ("Dear Hiring Manager,\n\n"
+        "I maintained and trained models with my teammate and the team at Example Corp. "
+        "I built data pipelines in Python. I led a migration to AWS. I mentored two juniors.\n\n"
+        "I would welcome the chance to discuss the role.\n\n"
+        "Best regards,\nJane Doe")
+EMAIL = {"to": "jobs@example.com", "subject": "Application: Backend Engineer", "body": BODY}
+
+
+def test_replace_matches_whole_words_only():
+    edited = apply_edits(EMAIL, "replace team with company")
+    assert "the company at Example Corp" in edited["body"]
+    assert "teammate" in edited["body"]
+
+
+def test_replace_without_whole_word_match_is_left_to_the_model():
+    assert apply_edits(EMAIL, "replace mate with friend") is None
+
+
+def test_short_targets_are_left_to_the_model():
+    assert apply_edits(EMAIL, "replace AI with ML") is None
+    assert apply_edits(EMAIL, "remove I") is None
+
+
+def test_remove_sentence_leaves_one_terminator():
+    edited = apply_edits(EMAIL, "remove the sentence I mentored two juniors.")
+    assert edited["body"] == BODY.replace(" I mentored two juniors.", "")
+
+
+def test_remove_phrase_mid_sentence():
+    edited = apply_edits(EMAIL, "remove in Python")
+    assert edited["body"] == BODY.replace("data pipelines in Python.", "data pipelines.")
+
+
+def test_remove_last_sentence_of_a_paragraph():
+    edited = apply_edits(EMAIL, "remove I would welcome the chance to discuss the role")
+    assert edited["body"] == BODY.replace("I would welcome the chance to discuss the role.\n\n", "")
+
+
+def test_remove_that_would_orphan_a_preposition_is_left_to_the_model():
+    assert apply_edits(EMAIL, "remove Python") is None
+    assert apply_edits(EMAIL, "remove the team at Example Corp") is None
+
+
+def test_remove_that_would_empty_a_sentence_is_left_to_the_model():
+    assert apply_edits(EMAIL, "remove led a migration to AWS") is None
+
+
+def test_unparsed_half_of_and_clause_goes_to_the_model():
+    assert parse_edits("replace Python with Go and make it more formal") is None
+    assert parse_edits("change the subject to Application for Senior Engineer and mention Docker") is None
+    assert apply_edits(EMAIL, "replace Python with Go and make it more formal") is None
+
+
+def test_both_halves_of_and_clause_apply():
+    assert parse_edits("replace Python with Go and shorten to 100 words") == [
+        ("replace", "Python", "Go"), ("words", "100")]
+
+
+def test_change_to_is_not_a_literal_replacement():
+    assert parse_edits("change the tone to formal") is None
+    assert parse_edits("change the closing to be warmer") is None
+
+
+def test_shorten_cuts_the_body():
+    edited = apply_edits(EMAIL, "shorten it to 30 words")
+    assert len(edited["body"].split()) <= 30
+
+
+def test_lengthening_is_left_to_the_model():
+    assert parse_edits("make it 250 words") is None
+    assert apply_edits(EMAIL, "keep it under 250 words") is None
+
+
+def test_non_ascii_arguments_keep_their_offsets():
+    assert parse_edits("Replace İstanbul with Berlin") == [("replace", "İstanbul", "Berlin")]
+    email = dict(EMAIL, body=BODY.replace("Example Corp", "Example Corp in İstanbul"))
+    assert "in Berlin" in apply_edits(email, "Replace İstanbul with Berlin")["body"]
@@ -0,0 +1,52 @@
+import os
+import time
+
+from agents import create_workflow
+from deadline import Deadline, with_deadline
+from fakes import PROSE_CV_LINES, make_cv_pdf
+from pipeline import draft_application, get_fallbacks
+
+# Seconds every fake call hangs for in the deadline tests, well past their 0.6 s budget
+LATENCY = 1.5
+
+
+def _run(cv_path, job_text, deadline=None, thread="fallbacks"):
+    wf = create_workflow("fake-key", "jane@example.com", "app-password", thread)
+    config = with_deadline({"configurable": {"thread_id": thread}}, deadline)
+    started = time.perf_counter()
+    draft = draft_application(wf, job_text, {}, cv_path, config)
+    return draft, get_fallbacks(wf, config), time.perf_counter() - started
+
+
+def _drain():
+    """Let calls abandoned at the deadline finish so they do not land in the next test's call log"""
+    time.sleep(LATENCY)
+
+
+def test_no_fallbacks_when_the_model_answers_in_time(fake_llm, cv_path, job_text):
+    draft, fallbacks, _ = _run(cv_path, job_text, Deadline(5))
+    assert fallbacks == [] and draft["to"] == "jobs@example.com"
+
+
+def test_hung_model_gives_a_template_draft_at_the_deadline(fake_llm, cv_path, job_text):
+    fake_llm.configure(latency=LATENCY)
+    draft, fallbacks, seconds = _run(cv_path, job_text, Deadline(0.6))
+
+    assert seconds < 1.2
+    assert set(fallbacks) == {"analyze_job", "draft_email"}
+    # The local template still addresses the posting and names the candidate
+    assert draft["to"] == "jobs@example.com"
+    assert draft["body"].startswith("Dear Hiring Manager,") and "Jane Doe" in draft["body"]
+    _drain()
+
+
+def test_stalled_cv_parse_keeps_the_local_fields(fake_llm, tmp_path, job_text):
+    cv_path = make_cv_pdf(os.path.join(tmp_path, "prose.pdf"), lines_per_page=len(PROSE_CV_LINES),
+                          cv_lines=PROSE_CV_LINES)
+    fake_llm.configure(latency=LATENCY)
+    draft, fallbacks, seconds = _run(cv_path, job_text, Deadline(0.6))
+
+    assert seconds < 1.2
+    assert set(fallbacks) == {"parse_data", "analyze_job", "draft_email"}
+    assert draft["subject"].startswith("Application for")
+    _drain()
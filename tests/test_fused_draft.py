@@ -0,0 +1,38 @@
+import os
+
+from fakes import PROSE_CV_LINES, make_cv_pdf
+from pipeline import parse_and_draft
+from profiles import get_store
+
+
+def _prose_cv(tmp_path):
+    return make_cv_pdf(os.path.join(tmp_path, "prose.pdf"), lines_per_page=len(PROSE_CV_LINES),
+                       cv_lines=PROSE_CV_LINES)
+
+
+def _draft(cv_path, job_text, thread):
+    config = {"configurable": {"thread_id": thread}}
+    return parse_and_draft("fake-key", "jane@example.com", "app-password", thread, job_text,
+                           cv_path, "jane", config)
+
+
+def test_cold_cv_is_parsed_by_the_draft_call(fake_llm, tmp_path, job_text):
+    cv_path = _prose_cv(tmp_path)
+    wf, draft, parsed = _draft(cv_path, job_text, "cold")
+
+    assert draft["to"] == "jobs@example.com" and draft["body"]
+    assert parsed and parsed["name"]
+    # Job analysis plus one fused parse-and-draft call, no separate parse
+    assert len(fake_llm.calls) == 2
+    assert len(get_store().list("jane")) == 1
+
+
+def test_saved_profile_skips_the_fused_call(fake_llm, tmp_path, job_text):
+    cv_path = _prose_cv(tmp_path)
+    _, _, parsed = _draft(cv_path, job_text, "first")
+    fake_llm.reset()
+
+    _, draft, again = _draft(cv_path, job_text, "second")
+    assert again == parsed and draft["body"]
+    # Analysis is cached by job text, so only the plain draft call remains
+    assert len(fake_llm.calls) == 1
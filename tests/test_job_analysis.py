@@ -0,0 +1,24 @@
+import os
+import time
+
+from agents import create_workflow
+from fakes import PROSE_CV_LINES, make_cv_pdf
+from pipeline import draft_application
+
+
+def test_job_analysis_runs_beside_cv_parsing(fake_llm, tmp_path, job_text):
+    # A CV without headings, so parsing needs the model as well
+    cv_path = make_cv_pdf(os.path.join(tmp_path, "prose.pdf"), lines_per_page=len(PROSE_CV_LINES),
+                          cv_lines=PROSE_CV_LINES)
+    fake_llm.configure(latency=0.5)
+    wf = create_workflow("fake-key", "jane@example.com", "app-password", "analysis")
+    config = {"configurable": {"thread_id": "analysis"}}
+    started = time.perf_counter()
+    draft = draft_application(wf, job_text, {}, cv_path, config)
+    seconds = time.perf_counter() - started
+
+    analysis = wf.get_state(config).values["job_analysis"]
+    assert analysis["contact_email"] == "jobs@example.com" and "Python" in analysis["requirements"]
+    assert draft["to"] == "jobs@example.com"
+    # Parsing and analysis (0.5 s each) overlap, then the draft call: well under three sequential calls
+    assert len(fake_llm.calls) == 3 and seconds < 1.3
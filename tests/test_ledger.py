@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+from ledger import Ledger, current, estimate_cost, record, recording, timed
+from metrics import record_cache
+from workers import WorkerPool
+
+
+def test_sessions_record_into_their_own_ledger():
+    pool = WorkerPool("test", 2, 4)
+    jane, john = Ledger(), Ledger()
+    barrier = threading.Barrier(2)
+
+    def session(ledger, calls):
+        with recording(ledger):
+            barrier.wait()
+            for _ in range(calls):
+                pool.run("call", record, "llm", "draft_email")
+
+    threads = [threading.Thread(target=session, args=args) for args in ((jane, 3), (john, 1))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(jane) == 3 and len(john) == 1
+    assert current() is None
+
+
+def test_nothing_is_recorded_without_an_active_ledger():
+    ledger = Ledger()
+    record("llm", "draft_email")
+    assert len(ledger) == 0
+
+
+def test_summary_counts_errors_and_cache_hits():
+    ledger = Ledger()
+    with recording(ledger):
+        record("llm", "draft_email", 0.5, input_tokens=1000, output_tokens=200, cost_usd=0.001)
+        record_cache("profile", True)
+        record_cache("profile", False)
+        with pytest.raises(OSError), timed("smtp", "send"):
+            raise OSError("connection reset")
+    summary = ledger.summary()
+    assert summary["llm"]["input_tokens"] == 1000 and summary["llm"]["cost_usd"] == 0.001
+    assert summary["cache"]["caches"]["profile"] == {"hit": 1, "miss": 1}
+    assert summary["smtp"]["errors"] == 1
+    assert ledger.to_csv().count("\n") == 5
+
+
+def test_cost_estimate_discounts_cached_input():
+    full = estimate_cost("gemini-1.5-flash", 1_000_000, 0)
+    assert full == pytest.approx(0.075)
+    assert estimate_cost("gemini-1.5-flash", 1_000_000, 0, cached_tokens=1_000_000) == pytest.approx(full / 4)
+    assert estimate_cost("fake", 1_000_000, 1_000_000) == 0.0
+
+
+def test_ledger_is_bounded():
+    ledger = Ledger(max_entries=2)
+    for name in ("a", "b", "c"):
+        ledger.add("llm", name)
+    assert [entry["name"] for entry in ledger.entries()] == ["b", "c"]
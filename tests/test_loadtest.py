@@ -0,0 +1,21 @@
+import time
+
+from loadtest import STEPS, ProcessSampler, run_load
+
+
+def test_sampler_reports_peaks():
+    with ProcessSampler(interval=0.01) as sampler:
+        time.sleep(0.05)
+    summary = sampler.summary()
+    assert summary["rss_mb_peak"] >= summary["rss_mb_start"] > 0
+    assert summary["threads_peak"] >= summary["threads_start"] >= 1
+
+
+def test_concurrent_sessions_send_their_applications(fake_llm):
+    result = run_load(2, latency=0.0, latency_per_1k_tokens=0.0, timeout=60)
+
+    assert result["errors"] == [] and result["completed"] == 2
+    assert result["emails_delivered"] == 2 and result["llm_calls"] > 0
+    assert set(result["steps"]) == set(STEPS)
+    # Every session reported a latency for every step
+    assert all(stats["seconds"]["count"] == 2 for stats in result["steps"].values())
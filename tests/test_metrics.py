@@ -0,0 +1,49 @@
+import pytest
+
+from agents import create_workflow
+from metrics import MetricsRegistry, instrument, registry
+from pipeline import draft_application
+
+
+def count(name, **labels):
+    """Sum of a global counter or histogram count over the series matching `labels`"""
+    snapshot = registry.snapshot()
+    series = snapshot["counters"].get(name) or snapshot["histograms"].get(name) or []
+    return sum(sample.get("value", sample.get("count", 0)) for sample in series
+               if all(sample["labels"].get(k) == v for k, v in labels.items()))
+
+
+def test_histograms_bucket_and_export():
+    metrics = MetricsRegistry(buckets=(0.1, 1.0))
+    metrics.observe("node_duration_seconds", 0.05, node="draft")
+    metrics.observe("node_duration_seconds", 0.5, node="draft")
+    metrics.inc("llm_calls", node="draft")
+    metrics.register_collector("queue", lambda: {"depth": 3, "label": "ignored"})
+    (sample,) = metrics.snapshot()["histograms"]["node_duration_seconds"]
+    assert sample["buckets"] == {"0.1": 1, "1.0": 2} and sample["max"] == 0.5
+    text = metrics.render_openmetrics()
+    assert 'node_duration_seconds_bucket{node="draft",le="+Inf"} 2' in text
+    assert 'llm_calls_total{node="draft"} 1' in text
+    assert "queue_depth 3" in text and "queue_label" not in text
+    assert text.endswith("# EOF\n")
+
+
+def test_instrument_counts_errors():
+    @instrument("test_node")
+    def fail():
+        raise ValueError("boom")
+
+    errors = count("node_errors", node="test_node")
+    with pytest.raises(ValueError):
+        fail()
+    assert count("node_errors", node="test_node") == errors + 1
+    assert count("node_duration_seconds", node="test_node") >= 1
+
+
+def test_graph_nodes_and_model_calls_are_recorded(fake_llm, cv_path, job_text):
+    drafts, calls = count("node_duration_seconds", node="draft_email"), count("llm_calls", node="draft_email")
+    wf = create_workflow("fake-key", "jane@example.com", "app-password", "metrics-test")
+    config = {"configurable": {"thread_id": "metrics-test"}}
+    assert draft_application(wf, job_text, {"name": "Jane Doe", "skills": ["Python"]}, cv_path, config)
+    assert count("node_duration_seconds", node="draft_email") == drafts + 1
+    assert count("llm_calls", node="draft_email") == calls + 1
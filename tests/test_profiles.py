@@ -0,0 +1,51 @@
+import base64
+import json
+
+import pytest
+
+from profiles import ProfileStore, cv_hash
+
+PDF = b"%PDF-1.4 Jane Doe CV"
+PARSED = {"name": "Jane Doe", "skills": ["Python", "SQL"], "relevant_job_titles": ["Backend Engineer"]}
+
+
+def store():
+    return ProfileStore(":memory:")
+
+
+def test_save_and_get_round_trip():
+    profiles = store()
+    profiles.save("jane", cv_hash(PDF), dict(PARSED, unknown="dropped"), "cv.pdf", PDF)
+    profile = profiles.get("jane", cv_hash(PDF), with_pdf=True)
+    assert profile["parsed"]["skills"] == ["Python", "SQL"] and "unknown" not in profile["parsed"]
+    assert profile["cv_pdf"] == PDF and profile["summary"].startswith("Jane Doe")
+    assert profiles.get("john", cv_hash(PDF)) is None
+
+
+def test_export_import_round_trip():
+    source = store()
+    source.save("jane", cv_hash(PDF), PARSED, "cv.pdf", PDF)
+    target = store()
+    assert target.import_json("jane", source.export_json("jane")) == (1, 0)
+    assert target.get("jane", cv_hash(PDF), with_pdf=True)["cv_pdf"] == PDF
+
+
+def test_import_skips_invalid_and_stale_records():
+    pdf = base64.b64encode(PDF).decode("ascii")
+    records = [
+        {"cv_hash": cv_hash(PDF), "parsed": dict(PARSED, skills="Python"), "cv_pdf_base64": pdf},
+        {"cv_hash": cv_hash(b"an older CV"), "parsed": PARSED, "cv_pdf_base64": pdf},
+        {"cv_hash": "not-a-hash", "parsed": PARSED},
+        {"cv_hash": cv_hash(PDF), "parsed": PARSED, "cv_pdf_base64": "%%%"},
+        {"cv_hash": cv_hash(PDF), "parsed": None},
+        "not a record",
+        {"cv_hash": cv_hash(b"other"), "parsed": PARSED},
+    ]
+    profiles = store()
+    assert profiles.import_json("jane", json.dumps({"version": 1, "profiles": records})) == (1, 6)
+    assert [profile["cv_hash"] for profile in profiles.list("jane")] == [cv_hash(b"other")]
+
+
+def test_import_rejects_other_documents():
+    with pytest.raises(ValueError):
+        store().import_json("jane", json.dumps([PARSED]))
@@ -0,0 +1,30 @@
+from ranking import rank_feed, rank_jobs
+
+FEED = [(f"job-{i}", f"Posting {i} for a pastry chef with croissant and baking experience") for i in range(10)]
+
+
+def test_cv_without_matching_terms_still_gets_top_k():
+    ranked = rank_jobs(iter(FEED), {"skills": ["Kubernetes"], "relevant_job_titles": ["SRE"]}, top_k=3, chunk_size=4)
+    assert [job["id"] for job in ranked] == ["job-0", "job-1", "job-2"]
+    assert all(job["score"] == 0 for job in ranked)
+
+
+def test_min_score_still_filters():
+    ranked = rank_feed(iter(FEED), [{"skills": ["Kubernetes"]}], top_k=3, min_score=0.01)[0]
+    assert ranked == []
+
+
+def test_matching_postings_rank_first():
+    feed = FEED + [("python-job", "Backend engineer with Python, SQL and Docker")]
+    ranked = rank_jobs(iter(feed), {"skills": ["Python", "SQL", "Docker"]}, top_k=3, chunk_size=4)
+    assert ranked[0]["id"] == "python-job" and ranked[0]["score"] > 0
+    assert len(ranked) == 3
+
+
+def test_cli_default_skips_postings_matching_nothing():
+    from cli import build_parser
+
+    min_score = build_parser().parse_args(["--cv", "cv.pdf"]).min_score
+    feed = FEED + [("python-job", "Backend engineer with Python, SQL and Docker")]
+    ranked = rank_jobs(iter(feed), {"skills": ["Python", "SQL", "Docker"]}, top_k=3, min_score=min_score)
+    assert [job["id"] for job in ranked] == ["python-job"]
@@ -0,0 +1,45 @@
+import json
+
+import routing
+from routing import Router
+
+
+def router():
+    return Router({"draft_email": ("gemini-1.5-pro", 10.0)})
+
+
+def test_draft_defaults_to_flash(monkeypatch):
+    monkeypatch.delenv("MODEL_ROUTES", raising=False)
+    assert Router().route("draft_email")[0] == "gemini-1.5-flash"
+
+
+def test_routes_can_be_overridden(monkeypatch):
+    monkeypatch.setenv("MODEL_ROUTES", json.dumps(
+        {"draft_email": {"model": "gemini-1.5-pro", "budget": 20}, "human_in_loop": "gemini-1.5-flash"}))
+    routes = Router()
+    assert routes.route("draft_email") == ("gemini-1.5-pro", 20.0)
+    assert routes.route("human_in_loop")[0] == "gemini-1.5-flash"
+
+
+def test_slow_model_is_downgraded_one_tier_at_a_time():
+    routes = router()
+    assert routes.choose("draft_email") == ("gemini-1.5-pro", False)
+    routes.observe("draft_email", "gemini-1.5-pro", 30.0)
+    assert routes.choose("draft_email") == ("gemini-1.5-flash", True)
+    routes.observe("draft_email", "gemini-1.5-flash", 12.0)
+    assert routes.choose("draft_email") == ("gemini-1.5-flash-8b", True)
+
+
+def test_tighter_caller_budget_downgrades_sooner():
+    routes = router()
+    routes.observe("draft_email", "gemini-1.5-pro", 5.0)
+    assert routes.choose("draft_email") == ("gemini-1.5-pro", False)
+    assert routes.choose("draft_email", budget=2.0) == ("gemini-1.5-flash", True)
+
+
+def test_downgraded_node_probes_its_configured_model(monkeypatch):
+    monkeypatch.setattr(routing, "PROBE_EVERY", 3)
+    routes = router()
+    routes.observe("draft_email", "gemini-1.5-pro", 30.0)
+    models = [routes.choose("draft_email")[0] for _ in range(6)]
+    assert models.count("gemini-1.5-pro") == 2 and models[2] == "gemini-1.5-pro"
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+from deadline import Deadline, DeadlineExceeded
+from scheduler import LLMScheduler, TokenBucket
+
+
+def throttled(requests_per_minute):
+    """Scheduler whose request bucket starts empty, so every call waits for a refill"""
+    scheduler = LLMScheduler(requests_per_minute=requests_per_minute, cooldown_seconds=0.01)
+    scheduler.requests.drain(0, time.monotonic())
+    return scheduler
+
+
+def wait_for_depth(scheduler, depth):
+    for _ in range(200):
+        if scheduler.metrics()["queue_depth"] >= depth:
+            return
+        time.sleep(0.005)
+    raise AssertionError(f"queue never reached {depth}")
+
+
+def test_bucket_refills_at_its_rate():
+    bucket = TokenBucket(60)
+    assert bucket.wait_time(60, bucket.updated) == 0
+    bucket.consume(60)
+    assert bucket.wait_time(2, bucket.updated) == pytest.approx(2.0)
+    assert bucket.wait_time(1000, bucket.updated) == pytest.approx(60.0)
+
+
+def test_sessions_are_served_round_robin():
+    scheduler = throttled(1200)
+    order, lock = [], threading.Lock()
+
+    def call(session):
+        scheduler.acquire(session)
+        with lock:
+            order.append(session)
+
+    batch = [threading.Thread(target=call, args=("batch",)) for _ in range(5)]
+    for thread in batch:
+        thread.start()
+    wait_for_depth(scheduler, 5)
+    interactive = threading.Thread(target=call, args=("ui",))
+    interactive.start()
+    for thread in batch + [interactive]:
+        thread.join(timeout=5)
+    assert order.index("ui") <= 1
+    assert scheduler.metrics()["admitted"] == 6
+
+
+def test_requests_per_minute_are_enforced():
+    scheduler = throttled(1200)
+    started = time.monotonic()
+    for _ in range(4):
+        scheduler.acquire("batch")
+    assert time.monotonic() - started >= 0.15
+    assert scheduler.metrics()["throttled"] == 4
+
+
+def test_deadline_ends_the_queue_wait():
+    scheduler = throttled(1)
+    with pytest.raises(DeadlineExceeded):
+        scheduler.acquire("ui", deadline=Deadline(0.1))
+    assert scheduler.metrics()["queue_depth"] == 0
+
+
+def test_rate_limited_calls_are_retried_after_a_cool_down():
+    scheduler = LLMScheduler(requests_per_minute=6000, cooldown_seconds=0.01)
+    attempts = []
+
+    def call():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("429 ResourceExhausted")
+        return "ok"
+
+    assert scheduler.run("ui", call) == "ok"
+    assert len(attempts) == 2 and scheduler.metrics()["rate_limited"] == 1
+
+
+def test_other_errors_are_not_retried():
+    scheduler = LLMScheduler(requests_per_minute=6000)
+
+    def call():
+        raise ValueError("bad prompt")
+
+    with pytest.raises(ValueError):
+        scheduler.run("ui", call)
+    assert scheduler.metrics()["admitted"] == 1
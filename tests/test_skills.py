@@ -0,0 +1,42 @@
+from skills import SkillExtractor
+
+extractor = SkillExtractor()
+
+
+def test_everyday_words_are_not_skills():
+    text = ("Express your interest in English. Excel in a swift, fast-paced team, "
+            "take the helm, spark ideas and avoid rust.")
+    assert extractor.extract(text) == []
+
+
+def test_qualified_forms_still_match():
+    text = "Express.js, MS Excel, Apache Spark, Helm charts, SwiftUI, Rust programming and fluent English"
+    assert set(extractor.extract(text)) == {"Express", "Excel", "Spark", "Helm", "Swift", "Rust", "English"}
+
+
+def test_aws_lambda_credits_aws():
+    assert "AWS" in extractor.extract("Serverless APIs on AWS Lambda")
+
+
+def test_broad_terms_do_not_map_to_specific_skills():
+    assert extractor.extract("containerization, version control on GitHub, AI and UI work") == []
+
+
+def test_matched_skills_follow_the_ambiguity_rules():
+    from scoring import matched_skills
+
+    job = "Let's go! Rust-free C-suite reporting in R&D; Python and sourdough lamination a plus."
+    assert matched_skills(["Go", "C", "R", "Rust", "Python", "Sourdough lamination"], job) == [
+        "Python", "Sourdough lamination"]
+    assert matched_skills(["Go", "Rust"], "Backend services in Golang and Rust programming") == ["Go", "Rust"]
+
+
+def test_draft_score_does_not_credit_everyday_words():
+    from scoring import score_breakdown
+
+    job = "Backend engineer: Golang, Kubernetes and PostgreSQL. Apply at jobs@example.com"
+    cv = {"skills": ["Go", "Kubernetes", "PostgreSQL"]}
+    vague = {"to": "jobs@example.com", "subject": "Backend engineer", "body": "I am ready to go."}
+    specific = dict(vague, body="I run Golang services on Kubernetes with PostgreSQL.")
+    assert score_breakdown(vague, cv, job)["skills"] == 0.0
+    assert score_breakdown(specific, cv, job)["skills"] == 1.0
@@ -0,0 +1,57 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import speculative
+from deadline import Deadline
+from speculative import SpeculativeDraft, draft_key
+
+KEY = draft_key({"name": "Jane"}, "Backend engineer")
+
+
+@pytest.fixture
+def one_worker(monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(speculative, "_executor", executor)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+def test_finished_draft_is_handed_over(one_worker):
+    draft = SpeculativeDraft()
+    draft.submit(KEY, lambda: "draft").result()
+    assert draft.ready(KEY)
+    assert draft.take(KEY).result() == "draft"
+    assert draft.take(KEY) is None
+
+
+def test_queued_draft_is_cancelled_instead_of_waited_for(one_worker):
+    release = threading.Event()
+    one_worker.submit(release.wait)
+    draft = SpeculativeDraft()
+    future = draft.submit(KEY, lambda: "draft")
+    assert draft.take(KEY) is None
+    assert future.cancelled()
+    release.set()
+
+
+def test_running_draft_is_handed_over(one_worker):
+    started, release = threading.Event(), threading.Event()
+    draft = SpeculativeDraft()
+    draft.submit(KEY, lambda: (started.set(), release.wait(), "draft")[-1])
+    started.wait(1)
+    future = draft.take(KEY)
+    release.set()
+    assert future.result(timeout=1) == "draft"
+
+
+def test_new_key_stops_the_stale_draft(one_worker):
+    started = threading.Event()
+    deadline = Deadline(5)
+    draft = SpeculativeDraft()
+    draft.submit(KEY, lambda: (started.set(), deadline._wait(lambda: False)), deadline)
+    started.wait(1)
+    draft.submit(draft_key({"name": "Jane"}, "Data engineer"), lambda: "other")
+    assert deadline.cancelled
+    assert not draft.pending(KEY)
@@ -0,0 +1,90 @@
+import mailbox
+import os
+from email.message import EmailMessage
+
+import pytest
+
+from deadline import Deadline, DeadlineExceeded
+from fakes import SMTPSink
+from transports import (GmailTransport, MailboxTransport, MemoryTransport, SMTPTransport,
+                        transport_from_spec)
+
+
+def message(to="jobs@example.com"):
+    msg = EmailMessage()
+    msg["From"], msg["To"], msg["Subject"] = "jane@example.com", to, "Application"
+    msg.set_content("Dear Hiring Manager,")
+    return msg
+
+
+@pytest.fixture
+def sink():
+    with SMTPSink() as sink:
+        yield sink
+
+
+def test_memory_transport_keeps_batches_in_order():
+    transport = MemoryTransport()
+    assert transport.send([]) == 0
+    assert transport.send([message("a@example.com"), message("b@example.com")]) == 2
+    assert [str(msg["To"]) for msg in transport.messages] == ["a@example.com", "b@example.com"]
+    with pytest.raises(DeadlineExceeded):
+        transport.send([message()], deadline=Deadline(0))
+    assert transport.stats()["delivered"] == 2
+
+
+@pytest.mark.parametrize("kind", ["maildir", "mbox"])
+def test_mailbox_transport_writes_local_files(tmp_path, kind):
+    path = os.path.join(tmp_path, kind)
+    transport = MailboxTransport(path, kind)
+    transport.send([message("a@example.com"), message("b@example.com")])
+    transport.send([message("c@example.com")])
+
+    box = mailbox.Maildir(path) if kind == "maildir" else mailbox.mbox(path)
+    assert sorted(str(msg["To"]) for msg in box) == ["a@example.com", "b@example.com", "c@example.com"]
+    assert transport.stats()["delivered"] == 3
+
+
+def test_smtp_connections_are_reused_per_account(sink):
+    transport = SMTPTransport("127.0.0.1", sink.port, starttls=False)
+    transport.send([message()], "jane@example.com", "app-password")
+    transport.send([message(), message()], "jane@example.com", "app-password")
+    transport.send([message()], "john@example.com", "other-password")
+
+    stats = transport.stats()
+    assert len(sink.messages) == 4
+    assert stats["connections_opened"] == 2 and stats["connections_reused"] == 1
+    assert stats["idle_connections"] == 2
+    transport.close()
+    assert transport.stats()["idle_connections"] == 0
+
+
+def test_dead_or_expired_connections_are_dropped(sink):
+    transport = SMTPTransport("127.0.0.1", sink.port, starttls=False)
+    transport.send([message()], "jane@example.com", "app-password")
+    # The server closed the idle connection: NOOP fails and a new one is opened
+    (server, _), = transport._idle[("jane@example.com", "app-password")]
+    server.docmd("QUIT")
+    transport.send([message()], "jane@example.com", "app-password")
+    assert transport.stats()["connections_dropped"] == 1 and transport.stats()["connections_opened"] == 2
+
+    transport.idle_seconds = -1
+    transport.send([message()], "jane@example.com", "app-password")
+    stats = transport.stats()
+    assert stats["connections_dropped"] == 2 and stats["connections_reused"] == 0
+    assert len(sink.messages) == 3
+    transport.close()
+
+
+def test_transport_from_spec(monkeypatch, tmp_path):
+    monkeypatch.setenv("MAIL_SMTP_HOST", "mail.example.com")
+    monkeypatch.setenv("MAIL_SMTP_STARTTLS", "0")
+    monkeypatch.setenv("MAIL_SMTP_POOL_SIZE", "4")
+    assert isinstance(transport_from_spec("gmail"), GmailTransport)
+    smtp = transport_from_spec("smtp")
+    assert (smtp.host, smtp.port, smtp.starttls, smtp.pool_size) == ("mail.example.com", 587, False, 4)
+    mbox = transport_from_spec(f"mbox:{tmp_path}/out.mbox")
+    assert (mbox.name, mbox.path) == ("mbox", f"{tmp_path}/out.mbox")
+    assert isinstance(transport_from_spec("memory"), MemoryTransport)
+    with pytest.raises(ValueError):
+        transport_from_spec("pigeon")
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from metrics import registry
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+DRAFT = {"to": "jobs@example.com", "subject": "Application",
+         "body": "Dear Hiring Manager,\n\nI build Python services.\n\nBest regards,\nJane Doe"}
+
+
+def runs(scope):
+    return sum(sample["count"] for sample in registry.snapshot()["histograms"].get("ui_run_seconds", [])
+               if sample["labels"]["scope"] == scope)
+
+
+@pytest.fixture
+def review(fake_llm, job_text):
+    """The app on step 4 with a draft to review"""
+    app = AppTest.from_file(APP, default_timeout=60)
+    app.session_state["workflow_step"] = 4
+    app.session_state["api_key"] = "fake-key"
+    app.session_state["job_text"] = job_text
+    app.session_state["email_draft"] = dict(DRAFT)
+    app.run()
+    assert not app.exception
+    return app
+
+
+def test_review_panel_runs_as_its_own_fragment(review):
+    before = runs("step_4_review")
+    review.run()
+    assert runs("step_4_review") == before + 1
+
+
+def test_body_edits_are_kept(review):
+    body = DRAFT["body"].replace("Python", "Go")
+    review.text_area(key="email_body_editor").input(body).run()
+    assert review.session_state["email_draft"]["body"] == body
+
+
+def test_mechanical_revision_needs_no_model_call(review, fake_llm):
+    review.text_input[0].input("change subject to Backend Engineer application")
+    review.button[0].click().run()
+    assert not review.exception and not review.error
+    assert review.session_state["email_draft"]["subject"] == "Backend Engineer application"
+    assert fake_llm.calls == []
@@ -0,0 +1,31 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ["pydantic", "langchain_core", "langgraph", "langchain_community", "pypdf", "langchain_google_genai",
+         "agents", "pipeline", "dedup", "numpy"]
+
+
+def python(code):
+    """Run `code` in a fresh interpreter (imports in this one are already warm) and parse its JSON output"""
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True,
+                            timeout=300)
+    return json.loads(result.stdout)
+
+
+def test_ui_import_defers_heavy_modules():
+    loaded = python(f"import json, sys, ui; print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))")
+    assert loaded == []
+
+
+def test_warmup_imports_each_module_once():
+    result = python(
+        "import json, warmup\n"
+        "thread = warmup.start()\n"
+        "again = warmup.start() is thread\n"
+        "print(json.dumps({'again': again, 'done': warmup.wait(240), 'modules': sorted(warmup.import_times())}))"
+    )
+    assert result["again"] and result["done"]
+    assert {"agents", "pipeline", "langgraph.graph"} <= set(result["modules"])
@@ -0,0 +1,62 @@
+import threading
+import time
+
+import pytest
+
+from deadline import Deadline, DeadlineExceeded
+from workers import PoolSaturated, WorkerPool
+
+
+def settled(pool, **expected):
+    """True once the stats match; done callbacks update them just after a result is delivered"""
+    for _ in range(100):
+        stats = pool.stats()
+        if all(stats[field] == value for field, value in expected.items()):
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def blocked_pool(max_workers=1, max_queue=1, admit_seconds=0.2):
+    """Pool whose every slot is taken until the returned event is set"""
+    pool = WorkerPool("test", max_workers, max_queue, admit_seconds)
+    release = threading.Event()
+    futures = [pool.submit("block", release.wait) for _ in range(max_workers + max_queue)]
+    return pool, release, futures
+
+
+def test_full_pool_rejects_after_admit_seconds():
+    pool, release, _ = blocked_pool()
+    started = time.monotonic()
+    with pytest.raises(PoolSaturated):
+        pool.submit("late", lambda: None)
+    assert 0.15 < time.monotonic() - started < 1
+    assert pool.stats()["rejected"] == 1
+    release.set()
+
+
+def test_full_pool_honours_the_callers_deadline():
+    pool, release, _ = blocked_pool(admit_seconds=30)
+    with pytest.raises(DeadlineExceeded):
+        pool.submit("late", lambda: None, deadline=Deadline(0.1))
+    release.set()
+
+
+def test_waiting_submit_is_admitted_when_a_slot_frees():
+    pool, release, futures = blocked_pool(admit_seconds=5)
+    threading.Timer(0.1, release.set).start()
+    assert pool.submit("late", lambda: "ran").result(timeout=2) == "ran"
+    assert all(future.result() for future in futures)
+    assert settled(pool, completed=3, queued=0, max_queued=1)
+
+
+def test_nested_run_on_a_saturated_pool_runs_inline():
+    pool = WorkerPool("test", 1, 0, admit_seconds=0.2)
+    assert pool.run("outer", lambda: pool.run("inner", lambda: "done")) == "done"
+
+
+def test_failures_are_counted_and_raised():
+    pool = WorkerPool("test", 1, 0)
+    with pytest.raises(ZeroDivisionError):
+        pool.run("fail", lambda: 1 / 0)
+    assert settled(pool, failed=1)
@@ -0,0 +1,277 @@
+"""Mail transports: how a built application email is delivered.
+
+send_email_directly builds the MIME message (agents.build_email) and hands
+it to the process-wide transport, which delivers it on the shared I/O pool
+(workers.py). Every transport takes a batch of messages, so many
+applications can go out over one SMTP connection or one mailbox lock.
+
+MAIL_TRANSPORT selects the implementation:
+    gmail           (default) smtp.gmail.com:587 with STARTTLS
+    smtp            MAIL_SMTP_HOST / MAIL_SMTP_PORT, STARTTLS unless MAIL_SMTP_STARTTLS=0
+    maildir:<path>  one file per message in a local Maildir; nothing leaves the machine
+    mbox:<path>     appended to a local mbox file; nothing leaves the machine
+    memory          kept in memory (tests, load runs)
+
+SMTP transports keep up to MAIL_SMTP_POOL_SIZE logged-in connections per
+account for MAIL_SMTP_IDLE_SECONDS, so consecutive sends skip the connect,
+STARTTLS and login round trips.
+"""
+import os
+import time
+import smtplib
+import mailbox
+import threading
+from email.message import Message
+from typing import Any, Dict, List, Optional, Tuple
+
+from metrics import registry, record_cache
+from ledger import timed as ledger_timed
+from deadline import Deadline
+from workers import get_pool
+
+class Transport:
+    """Delivers batches of messages; subclasses implement _deliver()"""
+    name = "transport"
+
+    def send(self, messages: List[Message], username: str = "", password: str = "",
+             deadline: Optional[Deadline] = None) -> int:
+        """Deliver `messages` in order and return how many were delivered; raises on the first failure"""
+        if not messages:
+            return 0
+        recipients = ", ".join(sorted({str(msg["To"]) for msg in messages}))
+        with registry.timer("mail_send_seconds", transport=self.name), ledger_timed("mail", self.name, recipients):
+            get_pool("io").run(f"mail_{self.name}", self._deliver, messages, username, password, deadline,
+                               deadline=deadline)
+        registry.inc("mail_batches", transport=self.name)
+        registry.inc("mail_messages", len(messages), transport=self.name)
+        return len(messages)
+
+    def _deliver(self, messages: List[Message], username: str, password: str, deadline: Optional[Deadline]):
+        raise NotImplementedError
+
+    def close(self):
+        """Release connections or files held between sends"""
+
+    def stats(self) -> Dict[str, Any]:
+        return {"transport": self.name}
+
+# ----------------- SMTP -----------------
+class SMTPTransport(Transport):
+    """SMTP server with a pool of logged-in connections per account"""
+    name = "smtp"
+
+    def __init__(self, host: str, port: int = 587, starttls: bool = True, pool_size: int = 2,
+                 idle_seconds: float = 60.0):
+        self.host = host
+        self.port = port
+        self.starttls = starttls
+        self.pool_size = pool_size
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        # (username, password) -> idle connections with the time they were last used
+        self._idle: Dict[Tuple[str, str], List[Tuple[smtplib.SMTP, float]]] = {}
+        self._stats = {"connections_opened": 0, "connections_reused": 0, "connections_dropped": 0}
+
+    @staticmethod
+    def _bound(deadline: Optional[Deadline], phase: str, server: Optional[smtplib.SMTP] = None) -> Dict[str, float]:
+        """Socket timeout for one SMTP phase from the time left on `deadline`"""
+        if deadline is None:
+            return {}
+        deadline.check(f"smtp_{phase}")
+        if server is not None and server.sock is not None:
+            server.sock.settimeout(deadline.remaining())
+        return {"timeout": deadline.remaining()}
+
+    def _connect(self, username: str, password: str, deadline: Optional[Deadline]) -> smtplib.SMTP:
+        with registry.timer("smtp_phase_seconds", phase="connect"), ledger_timed("smtp", "connect", self.host):
+            server = smtplib.SMTP(self.host, self.port, **self._bound(deadline, "connect"))
+        try:
+            if self.starttls:
+                with registry.timer("smtp_phase_seconds", phase="starttls"), ledger_timed("smtp", "starttls", self.host):
+                    self._bound(deadline, "starttls", server)
+                    server.starttls()
+            if username:
+                with registry.timer("smtp_phase_seconds", phase="login"), ledger_timed("smtp", "login", self.host):
+                    self._bound(deadline, "login", server)
+                    server.login(username, password)
+        except BaseException:
+            self._quit(server)
+            raise
+        with self._lock:
+            self._stats["connections_opened"] += 1
+        return server
+
+    def _checkout(self, key: Tuple[str, str], deadline: Optional[Deadline]) -> Optional[smtplib.SMTP]:
+        """An idle connection of this account that still answers NOOP, or None"""
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                if not idle:
+                    return None
+                server, last_used = idle.pop()
+            if time.monotonic() - last_used > self.idle_seconds:
+                self._drop(server)
+                continue
+            try:
+                with registry.timer("smtp_phase_seconds", phase="noop"):
+                    self._bound(deadline, "noop", server)
+                    if server.noop()[0] == 250:
+                        with self._lock:
+                            self._stats["connections_reused"] += 1
+                        return server
+            except OSError:
+                # smtplib.SMTPException included: the server closed the idle connection
+                pass
+            self._drop(server)
+
+    def _checkin(self, key: Tuple[str, str], server: smtplib.SMTP):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.pool_size:
+                idle.append((server, time.monotonic()))
+                return
+        self._quit(server)
+
+    def _drop(self, server: smtplib.SMTP):
+        with self._lock:
+            self._stats["connections_dropped"] += 1
+        self._quit(server)
+
+    @staticmethod
+    def _quit(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except OSError:
+            server.close()
+
+    def _deliver(self, messages: List[Message], username: str, password: str, deadline: Optional[Deadline]):
+        key = (username, password)
+        server = self._checkout(key, deadline)
+        record_cache("smtp_connection_pool", server is not None)
+        if server is None:
+            server = self._connect(username, password, deadline)
+        try:
+            for msg in messages:
+                with registry.timer("smtp_phase_seconds", phase="send"), ledger_timed("smtp", "send", str(msg["To"])):
+                    self._bound(deadline, "send", server)
+                    server.send_message(msg)
+        except BaseException:
+            # The connection may be mid-transaction; never hand it to the next send
+            self._drop(server)
+            raise
+        self._checkin(key, server)
+
+    def close(self):
+        with self._lock:
+            idle = [server for servers in self._idle.values() for server, _ in servers]
+            self._idle.clear()
+        for server in idle:
+            self._quit(server)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"transport": self.name, "host": f"{self.host}:{self.port}",
+                    "idle_connections": sum(len(servers) for servers in self._idle.values()), **self._stats}
+
+class GmailTransport(SMTPTransport):
+    """Gmail's submission server; needs the account's app password"""
+    name = "gmail"
+
+    def __init__(self, pool_size: int = 2, idle_seconds: float = 60.0):
+        super().__init__("smtp.gmail.com", 587, True, pool_size, idle_seconds)
+
+# ----------------- LOCAL -----------------
+class MailboxTransport(Transport):
+    """Writes messages to a local Maildir or mbox instead of sending them (dry runs, staging)"""
+
+    def __init__(self, path: str, kind: str = "maildir"):
+        if kind not in ("maildir", "mbox"):
+            raise ValueError(f"Unknown mailbox format: {kind}")
+        self.name = kind
+        self.path = path
+        self._lock = threading.Lock()
+        self._delivered = 0
+
+    def _deliver(self, messages: List[Message], username: str, password: str, deadline: Optional[Deadline]):
+        if deadline is not None:
+            deadline.check(f"{self.name}_deliver")
+        with self._lock:
+            if self.name == "maildir":
+                box = mailbox.Maildir(self.path, create=True)
+                for msg in messages:
+                    box.add(msg)
+            else:
+                box = mailbox.mbox(self.path)
+                box.lock()
+                try:
+                    for msg in messages:
+                        box.add(msg)
+                    box.flush()
+                finally:
+                    box.unlock()
+                    box.close()
+            self._delivered += len(messages)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"transport": self.name, "path": self.path, "delivered": self._delivered}
+
+class MemoryTransport(Transport):
+    """Keeps every message in memory; for tests and load runs"""
+    name = "memory"
+
+    def __init__(self):
+        self.messages: List[Message] = []
+        self._lock = threading.Lock()
+
+    def _deliver(self, messages: List[Message], username: str, password: str, deadline: Optional[Deadline]):
+        if deadline is not None:
+            deadline.check("memory_deliver")
+        with self._lock:
+            self.messages.extend(messages)
+
+    def clear(self):
+        with self._lock:
+            self.messages.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"transport": self.name, "delivered": len(self.messages)}
+
+# ----------------- SHARED INSTANCE -----------------
+def transport_from_spec(spec: str) -> Transport:
+    """Transport for a MAIL_TRANSPORT value such as "gmail" or "maildir:outbox" (see the module docstring)"""
+    kind, _, path = spec.partition(":")
+    pool_size = int(os.environ.get("MAIL_SMTP_POOL_SIZE", 2))
+    idle_seconds = float(os.environ.get("MAIL_SMTP_IDLE_SECONDS", 60))
+    if kind == "gmail":
+        return GmailTransport(pool_size, idle_seconds)
+    if kind == "smtp":
+        return SMTPTransport(os.environ.get("MAIL_SMTP_HOST", "localhost"),
+                             int(os.environ.get("MAIL_SMTP_PORT", 587)),
+                             os.environ.get("MAIL_SMTP_STARTTLS", "1") != "0", pool_size, idle_seconds)
+    if kind in ("maildir", "mbox"):
+        return MailboxTransport(path or os.path.join("outbox", kind if kind == "maildir" else "outbox.mbox"), kind)
+    if kind == "memory":
+        return MemoryTransport()
+    raise ValueError(f"Unknown mail transport: {spec}")
+
+_transport: Optional[Transport] = None
+_transport_lock = threading.Lock()
+
+def get_transport() -> Transport:
+    """Process-wide mail transport (from MAIL_TRANSPORT)"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = transport_from_spec(os.environ.get("MAIL_TRANSPORT", "gmail"))
+        return _transport
+
+def set_transport(transport: Optional[Transport]) -> Optional[Transport]:
+    """Replace the process-wide transport (None: from MAIL_TRANSPORT again); returns the previous one"""
+    global _transport
+    with _transport_lock:
+        previous, _transport = _transport, transport
+    return previous
+
+registry.register_collector("mail_transport", lambda: get_transport().stats())
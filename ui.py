@@ -2,7 +2,20 @@ import streamlit as st
 import tempfile
 import os
 import json
-from agents import create_cv_subgraph, create_workflow, EmailSchema, send_email_directly, DataExtractSchema
+import uuid
+import functools
+import time
+import warmup
+from speculative import SpeculativeDraft, draft_key
+from deadline import Deadline, with_deadline
+from ledger import Ledger, recording
+from metrics import registry
+
+# Seconds the job text must stay unchanged before a speculative draft starts
+SPECULATION_DELAY_SECONDS = 1.5
+
+# The sidebar ledger lists this many recent entries
+LEDGER_ROWS = 50
 
 # ----------------- Initialize Session State -----------------
 def initialize_session_state():
@@ -14,10 +27,27 @@ def initialize_session_state():
         'cv_uploaded': False,
         'cv_parsed': False,
         'parsed_cv': None,
+        'cv_pending': False,
+        'cv_filename': '',
+        'fused_draft': os.environ.get("FUSED_DRAFT", "0") == "1",
         'job_text': '',
         'email_draft': None,
         'temp_cv_path': None,
+        'cv_file_id': None,
+        'profile_import_id': None,
+        'job_text_changed_at': 0.0,
+        'draft_variants': int(os.environ.get("DRAFT_VARIANTS", 1)),
+        'alternates': [],
+        'draft_fallbacks': [],
+        'duplicate_job': None,
+        'duplicate_override': False,
+        'auto_select_cv': False,
+        'cv_choice': None,
+        'cv_before_switch': None,
+        'speculative_draft': SpeculativeDraft(),
+        'ledger': Ledger(),
         'wf': None,
+        'session_id': uuid.uuid4().hex,
         'config': {"configurable": {"thread_id": "streamlit_session"}}
     }
     
@@ -25,6 +55,25 @@ def initialize_session_state():
         if key not in st.session_state:
             st.session_state[key] = default_value
 
+# ----------------- HELPERS -----------------
+def session_ledger():
+    """Record everything this run (and the work it submits) does into the session's ledger"""
+    if 'ledger' not in st.session_state:
+        st.session_state.ledger = Ledger()
+    return recording(st.session_state.ledger)
+
+def timed_fragment(name: str, run_every=None):
+    """st.fragment that records each of its runs in the ui_run_seconds metric"""
+    def decorator(fn):
+        @st.fragment(run_every=run_every)
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            # Fragment reruns do not pass through app.py, so they activate the ledger themselves
+            with registry.timer("ui_run_seconds", scope=name), session_ledger():
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
 # ----------------- UI COMPONENTS -----------------
 def step_1_configuration():
     # Main container with card styling
@@ -147,6 +196,9 @@ def step_1_configuration():
                 </div>
                 """, unsafe_allow_html=True)
         
+        # Preload the LLM stack (and the client once a key is entered) while the user types
+        warmup.start(st.session_state.api_key)
+        
         # Bottom section with navigation
         st.markdown("<div style='margin-top: 2.5rem;'></div>", unsafe_allow_html=True)
         
@@ -176,6 +228,219 @@ def step_1_configuration():
         
         st.markdown("</div>", unsafe_allow_html=True)  # Close card div
 
+def _saved_profiles():
+    """Pick, import or export the profiles stored for this Gmail user"""
+    from profiles import get_store
+    
+    store = get_store()
+    user = st.session_state.gmail_email
+    profiles = store.list(user)
+    
+    with st.expander(f"💾 Saved profiles ({len(profiles)})", expanded=False):
+        if profiles:
+            labels = {
+                profile['cv_hash']: f"{profile['name'] or 'Unnamed'} · {profile['filename'] or profile['cv_hash'][:8]}"
+                for profile in profiles
+            }
+            selected = st.selectbox("Saved profile", list(labels), format_func=labels.get, label_visibility="collapsed")
+            
+            if st.button("Use this profile", use_container_width=True):
+                profile = store.get(user, selected, with_pdf=True)
+                _discard_switched_cv()
+                if profile['cv_pdf']:
+                    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
+                        tmp_file.write(profile['cv_pdf'])
+                        st.session_state.temp_cv_path = tmp_file.name
+                st.session_state.parsed_cv = profile['parsed']
+                st.session_state.cv_uploaded = True
+                st.session_state.cv_parsed = True
+                st.session_state.cv_pending = False
+                st.session_state.email_draft = None
+                st.rerun()
+            
+            st.download_button(
+                "⬇️ Export profiles (JSON)",
+                functools.partial(store.export_json, user),
+                file_name="profiles.json",
+                mime="application/json",
+                use_container_width=True
+            )
+        else:
+            st.caption("Profiles are saved automatically after a CV is processed.")
+        
+        imported = st.file_uploader("Import profiles (JSON)", type=['json'], key="profile_import")
+        if imported is not None and imported.file_id != st.session_state.profile_import_id:
+            st.session_state.profile_import_id = imported.file_id
+            try:
+                count, skipped = store.import_json(user, imported.getvalue().decode('utf-8'))
+                st.success(f"✅ Imported {count} profile(s)")
+                if skipped:
+                    # No rerun, so the warning stays visible; the list refreshes with the next interaction
+                    st.warning(f"⚠️ Skipped {skipped} invalid or stale profile(s)")
+                else:
+                    st.rerun()
+            except (ValueError, KeyError) as e:
+                st.error(f"❌ Could not import profiles: {str(e)}")
+
+@timed_fragment("step_2_upload")
+def _cv_upload_panel():
+    """Upload, preview and navigation of step 2, rerun on its own"""
+    # Upload area
+    with st.container():
+        col1, col2 = st.columns([1, 1], gap="large")  # 'large' is a valid gap value
+        
+        with col1:
+            # Drag and drop upload
+            uploaded_file = st.file_uploader(
+                "Drag and drop your CV here",
+                type=['pdf'],
+                help="Supported formats: PDF",
+                label_visibility="collapsed"
+            )
+            
+            st.checkbox(
+                "⚡ Fast start: parse my CV together with the first draft",
+                key="fused_draft",
+                help="Skips the separate parsing call; the profile is extracted by the draft request"
+            )
+            
+            # Only process a newly uploaded file; reruns must not re-parse the same CV
+            if uploaded_file is not None and uploaded_file.file_id != st.session_state.cv_file_id:
+                st.session_state.cv_file_id = uploaded_file.file_id
+                
+                # Save the uploaded file to a temporary location
+                with st.spinner("Processing your CV..."):
+                    try:
+                        _discard_switched_cv()
+                        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
+                            tmp_file.write(uploaded_file.getvalue())
+                            st.session_state.temp_cv_path = tmp_file.name
+                        st.session_state.cv_pending = False
+                        
+                        if st.session_state.fused_draft:
+                            from profiles import get_store, cv_hash
+                            profile = get_store().get(st.session_state.gmail_email, cv_hash(uploaded_file.getvalue()))
+                            if profile is None:
+                                # Parsed in step 4 by the same call that drafts the email
+                                st.session_state.parsed_cv = None
+                                st.session_state.cv_uploaded = True
+                                st.session_state.cv_parsed = False
+                                st.session_state.cv_pending = True
+                                st.session_state.cv_filename = uploaded_file.name
+                                st.success("✅ CV uploaded - it will be parsed with your first draft")
+                        
+                        if not st.session_state.cv_pending:
+                            # Process the CV (reuses the saved profile when this CV was seen before)
+                            from pipeline import load_or_parse_cv
+                            parsed_cv, from_store = load_or_parse_cv(
+                                st.session_state.api_key,
+                                st.session_state.temp_cv_path,
+                                st.session_state.gmail_email,
+                                st.session_state.session_id,
+                                uploaded_file.name,
+                                Deadline.for_stage("parse")
+                            )
+                        
+                            if parsed_cv:
+                                st.session_state.parsed_cv = parsed_cv
+                            
+                                st.session_state.cv_uploaded = True
+                                st.session_state.cv_parsed = True
+                                if from_store:
+                                    st.success("✅ Loaded your saved profile for this CV")
+                                else:
+                                    st.success("✅ CV processed successfully!")
+                            else:
+                                st.error("❌ Could not extract data from CV. Please try a different file.")
+                                st.session_state.cv_parsed = False
+                    
+                    except Exception as e:
+                        st.error(f"❌ Error processing CV: {str(e)}")
+                        st.session_state.cv_parsed = False
+                        if 'parsed_cv' in st.session_state:
+                            del st.session_state.parsed_cv
+            
+            # Previously parsed CVs of this user
+            _saved_profiles()
+        
+        with col2:
+            # Preview or instructions
+            if st.session_state.cv_pending:
+                st.info("📄 Your CV will be parsed together with your first application draft.")
+            elif st.session_state.cv_parsed and st.session_state.parsed_cv:
+                with st.expander("📋 Preview Parsed CV Data", expanded=True):
+                    st.markdown(f"""
+                    <div style="background: #1e293b; border-radius: 8px; padding: 1rem;">
+                        <h4 style="margin-top: 0;">{st.session_state.parsed_cv.get('name', 'No name found')}</h4>
+                        <p style="color: #94a3b8; margin-bottom: 0.5rem;">📍 {st.session_state.parsed_cv.get('location', 'No location found')}</p>
+                        
+                        <div style="margin: 1rem 0;">
+                            <h5 style="margin: 0 0 0.5rem 0;">Skills</h5>
+                            <div style="display: flex; flex-wrap: wrap; gap: 0.5rem;">
+                    """, unsafe_allow_html=True)
+                    
+                    # Display skills as tags
+                    skills = st.session_state.parsed_cv.get('skills', [])
+                    if skills:
+                        for skill in skills[:10]:
+                            st.markdown(f"""
+                            <span style="background: rgba(99, 102, 241, 0.1); color: #6366f1; 
+                                       padding: 0.25rem 0.75rem; border-radius: 20px; font-size: 0.8rem;">
+                                {skill}
+                            </span>
+                            """, unsafe_allow_html=True)
+                    else:
+                        st.markdown("<span style='color: #94a3b8;'>No skills found</span>", unsafe_allow_html=True)
+                    
+                    st.markdown("""
+                            </div>
+                        </div>
+                        
+                        <div style="margin-top: 1rem;">
+                            <h5 style="margin: 0 0 0.5rem 0;">Experience</h5>
+                            <ul style="margin: 0; padding-left: 1.2rem; color: #94a3b8;">
+                    """, unsafe_allow_html=True)
+                    
+                    # Display experience
+                    experience = st.session_state.parsed_cv.get('experience', [])
+                    if experience:
+                        for exp in experience[:3]:
+                            st.markdown(f"<li style='margin-bottom: 0.25rem;'>{exp}</li>", unsafe_allow_html=True)
+                    else:
+                        st.markdown("<li style='color: #94a3b8;'>No experience found</li>", unsafe_allow_html=True)
+                    
+                    st.markdown("""
+                            </ul>
+                        </div>
+                    </div>
+                    """, unsafe_allow_html=True)
+            else:
+                # Upload instructions
+                st.markdown("""
+                <div style="background: #1e293b; border: 2px dashed #475569; 
+                            border-radius: 12px; padding: 2rem; text-align: center; margin-top: 1rem;">
+                    <div style="font-size: 2rem; margin-bottom: 1rem;">📄</div>
+                    <h4 style="margin: 0 0 0.5rem 0;">Upload Your CV</h4>
+                    <p style="color: #94a3b8; font-size: 0.9rem; margin: 0;">
+                        Drag and drop your resume here or click to browse
+                    </p>
+                    <p style="color: #94a3b8; font-size: 0.8rem; margin: 1rem 0 0 0;">
+                        Supported format: PDF
+                    </p>
+                </div>
+                """, unsafe_allow_html=True)
+    
+    # Navigation buttons
+    st.markdown("<div style='margin-top: 2.5rem;'></div>", unsafe_allow_html=True)
+    
+    # Single column for next button only
+    if st.button("Next: Job Details ➡️", 
+                type="primary", 
+                use_container_width=True,
+                disabled=not (st.session_state.cv_parsed or st.session_state.cv_pending)):
+        st.session_state.workflow_step = 3
+        st.rerun()
+
 def step_2_upload_cv():
     st.markdown("<h1>📄 Upload Your CV</h1>", unsafe_allow_html=True)
     
@@ -199,143 +464,136 @@ def step_2_upload_cv():
         </p>
         """, unsafe_allow_html=True)
         
-        # Upload area
-        with st.container():
-            col1, col2 = st.columns([1, 1], gap="large")  # 'large' is a valid gap value
-            
-            with col1:
-                # Drag and drop upload
-                uploaded_file = st.file_uploader(
-                    "Drag and drop your CV here",
-                    type=['pdf'],
-                    help="Supported formats: PDF",
-                    label_visibility="collapsed"
-                )
-                
-                if uploaded_file is not None:
-                    # Save the uploaded file to a temporary location
-                    with st.spinner("Processing your CV..."):
-                        try:
-                            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-                                tmp_file.write(uploaded_file.getvalue())
-                                st.session_state.temp_cv_path = tmp_file.name
-                            
-                            # Initialize CV processing workflow
-                            cv_workflow = create_cv_subgraph(st.session_state.api_key)
-                            
-                            # Process the CV
-                            result = cv_workflow.invoke({"filepath": st.session_state.temp_cv_path})
-                            
-                            # Convert the result to a dictionary format for the UI
-                            if result and 'parsed_data' in result and result['parsed_data']:
-                                parsed_data = result['parsed_data']
-                                
-                                # Handle both dict and model types
-                                if hasattr(parsed_data, 'model_dump'):
-                                    parsed_data = parsed_data.model_dump()
-                                elif hasattr(parsed_data, '__dict__'):
-                                    parsed_data = vars(parsed_data)
-                                
-                                st.session_state.parsed_cv = {
-                                    'name': parsed_data.get('name', 'Not specified'),
-                                    'location': parsed_data.get('location', 'Not specified'),
-                                    'skills': parsed_data.get('skills', []),
-                                    'experience': parsed_data.get('experience', []),
-                                    'projects': parsed_data.get('projects', []),
-                                    'certificates': parsed_data.get('certificates', [])
-                                }
-                                
-                                st.session_state.cv_uploaded = True
-                                st.session_state.cv_parsed = True
-                                st.success("✅ CV processed successfully!")
-                            else:
-                                st.error("❌ Could not extract data from CV. Please try a different file.")
-                                st.session_state.cv_parsed = False
-                                
-                        except Exception as e:
-                            st.error(f"❌ Error processing CV: {str(e)}")
-                            st.session_state.cv_parsed = False
-                            if 'parsed_cv' in st.session_state:
-                                del st.session_state.parsed_cv
-            
-            with col2:
-                # Preview or instructions
-                if st.session_state.cv_parsed and st.session_state.parsed_cv:
-                    with st.expander("📋 Preview Parsed CV Data", expanded=True):
-                        st.markdown(f"""
-                        <div style="background: #1e293b; border-radius: 8px; padding: 1rem;">
-                            <h4 style="margin-top: 0;">{st.session_state.parsed_cv.get('name', 'No name found')}</h4>
-                            <p style="color: #94a3b8; margin-bottom: 0.5rem;">📍 {st.session_state.parsed_cv.get('location', 'No location found')}</p>
-                            
-                            <div style="margin: 1rem 0;">
-                                <h5 style="margin: 0 0 0.5rem 0;">Skills</h5>
-                                <div style="display: flex; flex-wrap: wrap; gap: 0.5rem;">
-                        """, unsafe_allow_html=True)
-                        
-                        # Display skills as tags
-                        skills = st.session_state.parsed_cv.get('skills', [])
-                        if skills:
-                            for skill in skills[:10]:
-                                st.markdown(f"""
-                                <span style="background: rgba(99, 102, 241, 0.1); color: #6366f1; 
-                                           padding: 0.25rem 0.75rem; border-radius: 20px; font-size: 0.8rem;">
-                                    {skill}
-                                </span>
-                                """, unsafe_allow_html=True)
-                        else:
-                            st.markdown("<span style='color: #94a3b8;'>No skills found</span>", unsafe_allow_html=True)
-                        
-                        st.markdown("""
-                                </div>
-                            </div>
-                            
-                            <div style="margin-top: 1rem;">
-                                <h5 style="margin: 0 0 0.5rem 0;">Experience</h5>
-                                <ul style="margin: 0; padding-left: 1.2rem; color: #94a3b8;">
-                        """, unsafe_allow_html=True)
-                        
-                        # Display experience
-                        experience = st.session_state.parsed_cv.get('experience', [])
-                        if experience:
-                            for exp in experience[:3]:
-                                st.markdown(f"<li style='margin-bottom: 0.25rem;'>{exp}</li>", unsafe_allow_html=True)
-                        else:
-                            st.markdown("<li style='color: #94a3b8;'>No experience found</li>", unsafe_allow_html=True)
-                        
-                        st.markdown("""
-                                </ul>
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                else:
-                    # Upload instructions
-                    st.markdown("""
-                    <div style="background: #1e293b; border: 2px dashed #475569; 
-                                border-radius: 12px; padding: 2rem; text-align: center; margin-top: 1rem;">
-                        <div style="font-size: 2rem; margin-bottom: 1rem;">📄</div>
-                        <h4 style="margin: 0 0 0.5rem 0;">Upload Your CV</h4>
-                        <p style="color: #94a3b8; font-size: 0.9rem; margin: 0;">
-                            Drag and drop your resume here or click to browse
-                        </p>
-                        <p style="color: #94a3b8; font-size: 0.8rem; margin: 1rem 0 0 0;">
-                            Supported format: PDF
-                        </p>
-                    </div>
-                    """, unsafe_allow_html=True)
-        
-        # Navigation buttons
-        st.markdown("<div style='margin-top: 2.5rem;'></div>", unsafe_allow_html=True)
-        
-        # Single column for next button only
-        if st.button("Next: Job Details ➡️", 
-                    type="primary", 
-                    use_container_width=True,
-                    disabled=not st.session_state.cv_parsed):
-            st.session_state.workflow_step = 3
-            st.rerun()
+        _cv_upload_panel()
         
         st.markdown("</div>", unsafe_allow_html=True)
 
+def _select_best_cv(job_text: str):
+    """Suggest the saved CV that matches this posting best (one CV x job score matrix)"""
+    from profiles import get_store
+    from ranking import match_matrix
+    
+    profiles = get_store().list(st.session_state.gmail_email)
+    # A CV waiting to be parsed with the first draft is not among the saved profiles yet
+    if len(profiles) < 2 or not job_text.strip() or st.session_state.cv_pending:
+        st.session_state.cv_choice = None
+        return
+    
+    scores = match_matrix([job_text], [profile['parsed'] for profile in profiles])[0]
+    best = profiles[int(scores.argmax())]
+    st.session_state.cv_choice = {
+        'filename': best['filename'] or best['name'],
+        'cv_hash': best['cv_hash'],
+        'score': float(scores.max()),
+        'candidates': len(profiles),
+        'current': best['parsed'] == st.session_state.parsed_cv
+    }
+
+def _use_cv_choice():
+    """Switch to the suggested CV, which is also the one attached when sending"""
+    from profiles import get_store
+    
+    choice = st.session_state.cv_choice
+    if not choice or choice['current']:
+        return
+    profile = get_store().get(st.session_state.gmail_email, choice['cv_hash'], with_pdf=True)
+    before = st.session_state.cv_before_switch
+    if before is None:
+        # The user's own CV comes back when they untick the suggestion
+        before = st.session_state.cv_before_switch = {
+            'parsed_cv': st.session_state.parsed_cv,
+            'temp_cv_path': st.session_state.temp_cv_path,
+            'switched_path': None,
+        }
+    if profile['cv_pdf']:
+        # One temp file per session for switched CVs, overwritten on every switch
+        if before['switched_path'] is None:
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
+                before['switched_path'] = tmp_file.name
+        with open(before['switched_path'], 'wb') as f:
+            f.write(profile['cv_pdf'])
+        st.session_state.temp_cv_path = before['switched_path']
+    st.session_state.parsed_cv = profile['parsed']
+    choice['current'] = True
+
+def _discard_switched_cv():
+    """Forget a CV switch (a new CV was chosen, or the switch was undone) and remove its temp file"""
+    before = st.session_state.get('cv_before_switch')
+    if before and before['switched_path'] and os.path.exists(before['switched_path']):
+        os.unlink(before['switched_path'])
+    st.session_state.cv_before_switch = None
+
+def _restore_own_cv():
+    """Undo _use_cv_choice: back to the CV the user uploaded or picked, and remove the switched copy"""
+    before = st.session_state.cv_before_switch
+    if before is None:
+        return
+    st.session_state.parsed_cv = before['parsed_cv']
+    st.session_state.temp_cv_path = before['temp_cv_path']
+    _discard_switched_cv()
+    if st.session_state.cv_choice:
+        st.session_state.cv_choice['current'] = before['parsed_cv'] == st.session_state.parsed_cv
+
+def _reusable_duplicate_draft():
+    """Draft of an earlier near-duplicate posting, unless the user asked for a fresh one"""
+    duplicate = st.session_state.duplicate_job
+    if duplicate and duplicate['draft'] and not st.session_state.duplicate_override:
+        return dict(duplicate['draft'])
+    return None
+
+def _speculation_key():
+    """Key of the speculative draft this session wants, or None when there is nothing to speculate on"""
+    job_text = st.session_state.job_text
+    if not (job_text.strip() and st.session_state.parsed_cv) or st.session_state.email_draft:
+        return None
+    if _reusable_duplicate_draft():
+        return None
+    return draft_key(st.session_state.parsed_cv, job_text, st.session_state.draft_variants)
+
+def _speculative_draft_status():
+    """Speculative draft caption; polls only while the job text settles or the draft is in flight"""
+    key = _speculation_key()
+    if key is None:
+        return
+    if st.session_state.speculative_draft.ready(key):
+        st.caption("✨ Your draft is ready")
+    else:
+        _speculative_draft_poll()
+
+@timed_fragment("step_3_speculation", run_every=1)
+def _speculative_draft_poll():
+    """Submit a background draft once the job text has been stable for a moment"""
+    key = _speculation_key()
+    if key is None:
+        return
+    if time.monotonic() - st.session_state.job_text_changed_at < SPECULATION_DELAY_SECONDS:
+        return
+    
+    from pipeline import create_draft
+    
+    # Only plain values go to the background thread, never st.session_state
+    deadline = Deadline.for_stage("draft")
+    future = st.session_state.speculative_draft.submit(
+        key,
+        functools.partial(
+            create_draft,
+            st.session_state.api_key,
+            st.session_state.gmail_email,
+            st.session_state.gmail_password,
+            st.session_state.session_id,
+            st.session_state.job_text,
+            st.session_state.parsed_cv,
+            st.session_state.temp_cv_path,
+            with_deadline(st.session_state.config, deadline),
+            st.session_state.draft_variants
+        ),
+        deadline
+    )
+    if future.done():
+        # One full rerun renders the static caption, which drops this fragment and its timer
+        st.rerun()
+    st.caption("✨ Preparing your draft in the background...")
+
 def step_3_job_input():
     st.markdown("<h1>💼 Job Details</h1>", unsafe_allow_html=True)
     
@@ -407,6 +665,71 @@ def step_3_job_input():
         
         if job_text != st.session_state.job_text:
             st.session_state.job_text = job_text
+            st.session_state.job_text_changed_at = time.monotonic()
+            # A draft for the old posting is stale now
+            st.session_state.email_draft = None
+            st.session_state.speculative_draft.cancel()
+            
+            # Near-duplicate of a posting processed before (local MinHash lookup, no LLM)
+            from dedup import get_history
+            st.session_state.duplicate_override = False
+            st.session_state.duplicate_job = (
+                get_history().find_duplicate(st.session_state.gmail_email, job_text) if job_text.strip() else None
+            )
+            _select_best_cv(job_text)
+            # Opted in earlier in this session: switch for this posting too
+            if st.session_state.auto_select_cv:
+                _use_cv_choice()
+        
+        # Multi-CV mode: suggest the best of the saved CVs for every posting; switching is opt-in
+        choice = st.session_state.cv_choice
+        if choice and (not choice['current'] or st.session_state.cv_before_switch):
+            # Keyed, so the widget keeps its identity when the setting flips
+            if 'auto_select_cv_input' not in st.session_state:
+                st.session_state.auto_select_cv_input = st.session_state.auto_select_cv
+            auto_select_cv = st.checkbox(
+                "🎯 Use my best-matching saved CV for this job",
+                key="auto_select_cv_input",
+                help="Scores every saved CV against the posting and drafts (and attaches) the best one"
+            )
+            if auto_select_cv != st.session_state.auto_select_cv:
+                st.session_state.auto_select_cv = auto_select_cv
+                if auto_select_cv:
+                    _use_cv_choice()
+                else:
+                    _restore_own_cv()
+                st.session_state.email_draft = None
+                st.session_state.speculative_draft.cancel()
+            if auto_select_cv:
+                st.caption(f"Using **{choice['filename']}**, the best of your {choice['candidates']} CVs "
+                           f"for this posting (the posting mentions {choice['score']:.0%} of its skills)")
+            else:
+                st.caption(f"**{choice['filename']}** matches this posting best of your {choice['candidates']} CVs "
+                           f"(the posting mentions {choice['score']:.0%} of its skills); your current CV is used "
+                           "unless you tick the box")
+        
+        duplicate = st.session_state.duplicate_job
+        if duplicate:
+            if duplicate['sent']:
+                st.warning(f"⚠️ You already applied to a posting {duplicate['similarity']:.0%} similar to this one. "
+                           "Sending again needs confirmation on the next step.")
+            elif duplicate['draft']:
+                st.info(f"♻️ This posting is {duplicate['similarity']:.0%} similar to one you drafted before. "
+                        "The previous draft will be reused.")
+        
+        # Best-of-N drafting
+        draft_variants = st.select_slider(
+            "Drafts to compare",
+            options=[1, 2, 3, 4, 5],
+            value=st.session_state.draft_variants,
+            help="Generate several versions in parallel and keep the best-scoring one"
+        )
+        if draft_variants != st.session_state.draft_variants:
+            st.session_state.draft_variants = draft_variants
+            st.session_state.email_draft = None
+        
+        # Start drafting in the background once the text has settled
+        _speculative_draft_status()
         
         # Tips for better results
         with st.expander("💡 Tips for better results"):
@@ -440,6 +763,200 @@ def step_3_job_input():
         
         st.markdown("</div>", unsafe_allow_html=True)
 
+@timed_fragment("step_4_review")
+def _email_review_panel():
+    """Draft editor and send actions of step 4, rerun on its own"""
+    if "draft_email" in st.session_state.draft_fallbacks:
+        st.warning("⏱️ The AI did not answer in time, so this is a basic template draft. "
+                   "Review it carefully or click Regenerate Email.")
+    elif st.session_state.draft_fallbacks:
+        st.info("⏱️ Part of the analysis ran out of time; the draft is based on partial information.")
+    # Email Preview with editing capabilities
+    st.markdown("""
+    <div style="margin-bottom: 2rem;">
+        <p style="color: #94a3b8;">
+            Review and customize your application email before sending. You can edit the content below.
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    with st.container():
+        # Email Header
+        st.markdown(f"""
+        <div style="background: #1e293b; padding: 1.5rem; border-radius: 12px 12px 0 0; 
+                    border: 1px solid #475569;">
+            <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 0.75rem;">
+                <h3 style="margin: 0;">Application Email</h3>
+                <span style="font-size: 0.85rem; color: #94a3b8;">
+                    To: {st.session_state.email_draft.get('to', 'Recipient')}
+                </span>
+            </div>
+            <div style="background: #334155; padding: 0.75rem; border-radius: 8px;">
+                <p style="margin: 0; font-weight: 500;">
+                    Subject: {st.session_state.email_draft.get('subject', 'No subject')}
+                </p>
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        # Email Body Editor
+        email_body = st.text_area(
+            "Email Body",
+            value=st.session_state.email_draft.get('body', ''),
+            height=400,
+            key="email_body_editor",
+            label_visibility="collapsed"
+        )
+        
+        # Update email body if changed
+        if email_body != st.session_state.email_draft.get('body', ''):
+            st.session_state.email_draft['body'] = email_body
+        
+        # Email Footer
+        st.markdown("""
+        <div style="background: #1e293b; padding: 1rem; border-radius: 0 0 12px 12px; 
+                    border: 1px solid #475569; border-top: none;">
+            <p style="margin: 0; color: #94a3b8; font-size: 0.85rem; text-align: right;">
+                Sent via AI Job Application Assistant
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    # Reused draft of a near-duplicate posting
+    duplicate = st.session_state.duplicate_job
+    if _reusable_duplicate_draft():
+        st.info(f"♻️ Reused the draft of an earlier posting ({duplicate['similarity']:.0%} similar): "
+                f"{duplicate['preview'][:120]}...")
+        if st.button("✨ Draft a fresh one instead", key="fresh_draft_button"):
+            st.session_state.duplicate_override = True
+            st.session_state.email_draft = None
+            st.session_state.pop("email_body_editor", None)
+            st.rerun()
+    
+    # Best-of-N candidates
+    if len(st.session_state.alternates) > 1:
+        with st.expander(f"🏆 Compare versions ({len(st.session_state.alternates)})", expanded=False):
+            for index, candidate in enumerate(st.session_state.alternates):
+                st.markdown(f"**{candidate.get('tone', '').capitalize()}** · score {candidate.get('score', 0):.2f}")
+                st.caption(f"Subject: {candidate.get('subject', '')}")
+                st.markdown(f"<p style='color: #94a3b8; font-size: 0.85rem;'>{candidate.get('body', '')[:300]}...</p>",
+                            unsafe_allow_html=True)
+                if st.button("Use this version", key=f"use_alternate_{index}"):
+                    st.session_state.email_draft = {
+                        field: value for field, value in candidate.items() if field not in ('score', 'tone')
+                    }
+                    # Re-create the editor so it shows the chosen body
+                    st.session_state.pop("email_body_editor", None)
+                    st.rerun()
+    
+    # Revision requests: mechanical edits apply locally, anything else goes to the model
+    with st.form("revision_form", clear_on_submit=True, border=False):
+        feedback = st.text_input(
+            "Request a change",
+            placeholder='e.g. "change subject to ...", "shorten to 120 words", "make it warmer"'
+        )
+        revise = st.form_submit_button("✏️ Apply change")
+    if revise and feedback.strip():
+        with st.spinner("Revising your email..."):
+            try:
+                from pipeline import create_workflow, revise_draft, get_fallbacks
+                
+                context = None
+                if st.session_state.wf is None:
+                    # Reused drafts were not produced by a workflow of this session
+                    st.session_state.wf = create_workflow(
+                        st.session_state.api_key,
+                        st.session_state.gmail_email,
+                        st.session_state.gmail_password,
+                        st.session_state.session_id
+                    )
+                    context = {
+                        "text": st.session_state.job_text,
+                        "parsed_data": st.session_state.parsed_cv,
+                        "filepath": st.session_state.temp_cv_path,
+                    }
+                revised = revise_draft(st.session_state.wf,
+                                       with_deadline(st.session_state.config, Deadline.for_stage("revise")),
+                                       st.session_state.email_draft, feedback, context)
+                if revised and get_fallbacks(st.session_state.wf, st.session_state.config):
+                    st.warning("⏱️ The change could not be applied in time. Please try again.")
+                elif revised:
+                    st.session_state.email_draft = revised
+                    # Re-create the editor so it shows the revised body
+                    st.session_state.pop("email_body_editor", None)
+                    st.rerun()
+                else:
+                    st.error("❌ Could not revise the email. Please try again.")
+            except Exception as e:
+                st.error(f"❌ Error revising email: {str(e)}")
+    
+    # Action Buttons
+    st.markdown("<div style='margin-top: 2.5rem;'></div>", unsafe_allow_html=True)
+    
+    col1, col2, col3 = st.columns([1, 1, 2])
+    
+    with col1:
+        if st.button("⬅️ Back to Job Details", use_container_width=True):
+            st.session_state.workflow_step = 3
+            st.rerun()
+            
+    with col2:
+        if st.button("🔄 Regenerate Email", 
+                   help="Generate a new version of the email",
+                   use_container_width=True):
+            try:
+                # Clear existing draft to trigger regeneration
+                st.session_state.email_draft = None
+                st.session_state.duplicate_override = True
+                st.rerun()
+            except Exception as e:
+                st.error(f"❌ Error regenerating email: {str(e)}")
+    
+    with col3:
+        # Block a second application to the same posting unless confirmed
+        already_sent = bool(duplicate and duplicate['sent'])
+        send_anyway = False
+        if already_sent:
+            send_anyway = st.checkbox("I already applied to a near-identical posting — send anyway",
+                                      key="send_duplicate_confirmed")
+        if st.button("✉️ Send Application", 
+                   type="primary", 
+                   use_container_width=True,
+                   disabled=already_sent and not send_anyway,
+                   help="Send this application email"):
+            try:
+                from pipeline import send_application
+                from dedup import get_history
+                
+                # Send the email
+                result = send_application(
+                    st.session_state.email_draft,
+                    st.session_state.gmail_email,
+                    st.session_state.gmail_password,
+                    st.session_state.temp_cv_path,
+                    Deadline.for_stage("send")
+                )
+                get_history().remember(st.session_state.gmail_email, st.session_state.job_text,
+                                       st.session_state.email_draft, sent=True)
+                
+                st.success(f"✅ {result}")
+                st.balloons()
+                
+                # Show success message with option to start new application
+                if st.button("🆕 Start New Application", key="new_app_button"):
+                    # Reset for new application but keep credentials
+                    _discard_switched_cv()
+                    keys_to_keep = ['api_key', 'gmail_email', 'gmail_password', 'ledger']
+                    keys_to_reset = [key for key in st.session_state.keys() if key not in keys_to_keep]
+                    for key in keys_to_reset:
+                        del st.session_state[key]
+                    initialize_session_state()
+                    st.session_state.workflow_step = 1
+                    st.rerun()
+                
+            except Exception as e:
+                st.error(f"❌ Error sending email: {str(e)}")
+
 def step_4_review_and_send():
     st.markdown("<h1>✉️ Review & Send</h1>", unsafe_allow_html=True)
     
@@ -457,38 +974,102 @@ def step_4_review_and_send():
         """, unsafe_allow_html=True)
         
         # Generate email draft if not exists
-        if not st.session_state.email_draft and st.session_state.job_text and st.session_state.parsed_cv:
-            with st.spinner("Generating your application email..."):
+        if not st.session_state.email_draft and st.session_state.job_text and st.session_state.cv_pending:
+            with st.spinner("Parsing your CV and generating your application email..."):
                 try:
-                    # Create workflow
-                    wf = create_workflow(
+                    from pipeline import parse_and_draft, get_alternates, get_fallbacks
+                    from dedup import get_history
+                    
+                    # A near-duplicate posting was drafted before: reuse it; the CV is parsed with the next draft
+                    email_draft = _reusable_duplicate_draft()
+                    if email_draft:
+                        st.session_state.email_draft = email_draft
+                        st.session_state.alternates = []
+                        st.session_state.draft_fallbacks = []
+                        st.rerun()
+                    
+                    # One model call extracts the profile and drafts the email
+                    wf, email_draft, parsed_cv = parse_and_draft(
                         st.session_state.api_key,
                         st.session_state.gmail_email,
-                        st.session_state.gmail_password
+                        st.session_state.gmail_password,
+                        st.session_state.session_id,
+                        st.session_state.job_text,
+                        st.session_state.temp_cv_path,
+                        st.session_state.gmail_email,
+                        with_deadline(st.session_state.config, Deadline.for_stage("draft")),
+                        st.session_state.draft_variants,
+                        st.session_state.cv_filename
                     )
+                    if parsed_cv:
+                        st.session_state.parsed_cv = parsed_cv
+                        st.session_state.cv_parsed = True
+                        st.session_state.cv_pending = False
+                    if email_draft:
+                        st.session_state.email_draft = email_draft
+                        st.session_state.alternates = get_alternates(wf, st.session_state.config)
+                        st.session_state.draft_fallbacks = get_fallbacks(wf, st.session_state.config)
+                        st.session_state.wf = wf
+                        # Template drafts (the time budget ran out) are never reused for near-duplicates
+                        if "draft_email" not in st.session_state.draft_fallbacks:
+                            get_history().remember(st.session_state.gmail_email, st.session_state.job_text, email_draft)
+                        st.success("✅ Email draft generated successfully!")
+                        st.rerun()
+                    else:
+                        st.error("❌ Could not generate email draft. Please try again.")
+                
+                except Exception as e:
+                    st.error(f"❌ Error generating email: {str(e)}")
+        
+        if not st.session_state.email_draft and st.session_state.job_text and st.session_state.parsed_cv:
+            with st.spinner("Generating your application email..."):
+                try:
+                    from pipeline import create_draft, get_alternates, get_fallbacks
+                    from dedup import get_history
                     
-                    initial_state = {
-                        "filepath": st.session_state.temp_cv_path,
-                        "text": st.session_state.job_text,
-                        "parsed_data": st.session_state.parsed_cv
-                    }
+                    # A near-duplicate posting was drafted before: reuse it without calling the LLM
+                    email_draft = _reusable_duplicate_draft()
+                    if email_draft:
+                        st.session_state.email_draft = email_draft
+                        st.session_state.alternates = []
+                        st.session_state.draft_fallbacks = []
+                        st.rerun()
                     
-                    # Generate email draft
-                    result = wf.invoke(initial_state, st.session_state.config)
+                    # Pick up the speculative draft started on the job details step
+                    key = draft_key(st.session_state.parsed_cv, st.session_state.job_text, st.session_state.draft_variants)
+                    future = st.session_state.speculative_draft.take(key)
+                    deadline = Deadline.for_stage("draft")
+                    wf, email_draft = None, None
+                    if future is not None:
+                        try:
+                            # Never wait longer than drafting directly is allowed to take
+                            wf, email_draft = future.result(timeout=deadline.remaining())
+                        except Exception:
+                            # Fall back to drafting synchronously below (template if the budget is spent)
+                            wf, email_draft = None, None
                     
-                    if result and 'email_schema' in result:
-                        email_schema = result['email_schema']
-                        
-                        # Handle both dict and model types
-                        if hasattr(email_schema, 'model_dump'):
-                            email_draft = email_schema.model_dump()
-                        elif hasattr(email_schema, '__dict__'):
-                            email_draft = vars(email_schema)
-                        else:
-                            email_draft = email_schema
-                        
+                    if not email_draft:
+                        # Create workflow and generate email draft (stops before the send step)
+                        wf, email_draft = create_draft(
+                            st.session_state.api_key,
+                            st.session_state.gmail_email,
+                            st.session_state.gmail_password,
+                            st.session_state.session_id,
+                            st.session_state.job_text,
+                            st.session_state.parsed_cv,
+                            st.session_state.temp_cv_path,
+                            with_deadline(st.session_state.config, deadline),
+                            st.session_state.draft_variants
+                        )
+                    
+                    if email_draft:
                         st.session_state.email_draft = email_draft
+                        st.session_state.alternates = get_alternates(wf, st.session_state.config)
+                        st.session_state.draft_fallbacks = get_fallbacks(wf, st.session_state.config)
                         st.session_state.wf = wf
+                        # Template drafts (the time budget ran out) are never reused for near-duplicates
+                        if "draft_email" not in st.session_state.draft_fallbacks:
+                            get_history().remember(st.session_state.gmail_email, st.session_state.job_text, email_draft)
                         st.success("✅ Email draft generated successfully!")
                         st.rerun()
                     else:
@@ -499,112 +1080,8 @@ def step_4_review_and_send():
                     st.write("Debug info:", str(e))
         
         if st.session_state.email_draft:
-            # Email Preview with editing capabilities
-            st.markdown("""
-            <div style="margin-bottom: 2rem;">
-                <p style="color: #94a3b8;">
-                    Review and customize your application email before sending. You can edit the content below.
-                </p>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            with st.container():
-                # Email Header
-                st.markdown(f"""
-                <div style="background: #1e293b; padding: 1.5rem; border-radius: 12px 12px 0 0; 
-                            border: 1px solid #475569;">
-                    <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 0.75rem;">
-                        <h3 style="margin: 0;">Application Email</h3>
-                        <span style="font-size: 0.85rem; color: #94a3b8;">
-                            To: {st.session_state.email_draft.get('to', 'Recipient')}
-                        </span>
-                    </div>
-                    <div style="background: #334155; padding: 0.75rem; border-radius: 8px;">
-                        <p style="margin: 0; font-weight: 500;">
-                            Subject: {st.session_state.email_draft.get('subject', 'No subject')}
-                        </p>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Email Body Editor
-                email_body = st.text_area(
-                    "Email Body",
-                    value=st.session_state.email_draft.get('body', ''),
-                    height=400,
-                    key="email_body_editor",
-                    label_visibility="collapsed"
-                )
-                
-                # Update email body if changed
-                if email_body != st.session_state.email_draft.get('body', ''):
-                    st.session_state.email_draft['body'] = email_body
-                
-                # Email Footer
-                st.markdown("""
-                <div style="background: #1e293b; padding: 1rem; border-radius: 0 0 12px 12px; 
-                            border: 1px solid #475569; border-top: none;">
-                    <p style="margin: 0; color: #94a3b8; font-size: 0.85rem; text-align: right;">
-                        Sent via AI Job Application Assistant
-                    </p>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            # Action Buttons
-            st.markdown("<div style='margin-top: 2.5rem;'></div>", unsafe_allow_html=True)
+            _email_review_panel()
             
-            col1, col2, col3 = st.columns([1, 1, 2])
-            
-            with col1:
-                if st.button("⬅️ Back to Job Details", use_container_width=True):
-                    st.session_state.workflow_step = 3
-                    st.rerun()
-                    
-            with col2:
-                if st.button("🔄 Regenerate Email", 
-                           help="Generate a new version of the email",
-                           use_container_width=True):
-                    try:
-                        # Clear existing draft to trigger regeneration
-                        st.session_state.email_draft = None
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"❌ Error regenerating email: {str(e)}")
-            
-            with col3:
-                if st.button("✉️ Send Application", 
-                           type="primary", 
-                           use_container_width=True,
-                           help="Send this application email"):
-                    try:
-                        # Convert dict to EmailSchema if needed
-                        email_obj = EmailSchema(**st.session_state.email_draft) if isinstance(st.session_state.email_draft, dict) else st.session_state.email_draft
-                        
-                        # Send the email
-                        result = send_email_directly(
-                            email_obj,
-                            st.session_state.gmail_email,
-                            st.session_state.gmail_password,
-                            st.session_state.temp_cv_path
-                        )
-                        
-                        st.success(f"✅ {result}")
-                        st.balloons()
-                        
-                        # Show success message with option to start new application
-                        if st.button("🆕 Start New Application", key="new_app_button"):
-                            # Reset for new application but keep credentials
-                            keys_to_keep = ['api_key', 'gmail_email', 'gmail_password']
-                            keys_to_reset = [key for key in st.session_state.keys() if key not in keys_to_keep]
-                            for key in keys_to_reset:
-                                del st.session_state[key]
-                            initialize_session_state()
-                            st.session_state.workflow_step = 1
-                            st.rerun()
-                        
-                    except Exception as e:
-                        st.error(f"❌ Error sending email: {str(e)}")
-                        
         else:
             st.warning("No email draft found. Please go back and complete the previous steps.")
             if st.button("⬅️ Back to Job Details"):
@@ -793,4 +1270,108 @@ def show_progress():
                 </div>
             ''', unsafe_allow_html=True)
         
-        st.markdown('</div>', unsafe_allow_html=True)
\ No newline at end of file
+        st.markdown('</div>', unsafe_allow_html=True)
+        
+        # Performance summary (process-wide metrics)
+        snapshot = registry.snapshot()
+        with st.expander("⏱️ Performance", expanded=False):
+            timings = snapshot["histograms"].get("node_duration_seconds", [])
+            if timings:
+                rows = sorted(timings, key=lambda sample: sample["labels"]["node"])
+                st.markdown("\n".join(
+                    f"- **{sample['labels']['node']}**: {sample['mean'] * 1000:.0f} ms avg "
+                    f"({sample['count']} runs, max {sample['max'] * 1000:.0f} ms)"
+                    for sample in rows
+                ))
+            else:
+                st.caption("No timings recorded yet")
+            
+            llm_calls = snapshot["histograms"].get("llm_call_seconds", [])
+            if llm_calls:
+                total_calls = sum(sample["count"] for sample in llm_calls)
+                total_time = sum(sample["sum"] for sample in llm_calls)
+                st.caption(f"🤖 Gemini: {total_calls} calls, {total_time / total_calls * 1000:.0f} ms avg")
+            
+            tokens = snapshot["counters"].get("llm_tokens", [])
+            if tokens:
+                token_in = sum(sample["value"] for sample in tokens if sample["labels"]["kind"] == "input")
+                token_out = sum(sample["value"] for sample in tokens if sample["labels"]["kind"] == "output")
+                st.caption(f"🔢 Tokens: {token_in:.0f} in / {token_out:.0f} out")
+            
+            smtp = snapshot["histograms"].get("smtp_phase_seconds", [])
+            if smtp:
+                st.caption("✉️ SMTP: " + ", ".join(
+                    f"{sample['labels']['phase']} {sample['mean'] * 1000:.0f} ms" for sample in smtp
+                ))
+            
+            pools = snapshot["collectors"].get("worker_pools", {})
+            if pools:
+                st.caption("🧵 Workers: " + " | ".join(
+                    f"{name} {pools[f'{name}_running']}/{pools[f'{name}_workers']} busy, {pools[f'{name}_queued']} queued"
+                    + (f", {pools[f'{name}_rejected']} rejected" if pools[f'{name}_rejected'] else "")
+                    for name in ("cpu", "io") if f"{name}_workers" in pools
+                ))
+            
+            retries = sum(sample["value"] for sample in snapshot["counters"].get("llm_retries", []))
+            cache = snapshot["counters"].get("cache_requests", [])
+            if retries or cache:
+                hits = sum(sample["value"] for sample in cache if sample["labels"]["result"] == "hit")
+                st.caption(f"🔁 Retries: {retries:.0f} | Cache hits: {hits:.0f}/{sum(s['value'] for s in cache):.0f}")
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button("OpenMetrics", registry.render_openmetrics(),
+                                   file_name="metrics.txt", mime="text/plain", use_container_width=True)
+            with col2:
+                st.download_button("JSON", json.dumps(snapshot, indent=2),
+                                   file_name="metrics.json", mime="application/json", use_container_width=True)
+        
+        # What this session has cost so far
+        _ledger_panel()
+
+@timed_fragment("sidebar_ledger")
+def _ledger_panel():
+    """Per-session ledger of model calls, cache lookups and SMTP operations.
+
+    Rendered with every full rerun (each draft, revision and send ends in one);
+    the refresh button reruns only this fragment, so idle sessions cost nothing.
+    """
+    ledger = st.session_state.ledger
+    entries = ledger.entries()
+    with st.expander(f"🧾 Session ledger ({len(entries)})", expanded=False):
+        st.button("🔄 Refresh", key="ledger_refresh", use_container_width=True)
+        if not entries:
+            st.caption("No model calls, cache lookups or emails yet")
+            return
+        summary = ledger.summary()
+        llm = summary.get("llm")
+        if llm:
+            failed = f", {llm['errors']} failed" if llm['errors'] else ""
+            st.caption(f"🤖 {llm['count']} model calls{failed}: {llm['seconds']:.1f} s, "
+                       f"{llm['input_tokens']:,} in / {llm['output_tokens']:,} out tokens, ≈ {llm['cost_usd']:.4f} USD")
+            if llm['cached_tokens']:
+                st.caption(f"📦 {llm['cached_tokens']:,} input tokens served from the context cache")
+        cache = summary.get("cache")
+        if cache:
+            st.caption("💾 Cache hits: " + ", ".join(
+                f"{name} {counts['hit']}/{counts['hit'] + counts['miss']}" for name, counts in sorted(cache["caches"].items())
+            ))
+        smtp = summary.get("smtp")
+        if smtp:
+            failed = f", {smtp['errors']} failed" if smtp['errors'] else ""
+            st.caption(f"✉️ {smtp['count']} SMTP operations{failed}: {smtp['seconds']:.2f} s")
+        mail = summary.get("mail")
+        if mail:
+            failed = f", {mail['errors']} failed" if mail['errors'] else ""
+            st.caption(f"📮 {mail['count']} mail batches{failed}: {mail['seconds']:.2f} s")
+        
+        # A markdown table: st.dataframe would load pandas and pyarrow into every server process
+        rows = ["| Time | Kind | Name | Status | ms | Tokens in/out | USD |", "|---|---|---|---|--:|--:|--:|"]
+        for entry in reversed(entries[-LEDGER_ROWS:]):
+            tokens = f"{entry['input_tokens']}/{entry['output_tokens']}" if entry["kind"] == "llm" else ""
+            name = f"{entry['name']} ({entry['detail']})" if entry["kind"] == "llm" else entry["name"]
+            rows.append(f"| {time.strftime('%H:%M:%S', time.localtime(entry['time']))} | {entry['kind']} | {name} | "
+                        f"{entry['status']} | {entry['seconds'] * 1000:.1f} | {tokens} | {entry['cost_usd']:.5f} |")
+        st.markdown("\n".join(rows))
+        st.download_button("⬇️ Export ledger (CSV)", ledger.to_csv, file_name="session_ledger.csv",
+                           mime="text/csv", use_container_width=True)
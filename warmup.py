@@ -0,0 +1,81 @@
+import time
+import threading
+import importlib
+from typing import Dict, Optional
+
+from metrics import registry
+
+# Modules that agents.py imports lazily, in the order they are needed
+HEAVY_MODULES = [
+    "pydantic",
+    "langchain_core",
+    "langgraph.graph",
+    "langgraph.checkpoint.memory",
+    "langchain_community.document_loaders",
+    "pypdf",
+    "langchain_google_genai",
+    "agents",
+    "pipeline",
+    "dedup",
+]
+
+_lock = threading.Lock()
+_modules_thread: Optional[threading.Thread] = None
+_client_threads: Dict[str, threading.Thread] = {}
+_import_seconds: Dict[str, float] = {}
+
+def _import_modules():
+    for name in HEAVY_MODULES:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception:
+            continue
+        _import_seconds[name] = time.perf_counter() - started
+        registry.observe("warmup_import_seconds", _import_seconds[name], module=name)
+
+def _build_clients(api_key: str):
+    _modules_thread.join()
+    try:
+        from agents import get_chat_model
+        from routing import get_router
+        with registry.timer("warmup_client_seconds"):
+            # Every routed model at the temperatures of create_cv_subgraph / create_workflow
+            for model in get_router().models():
+                get_chat_model(api_key, temperature=0, model=model)
+                get_chat_model(api_key, temperature=0.3, model=model)
+    except Exception:
+        # Bad keys surface later with a proper error message in the UI
+        pass
+
+def start(api_key: str = "") -> threading.Thread:
+    """Preload heavy modules (and the Gemini clients once a key is known) in the background.
+
+    Safe to call on every Streamlit rerun: each piece of work runs once per process.
+    """
+    global _modules_thread
+    with _lock:
+        if _modules_thread is None:
+            _modules_thread = threading.Thread(target=_import_modules, name="warmup-imports", daemon=True)
+            _modules_thread.start()
+        thread = _modules_thread
+        if api_key and api_key not in _client_threads:
+            thread = threading.Thread(target=_build_clients, args=(api_key,), name="warmup-client", daemon=True)
+            _client_threads[api_key] = thread
+            thread.start()
+    return thread
+
+def wait(timeout: Optional[float] = None, clients: bool = False) -> bool:
+    """Block until module preloading (and with `clients`, every client warm-up) finished; True if it did"""
+    with _lock:
+        threads = [_modules_thread] + (list(_client_threads.values()) if clients else [])
+    if threads[0] is None:
+        return False
+    deadline = None if timeout is None else time.monotonic() + timeout
+    for thread in threads:
+        thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+    return not any(thread.is_alive() for thread in threads)
+
+def import_times() -> Dict[str, float]:
+    """Seconds spent importing each heavy module during warm-up"""
+    return dict(_import_seconds)
@@ -0,0 +1,184 @@
+"""Process-wide bounded worker pools for blocking work.
+
+Every Streamlit session (and the CLI) runs its blocking leaf work on two
+shared pools instead of on its own threads:
+    cpu  PDF text extraction                  WORKERS_CPU (default: CPU count)
+    io   model calls, SMTP and mailbox sends  WORKERS_IO (default 32)
+
+Each pool admits at most its workers plus WORKERS_<POOL>_QUEUE waiting tasks.
+When it is full, submitting blocks (back-pressure) until a slot frees up, the
+caller's deadline runs out (DeadlineExceeded) or WORKERS_ADMIT_SECONDS pass
+(PoolSaturated). Queue waits, run times, queue depth and rejections are
+exported as metrics.
+
+Tasks run in a copy of the submitter's context, so they record into its
+session ledger. A task that submits to its own pool runs inline, so nested
+work cannot deadlock a saturated pool.
+"""
+import os
+import time
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TYPE_CHECKING
+
+from metrics import registry
+
+if TYPE_CHECKING:
+    from deadline import Deadline
+
+class PoolSaturated(RuntimeError):
+    """A worker pool stayed full for longer than the caller could wait"""
+
+    def __init__(self, pool: str, task: str):
+        self.pool = pool
+        self.task = task
+        super().__init__(f"Server busy: the {pool} worker pool is full ({task}); please try again shortly")
+
+# Name of the pool the current thread works for (None outside the pools)
+_local = threading.local()
+
+class WorkerPool:
+    """Fixed number of worker threads with a bounded queue in front of them"""
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, admit_seconds: float = 30.0):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.admit_seconds = admit_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-worker")
+        self._cond = threading.Condition()
+        # Admitted tasks that have not finished (queued + running)
+        self._inflight = 0
+        self._running = 0
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "max_queued": 0}
+
+    def _admit(self, task: str, deadline: Optional["Deadline"]):
+        """Take a slot, waiting while the pool is full; raise when the caller cannot wait any longer"""
+        limit = self.max_workers + self.max_queue
+        started = time.monotonic()
+        with self._cond:
+            while self._inflight >= limit:
+                if deadline is not None:
+                    # Short slices so a cancelled deadline is noticed promptly
+                    wait = min(deadline.remaining(), 0.05)
+                else:
+                    wait = self.admit_seconds - (time.monotonic() - started)
+                if wait <= 0:
+                    break
+                self._cond.wait(wait)
+            if self._inflight < limit:
+                self._inflight += 1
+                self._stats["submitted"] += 1
+                self._stats["max_queued"] = max(self._stats["max_queued"], self._inflight - self._running)
+                return
+            self._stats["rejected"] += 1
+        registry.inc("worker_rejections", pool=self.name, task=task)
+        if deadline is not None:
+            deadline.check(task)
+        raise PoolSaturated(self.name, task)
+
+    def _release(self, future: Future):
+        with self._cond:
+            self._inflight -= 1
+            if not future.cancelled():
+                self._stats["failed" if future.exception() else "completed"] += 1
+            self._cond.notify()
+
+    def submit(self, task: str, fn: Callable[..., Any], *args, deadline: Optional["Deadline"] = None,
+               **kwargs) -> Future:
+        """Queue fn(*args, **kwargs); blocks while the pool is full (see the module docstring)"""
+        self._admit(task, deadline)
+        context = contextvars.copy_context()
+        queued_at = time.perf_counter()
+
+        def work():
+            registry.observe("worker_queue_seconds", time.perf_counter() - queued_at, pool=self.name, task=task)
+            with self._cond:
+                self._running += 1
+            _local.pool = self.name
+            try:
+                with registry.timer("worker_run_seconds", pool=self.name, task=task):
+                    return context.run(fn, *args, **kwargs)
+            finally:
+                _local.pool = None
+                with self._cond:
+                    self._running -= 1
+
+        try:
+            future = self._executor.submit(work)
+        except BaseException:
+            with self._cond:
+                self._inflight -= 1
+                self._cond.notify()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def spawn(self, task: str, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Run fn on a thread of its own that counts as one of this pool's workers.
+
+        For callers already on a worker that must not queue behind themselves
+        but still want a future to wait on (and abandon); not admission-controlled.
+        """
+        future: Future = Future()
+        context = contextvars.copy_context()
+
+        def work():
+            if not future.set_running_or_notify_cancel():
+                return
+            _local.pool = self.name
+            try:
+                with registry.timer("worker_run_seconds", pool=self.name, task=task):
+                    future.set_result(context.run(fn, *args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+        registry.inc("worker_spawned", pool=self.name, task=task)
+        threading.Thread(target=work, name=f"{self.name}-spawned-{task}", daemon=True).start()
+        return future
+
+    def on_worker(self) -> bool:
+        """True when the current thread is one of this pool's workers"""
+        return getattr(_local, "pool", None) == self.name
+
+    def run(self, task: str, fn: Callable[..., Any], *args, deadline: Optional["Deadline"] = None, **kwargs) -> Any:
+        """Run fn on the pool and return its result; inline when already on one of its workers"""
+        if self.on_worker():
+            return fn(*args, **kwargs)
+        return self.submit(task, fn, *args, deadline=deadline, **kwargs).result()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {"workers": self.max_workers, "max_queue": self.max_queue, "running": self._running,
+                    "queued": self._inflight - self._running, **self._stats}
+
+# ----------------- SHARED POOLS -----------------
+DEFAULT_WORKERS = {"cpu": os.cpu_count() or 2, "io": 32}
+DEFAULT_QUEUE = {"cpu": 64, "io": 256}
+
+_pools: Dict[str, WorkerPool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool(name: str) -> WorkerPool:
+    """Process-wide "cpu" or "io" pool (sizes from WORKERS_<POOL> and WORKERS_<POOL>_QUEUE)"""
+    with _pools_lock:
+        if name not in _pools:
+            _pools[name] = WorkerPool(
+                name,
+                int(os.environ.get(f"WORKERS_{name.upper()}", DEFAULT_WORKERS[name])),
+                int(os.environ.get(f"WORKERS_{name.upper()}_QUEUE", DEFAULT_QUEUE[name])),
+                float(os.environ.get("WORKERS_ADMIT_SECONDS", 30)),
+            )
+        return _pools[name]
+
+def set_pool(name: str, pool: WorkerPool):
+    with _pools_lock:
+        _pools[name] = pool
+
+def _collect() -> Dict[str, Any]:
+    with _pools_lock:
+        pools = dict(_pools)
+    return {f"{name}_{field}": value for name, pool in sorted(pools.items()) for field, value in pool.stats().items()}
+
+registry.register_collector("worker_pools", _collect)